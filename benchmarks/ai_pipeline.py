@@ -0,0 +1,88 @@
+"""
+Measures the AI request pipeline against the offline Local Mock provider: sequential and
+concurrent completions, retries under simulated outages, the completion cache and streaming.
+No network access or API keys are needed.
+
+    python benchmarks/ai_pipeline.py --requests 16 --latency-ms 250 --error-rate 0.1
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, base_dir) # Make the project's src package importable
+
+from src.ai import complete, complete_many, start_stream, iter_stream
+from src.ai_cache import get_cache_stats
+from src.ai_mock import configure_mock, MOCK_MODEL_PREFIX, MOCK_MODELS
+
+MODEL = f"{MOCK_MODEL_PREFIX}{MOCK_MODELS[0]}"
+
+def _messages(run_id, i):
+    """A unique prompt per request, so runs never collide with each other or with real cache entries."""
+    return [{"role": "user", "content": f"Benchmark run {run_id}, segment {i}: write a match summary."}]
+
+def _report(label, elapsed, count):
+    print(f"{label:<38} {elapsed:8.2f}s  {count / elapsed if elapsed else 0:8.1f} req/s")
+
+def bench_sequential(run_id, count):
+    start = time.perf_counter()
+    for i in range(count):
+        complete(MODEL, _messages(run_id, f"seq-{i}"), use_cache=False)
+    _report("Sequential complete()", time.perf_counter() - start, count)
+
+def bench_concurrent(run_id, count, concurrency, max_retries):
+    start = time.perf_counter()
+    results = complete_many(MODEL, [_messages(run_id, f"c{concurrency}-{i}") for i in range(count)],
+                            concurrency=concurrency, max_retries=max_retries, use_cache=False)
+    failed = sum(1 for r in results if r['error'])
+    _report(f"complete_many() x{concurrency} ({failed} failed)", time.perf_counter() - start, count)
+
+def bench_cache(run_id, count):
+    message_lists = [_messages(run_id, f"cache-{i}") for i in range(count)]
+    before = get_cache_stats()
+    start = time.perf_counter()
+    complete_many(MODEL, message_lists, concurrency=count)
+    _report("Cache cold (misses, then stored)", time.perf_counter() - start, count)
+    start = time.perf_counter()
+    complete_many(MODEL, message_lists, concurrency=count)
+    _report("Cache warm (hits)", time.perf_counter() - start, count)
+    after = get_cache_stats()
+    print(f"{'Cache lookups this run':<38} {after['hits'] - before['hits']} hit(s), {after['misses'] - before['misses']} miss(es)")
+
+def bench_stream(run_id):
+    start = time.perf_counter()
+    first_token = None
+    for kind, _, _ in iter_stream(start_stream(MODEL, _messages(run_id, 'stream'), use_cache=False)):
+        if kind == 'token' and first_token is None:
+            first_token = time.perf_counter() - start
+        if kind in ('done', 'error'):
+            break
+    total = time.perf_counter() - start
+    print(f"{'Stream time to first token':<38} {first_token or 0:8.2f}s  (complete after {total:.2f}s)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the AI pipeline against the offline mock provider.")
+    parser.add_argument('--requests', type=int, default=16, help="Requests per measurement")
+    parser.add_argument('--latency-ms', type=int, default=250, help="Mock response latency")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of mock requests that fail")
+    parser.add_argument('--max-retries', type=int, default=2, help="Retries per request in batch runs")
+    args = parser.parse_args()
+
+    run_id = uuid.uuid4().hex[:8]
+    print(f"Mock latency {args.latency_ms} ms, error rate {args.error_rate}, {args.requests} requests per run\n")
+
+    # Outages are only simulated for the batch runs, which retry them
+    configure_mock(latency_ms=args.latency_ms, error_rate=0.0)
+    bench_sequential(run_id, args.requests)
+    configure_mock(latency_ms=args.latency_ms, error_rate=args.error_rate)
+    for concurrency in (1, 4, 8):
+        bench_concurrent(run_id, args.requests, concurrency, args.max_retries)
+    configure_mock(latency_ms=args.latency_ms, error_rate=0.0)
+    bench_cache(run_id, args.requests)
+    bench_stream(run_id)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Measures application start-up: builds the full app and the fan-only app in fresh interpreters
+with `python -X importtime`, and reports wall-clock time plus the slowest imports grouped by
+top-level module. Also shows whether litellm was loaded, which should only happen on first AI use.
+
+    python benchmarks/startup_imports.py --top 15
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = [
+    ("Full app", "from src.app import create_app; create_app()"),
+    ("Fan-only app", "from src.app import create_app; create_app(fan_only=True)"),
+    ("Full app + first AI use", "from src.app import create_app; create_app(); import src.ai; src.ai._get_litellm()"),
+]
+
+def _run(code):
+    """Runs `code` in a fresh interpreter. Returns (wall seconds, import-time stderr, modules loaded)."""
+    env = os.environ.copy()
+    env['PYTHONPATH'] = base_dir + (os.pathsep + env['PYTHONPATH'] if env.get('PYTHONPATH') else '')
+    probe = code + "; import sys; print('litellm' in sys.modules)"
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', probe], cwd=base_dir, env=env,
+                            capture_output=True, text=True, check=True)
+    return time.perf_counter() - start, result.stderr, result.stdout.strip() == 'True'
+
+def _parse_importtime(stderr):
+    """
+    Sums `-X importtime` output by top-level package. Only top-level rows are counted for the
+    cumulative total, so nested imports are not counted twice.
+    """
+    self_by_package = defaultdict(int)
+    cumulative_by_package = defaultdict(int)
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3:
+            continue
+        self_us, cumulative_us, name = int(parts[0]), int(parts[1]), parts[2][1:]
+        depth = (len(name) - len(name.lstrip(' '))) // 2
+        package = name.strip().split('.')[0]
+        self_by_package[package] += self_us
+        if depth == 0:
+            cumulative_by_package[package] += cumulative_us
+    return self_by_package, sum(cumulative_by_package.values())
+
+def main():
+    parser = argparse.ArgumentParser(description="Report start-up time and import cost by module.")
+    parser.add_argument('--top', type=int, default=10, help="Modules to list per scenario")
+    args = parser.parse_args()
+
+    for label, code in SCENARIOS:
+        wall, stderr, litellm_loaded = _run(code)
+        self_by_package, total_us = _parse_importtime(stderr)
+        print(f"{label}: {wall:.2f}s wall, {total_us / 1e6:.2f}s importing, litellm loaded: {'yes' if litellm_loaded else 'no'}")
+        for package, self_us in sorted(self_by_package.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+            print(f"    {package:<28} {self_us / 1000:9.1f} ms")
+        print()
+
+if __name__ == "__main__":
+    main()
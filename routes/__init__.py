@@ -1,17 +1,28 @@
-from .divisions import divisions_bp
-from .prefs import prefs_bp
-from .wrestlers import wrestlers_bp
-from .tagteams import tagteams_bp
-from .events import events_bp
-from .segments import segments_bp
-from .belts import belts_bp
-from .news import news_bp
-from .booker import booker_bp
-from .fan import fan_bp
-from .tools import tools_bp # Import the new tools blueprint
+import importlib
 
-__all__ = [
-    'divisions_bp', 'prefs_bp', 'wrestlers_bp', 'tagteams_bp',
-    'events_bp', 'segments_bp', 'belts_bp', 'news_bp',
-    'booker_bp', 'fan_bp', 'tools_bp' # Add tools_bp to the all list
-]
+# Blueprint -> module that defines it. Blueprints are imported on first access, so code
+# that only needs one of them (such as a fan-only app) does not import the rest.
+_BLUEPRINT_MODULES = {
+    'divisions_bp': 'divisions',
+    'prefs_bp': 'prefs',
+    'wrestlers_bp': 'wrestlers',
+    'tagteams_bp': 'tagteams',
+    'events_bp': 'events',
+    'segments_bp': 'segments',
+    'belts_bp': 'belts',
+    'news_bp': 'news',
+    'booker_bp': 'booker',
+    'api_bp': 'api',
+    'fan_bp': 'fan',
+    'tools_bp': 'tools',
+    'jobs_bp': 'jobs',
+}
+
+def __getattr__(name):
+    """Imports a blueprint's module the first time the blueprint is used."""
+    module_name = _BLUEPRINT_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(f".{module_name}", __name__), name)
+
+__all__ = list(_BLUEPRINT_MODULES)
@@ -0,0 +1,172 @@
+import html
+from datetime import datetime
+from flask import Blueprint, request, jsonify
+from src.wrestlers import get_wrestler_by_name, update_wrestler, update_wrestler_team_affiliation, WRESTLER_EDITABLE_FIELDS
+from src.tagteams import get_tagteam_by_name, update_tagteam, TAGTEAM_EDITABLE_FIELDS
+from src.events import get_event_by_name, update_event, EVENT_EDITABLE_FIELDS
+from src.belts import get_belt_by_id, update_belt, BELT_EDITABLE_FIELDS
+from src.segments import get_segment_by_position, get_segment_etag, _slugify
+from src.tagteams import get_active_members_status
+from src.storage import StaleRecordError, record_etag
+from routes.wrestlers import STATUS_OPTIONS as WRESTLER_STATUS_OPTIONS
+from routes.tagteams import STATUS_OPTIONS as TAGTEAM_STATUS_OPTIONS
+from routes.events import STATUS_OPTIONS as EVENT_STATUS_OPTIONS
+from routes.belts import STATUS_OPTIONS as BELT_STATUS_OPTIONS, HOLDER_TYPE_OPTIONS
+
+api_bp = Blueprint('api', __name__, url_prefix='/api')
+
+# Collection -> (loader, updater, key field). Updaters take (key, changes, expected_etag=...) and
+# apply the changes to the record as saved under the file lock.
+RECORD_TYPES = {
+    'wrestlers': (get_wrestler_by_name, update_wrestler, 'Name'),
+    'tagteams': (get_tagteam_by_name, update_tagteam, 'Name'),
+    'events': (get_event_by_name, update_event, 'Event_Name'),
+    'belts': (get_belt_by_id, update_belt, 'ID'),
+}
+
+# Collection -> fields a PATCH may change, as on the edit forms. Records, belts, team
+# memberships (and so team weights), current holders and the finalized flag only change
+# through their own tools.
+EDITABLE_FIELDS = {
+    'wrestlers': set(WRESTLER_EDITABLE_FIELDS),
+    'tagteams': set(TAGTEAM_EDITABLE_FIELDS) - {'Members', 'Weight'},
+    'events': set(EVENT_EDITABLE_FIELDS),
+    'belts': set(BELT_EDITABLE_FIELDS) - {'Current_Holder'},
+}
+REQUIRED_FIELDS = {
+    'wrestlers': ('Name',),
+    'tagteams': ('Name',),
+    'events': ('Event_Name', 'Status', 'Date'),
+    'belts': ('Name', 'Status', 'Holder_Type'),
+}
+# Collection -> {field: allowed values}
+FIELD_OPTIONS = {
+    'wrestlers': {'Status': WRESTLER_STATUS_OPTIONS},
+    'tagteams': {'Status': TAGTEAM_STATUS_OPTIONS},
+    'events': {'Status': EVENT_STATUS_OPTIONS},
+    'belts': {'Status': BELT_STATUS_OPTIONS, 'Holder_Type': HOLDER_TYPE_OPTIONS},
+}
+ESCAPED_TYPES = ('wrestlers', 'tagteams') # Their forms HTML-escape every text field
+BOOLEAN_FIELDS = ('Hide_From_Fan_Roster',)
+INTEGER_FIELDS = ('Display_Position',)
+
+def _clean_changes(record_type, record, changes):
+    """
+    Checks a PATCH body the way the edit forms check their fields. Returns (cleaned changes, None),
+    or (None, error message) if a field may not be changed or a value is invalid.
+    """
+    locked = sorted(set(changes) - EDITABLE_FIELDS[record_type])
+    if locked:
+        return None, f"These fields cannot be changed here: {', '.join(locked)}."
+    cleaned = {}
+    for field, value in changes.items():
+        if field in BOOLEAN_FIELDS:
+            if not isinstance(value, bool):
+                return None, f"{field} must be true or false."
+        elif field in INTEGER_FIELDS:
+            if isinstance(value, bool) or not isinstance(value, int):
+                return None, f"{field} must be a whole number."
+        elif not isinstance(value, str):
+            return None, f"{field} must be a string."
+        else:
+            value = value.strip()
+            if record_type in ESCAPED_TYPES:
+                value = html.escape(value)
+        cleaned[field] = value
+
+    updated = dict(record, **cleaned)
+    for field in REQUIRED_FIELDS[record_type]:
+        if not updated.get(field):
+            return None, f"{field} is required."
+    for field, options in FIELD_OPTIONS[record_type].items():
+        if field in cleaned and cleaned[field] not in options:
+            return None, f"{field} must be one of: {', '.join(options)}."
+    if 'Date' in cleaned:
+        try:
+            datetime.strptime(cleaned['Date'], '%Y-%m-%d')
+        except ValueError:
+            return None, 'Invalid date format. Please use YYYY-MM-DD.'
+    if record_type == 'tagteams' and cleaned.get('Status') == 'Active':
+        if not get_active_members_status(m for m in updated.get('Members', '').split('|') if m):
+            return None, "Cannot set tag-team status to 'Active' because one or more members are inactive."
+    return cleaned, None
+
+def _record_response(record, etag, status=200):
+    """Returns a record as JSON with its version in the ETag header."""
+    response = jsonify(record)
+    response.status_code = status
+    response.set_etag(etag)
+    return response
+
+def _get_record(record, etag):
+    """Answers a GET, with 304 Not Modified if the client already has this version."""
+    if request.if_none_match.contains(etag):
+        response = _record_response(record, etag, 304)
+        response.set_data(b'')
+        return response
+    return _record_response(record, etag)
+
+@api_bp.route('/<string:record_type>/<path:key>', methods=['GET'])
+def get_record(record_type, key):
+    """Returns one wrestler, tag-team, event or belt with its ETag."""
+    if record_type not in RECORD_TYPES:
+        return jsonify({'error': f"Unknown record type '{record_type}'."}), 404
+    loader, _, _ = RECORD_TYPES[record_type]
+    record = loader(key)
+    if not record:
+        return jsonify({'error': 'Record not found.'}), 404
+    return _get_record(record, record_etag(record))
+
+@api_bp.route('/<string:record_type>/<path:key>', methods=['PATCH'])
+def patch_record(record_type, key):
+    """
+    Changes the given fields of one record. Only the fields its edit form offers can be changed,
+    and they are checked the same way (400 otherwise). The request must send the record's ETag in
+    If-Match; a stale ETag is answered with 412 and the current record.
+    """
+    if record_type not in RECORD_TYPES:
+        return jsonify({'error': f"Unknown record type '{record_type}'."}), 404
+    loader, updater, key_field = RECORD_TYPES[record_type]
+    changes = request.get_json(silent=True)
+    if not isinstance(changes, dict):
+        return jsonify({'error': 'Send the fields to change as a JSON object.'}), 400
+    if not request.if_match:
+        return jsonify({'error': 'An If-Match header with the record ETag is required.'}), 428
+
+    record = loader(key)
+    if not record:
+        return jsonify({'error': 'Record not found.'}), 404
+    if key_field == 'ID' and changes.pop('ID', key) != key:
+        return jsonify({'error': 'The ID cannot be changed.'}), 400
+    changes, error = _clean_changes(record_type, record, changes)
+    if error:
+        return jsonify({'error': error}), 400
+    etag = record_etag(record)
+    if request.if_match.star_tag:
+        expected_etag = None
+    elif request.if_match.contains(etag):
+        expected_etag = etag # Checked again under the file lock, in case of a concurrent save
+    else:
+        return _record_response(record, etag, 412)
+
+    try:
+        result = updater(key, changes, expected_etag=expected_etag)
+    except StaleRecordError as e:
+        return _record_response(e.current, e.etag, 412)
+    success, message = result if isinstance(result, tuple) else (result, None)
+    if not success:
+        return jsonify({'error': message or f"Could not update the record. The new {key_field} might already exist."}), 409
+    new_key = changes.get(key_field, key)
+    saved = loader(new_key) or dict(record, **changes)
+    if record_type == 'tagteams' and new_key != key: # Members carry their team's name, as on the edit form
+        for member in saved.get('Members', '').split('|'):
+            if member: update_wrestler_team_affiliation(member, new_key)
+    return _record_response(saved, record_etag(saved))
+
+@api_bp.route('/events/<string:event_name>/segments/<int:position>', methods=['GET'])
+def get_segment(event_name, position):
+    """Returns one segment with the same ETag its edit form uses."""
+    segment = get_segment_by_position(_slugify(event_name), position)
+    if not segment:
+        return jsonify({'error': 'Segment not found.'}), 404
+    return _get_record(segment, get_segment_etag(segment))
@@ -2,12 +2,13 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash
 from src.belts import (
     load_belts, add_belt, get_belt_by_id, update_belt, delete_belt,
     load_history_for_belt, add_reign_to_history, get_reign_by_id,
-    update_reign_in_history, delete_reign_from_history
+    update_reign_in_history, delete_reign_from_history, BELT_EDITABLE_FIELDS
 )
 from src.wrestlers import load_wrestlers
 from src.tagteams import load_tagteams
 from src.segments import _slugify
 from src.prefs import load_preferences # Import load_preferences
+from src.storage import StaleRecordError, record_etag, diff_records
 import uuid
 from datetime import datetime, date # Import date
 
@@ -67,16 +68,22 @@ def edit_belt(belt_id):
     tagteams = sorted([t['Name'] for t in load_tagteams()])
     if request.method == 'POST':
         updated_data = _get_form_data(request.form)
+        etag, conflict = request.form.get('record_etag'), None
         if updated_data['ID'] != belt_id:
             flash('Belt ID cannot be changed.', 'danger')
         else:
-            success, message = update_belt(belt_id, updated_data)
-            if success:
-                flash(message, 'success')
-                return redirect(url_for('belts.list_belts'))
-            else: flash(message, 'danger')
-        return render_template('booker/belts/form.html', belt=updated_data, status_options=STATUS_OPTIONS, holder_type_options=HOLDER_TYPE_OPTIONS, wrestlers=wrestlers, tagteams=tagteams, form_action='edit')
-    return render_template('booker/belts/form.html', belt=belt_to_edit, status_options=STATUS_OPTIONS, holder_type_options=HOLDER_TYPE_OPTIONS, wrestlers=wrestlers, tagteams=tagteams, form_action='edit')
+            try:
+                changes = {key: updated_data[key] for key in BELT_EDITABLE_FIELDS}
+                success, message = update_belt(belt_id, changes, expected_etag=etag, etag_fields=BELT_EDITABLE_FIELDS)
+                if success:
+                    flash(message, 'success')
+                    return redirect(url_for('belts.list_belts'))
+                else: flash(message, 'danger')
+            except StaleRecordError as e:
+                flash(str(e), 'danger')
+                etag, conflict = e.etag, diff_records(changes, e.current)
+        return render_template('booker/belts/form.html', belt=updated_data, status_options=STATUS_OPTIONS, holder_type_options=HOLDER_TYPE_OPTIONS, wrestlers=wrestlers, tagteams=tagteams, form_action='edit', record_etag=etag, record_conflict=conflict)
+    return render_template('booker/belts/form.html', belt=belt_to_edit, status_options=STATUS_OPTIONS, holder_type_options=HOLDER_TYPE_OPTIONS, wrestlers=wrestlers, tagteams=tagteams, form_action='edit', record_etag=record_etag(belt_to_edit, fields=BELT_EDITABLE_FIELDS))
 
 @belts_bp.route('/delete/<string:belt_id>', methods=['POST'])
 def delete_belt_route(belt_id):
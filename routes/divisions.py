@@ -5,6 +5,9 @@ from src.divisions import (
     update_division, delete_division, is_division_in_use, get_all_division_ids_and_names
 )
 from src.segments import _slugify
+from src.standings import load_standings, build_division_standings, FORM_LENGTH, MIN_MATCHES_FOR_PERCENTAGE
+from src.wrestlers import load_wrestlers
+from src.tagteams import load_tagteams
 
 divisions_bp = Blueprint('divisions', __name__, url_prefix='/divisions')
 
@@ -89,7 +92,9 @@ def view_division(division_id):
     if not division_data:
         flash('Division not found.', 'danger')
         return redirect(url_for('divisions.list_divisions'))
-    return render_template('booker/divisions/view.html', division=division_data)
+    standings = build_division_standings(division_data, load_wrestlers(), load_tagteams(), load_standings())
+    return render_template('booker/divisions/view.html', division=division_data, standings=standings,
+                           form_length=FORM_LENGTH, min_matches=MIN_MATCHES_FOR_PERCENTAGE)
 
 
 @divisions_bp.route('/delete/<string:division_id>', methods=['POST'])
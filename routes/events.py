@@ -1,11 +1,13 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash
-from src.events import load_events, get_event_by_name, add_event, update_event, delete_event, save_event_summary
-from src.segments import load_segments, get_match_by_id, _get_all_wrestlers_involved, _get_all_tag_teams_involved, _slugify, delete_all_segments_for_event, load_summary_content, load_matches
-from src.wrestlers import update_wrestler_record
-from src.tagteams import load_tagteams, update_tagteam_record, get_tagteam_by_name
-from src.belts import get_belt_by_name, process_championship_change, update_reign_in_history, load_history_for_belt
-from src.prefs import load_preferences, save_preferences # Import save_preferences
+from src.events import load_events, get_event_by_name, add_event, update_event, delete_event, finalize_event_results, preview_event_results, EVENT_EDITABLE_FIELDS
+from src.segments import load_segments, _slugify, delete_all_segments_for_event, load_summary_content
+from src.prefs import load_preferences, update_preferences
+from src.storage import StaleRecordError, record_etag, diff_records
 from src.date_utils import get_current_working_date # Import the new utility
+from src.jobs import submit_job, get_job, is_job_finished, STATUS_COMPLETED
+from src.ai import get_litellm_model, AIConfigError
+from src.ai_card import generate_card_summaries
+from src.simulator import simulate_events, get_upcoming_events, DEFAULT_SIMULATIONS, MAX_SIMULATIONS, BACKGROUND_SIMULATIONS
 from datetime import datetime
 
 events_bp = Blueprint('events', __name__, url_prefix='/events')
@@ -21,6 +23,12 @@ def _get_form_data(form):
         'Finalized': form.get('finalized', 'false').lower() == 'true'
     }
 
+def _get_event_warnings(event):
+    """Validates a past event's whole card, as finalizing it would, and returns the issues found."""
+    if event.get('Status') != 'Past' or event.get('Finalized'):
+        return []
+    return preview_event_results(event['Event_Name'])['issues']
+
 @events_bp.route('/')
 def list_events():
     selected_status = request.args.get('status', 'All')
@@ -56,8 +64,7 @@ def create_event():
         if add_event(event_data):
             # Update game_date if checkbox is checked and mode is 'latest-event-date'
             if prefs.get('game_date_mode') == 'latest-event-date' and request.form.get('update_game_date'):
-                prefs['game_date'] = event_data['Date']
-                save_preferences(prefs)
+                update_preferences({'game_date': event_data['Date']})
                 flash(f"Game date updated to {event_data['Date']}.", 'info')
 
             flash(f"Event '{event_data['Event_Name']}' created successfully! You can now add segments.", 'success')
@@ -81,47 +88,46 @@ def edit_event(event_name):
     sluggified_name = _slugify(event_name)
     segments = sorted(load_segments(sluggified_name), key=lambda s: s.get('position', 0))
 
-    event_warnings = []
-    if event.get('Status') == 'Past':
-        all_matches_data = load_matches(sluggified_name)
-        for segment in segments:
-            if segment.get('type') == 'Match' and segment.get('match_id'):
-                match_id = segment['match_id']
-                match = next((m for m in all_matches_data if m.get('match_id') == match_id), None)
-                if match and match.get('warnings'):
-                    for warning in match['warnings']:
-                        event_warnings.append(f"Segment {segment['position']}: {warning}")
+    event_warnings = _get_event_warnings(event)
 
+    etag = record_etag(event, fields=EVENT_EDITABLE_FIELDS)
     if request.method == 'POST':
+        etag = request.form.get('record_etag') # Keep the version the form was opened with
         updated_data = _get_form_data(request.form)
         updated_data['Finalized'] = event.get('Finalized', False)
         if not all([updated_data['Event_Name'], updated_data['Status'], updated_data['Date']]):
             flash('Event Name, Status, and Date are required.', 'danger')
-            return render_template('booker/events/form.html', event=event, segments=segments, status_options=STATUS_OPTIONS, original_name=event_name, event_warnings=event_warnings, prefs=prefs)
+            return render_template('booker/events/form.html', event=event, segments=segments, status_options=STATUS_OPTIONS, original_name=event_name, event_warnings=event_warnings, prefs=prefs, record_etag=etag)
         try:
             datetime.strptime(updated_data['Date'], '%Y-%m-%d')
         except ValueError:
             flash('Invalid date format. Please use YYYY-MM-DD.', 'danger')
-            return render_template('booker/events/form.html', event=updated_data, segments=segments, status_options=STATUS_OPTIONS, original_name=event_name, event_warnings=event_warnings, prefs=prefs)
+            return render_template('booker/events/form.html', event=updated_data, segments=segments, status_options=STATUS_OPTIONS, original_name=event_name, event_warnings=event_warnings, prefs=prefs, record_etag=etag)
         
-        if update_event(event_name, updated_data):
+        try:
+            changes = {key: updated_data[key] for key in EVENT_EDITABLE_FIELDS} # Finalizing sets the rest
+            updated = update_event(event_name, changes, expected_etag=etag, etag_fields=EVENT_EDITABLE_FIELDS)
+        except StaleRecordError as e:
+            flash(str(e), 'danger')
+            return render_template('booker/events/form.html', event=updated_data, segments=segments, status_options=STATUS_OPTIONS, original_name=event_name, event_warnings=event_warnings, prefs=prefs,
+                                   record_etag=e.etag, record_conflict=diff_records(changes, e.current))
+        if updated:
             # Update game_date if checkbox is checked and mode is 'latest-event-date'
             if prefs.get('game_date_mode') == 'latest-event-date' and request.form.get('update_game_date'):
-                prefs['game_date'] = updated_data['Date']
-                save_preferences(prefs)
+                update_preferences({'game_date': updated_data['Date']})
                 flash(f"Game date updated to {updated_data['Date']}.", 'info')
 
             flash(f"Event '{updated_data['Event_Name']}' updated successfully!", 'success')
             return redirect(url_for('events.edit_event', event_name=updated_data['Event_Name']))
         else:
             flash(f"Failed to update event. New name might conflict.", 'danger')
-            return render_template('booker/events/form.html', event=updated_data, segments=segments, status_options=STATUS_OPTIONS, original_name=event_name, event_warnings=event_warnings, prefs=prefs)
+            return render_template('booker/events/form.html', event=updated_data, segments=segments, status_options=STATUS_OPTIONS, original_name=event_name, event_warnings=event_warnings, prefs=prefs, record_etag=etag)
     
     # For GET request, ensure event date is set, or use current working date if new event
     if not event.get('Date'):
         event['Date'] = current_working_date
 
-    return render_template('booker/events/form.html', event=event, segments=segments, status_options=STATUS_OPTIONS, original_name=event_name, event_warnings=event_warnings, prefs=prefs)
+    return render_template('booker/events/form.html', event=event, segments=segments, status_options=STATUS_OPTIONS, original_name=event_name, event_warnings=event_warnings, prefs=prefs, record_etag=etag)
 
 @events_bp.route('/view/<string:event_name>')
 def view_event(event_name):
@@ -136,6 +142,61 @@ def view_event(event_name):
     segments.sort(key=lambda s: s.get('position', 0))
     return render_template('booker/events/view.html', event=event, segments=segments)
 
+def _get_simulation_count():
+    """Reads the number of simulations from the query string, within the allowed range."""
+    simulations = request.args.get('sims', DEFAULT_SIMULATIONS, type=int) or DEFAULT_SIMULATIONS
+    return max(1, min(simulations, MAX_SIMULATIONS))
+
+def _simulate_events_job(event_name, simulations, progress=None):
+    """Background job body for a large simulation. The results are kept in the job record."""
+    events = [get_event_by_name(event_name)] if event_name else get_upcoming_events()
+    if not all(events):
+        raise ValueError(f"Event '{event_name}' not found.")
+    return {'event_name': event_name, 'results': simulate_events(events, simulations, progress=progress)}
+
+def _render_simulation(event, simulations):
+    """Simulates small runs in the request; larger ones are started as a background job."""
+    event_name = event['Event_Name'] if event else None
+    if simulations > BACKGROUND_SIMULATIONS:
+        description = f"Simulate {event_name} ({simulations:,} runs)" if event_name else f"Simulate season ({simulations:,} runs)"
+        job_id = submit_job('simulate', description, _simulate_events_job, event_name, simulations,
+                            return_url=lambda job_id: url_for('events.simulation_results', job_id=job_id))
+        return redirect(url_for('jobs.view_job', job_id=job_id))
+    results = simulate_events([event] if event else get_upcoming_events(), simulations)
+    return render_template('booker/events/simulate.html', results=results, event=event, max_simulations=MAX_SIMULATIONS,
+                           background_simulations=BACKGROUND_SIMULATIONS)
+
+@events_bp.route('/simulate/<string:event_name>')
+def simulate_event(event_name):
+    """Simulates an event's booked card: win chances for every match and title change odds."""
+    event = get_event_by_name(event_name)
+    if not event:
+        flash('Event not found.', 'danger')
+        return redirect(url_for('events.list_events'))
+    return _render_simulation(event, _get_simulation_count())
+
+@events_bp.route('/simulate-season')
+def simulate_season():
+    """Simulates every booked event not finalized yet, in date order, to project titles and division leaders."""
+    return _render_simulation(None, _get_simulation_count())
+
+@events_bp.route('/simulation/<string:job_id>')
+def simulation_results(job_id):
+    """Shows the results of a simulation that ran as a background job."""
+    job = get_job(job_id)
+    if not job or job.get('Kind') != 'simulate':
+        flash('Simulation not found.', 'danger')
+        return redirect(url_for('events.list_events'))
+    if not is_job_finished(job):
+        return redirect(url_for('jobs.view_job', job_id=job_id))
+    if job.get('Status') != STATUS_COMPLETED or not job.get('Result'):
+        flash(job.get('Message') or 'The simulation did not finish.', 'danger')
+        return redirect(url_for('events.list_events'))
+    result = job['Result']
+    event = get_event_by_name(result['event_name']) if result['event_name'] else None
+    return render_template('booker/events/simulate.html', results=result['results'], event=event, max_simulations=MAX_SIMULATIONS,
+                           background_simulations=BACKGROUND_SIMULATIONS)
+
 @events_bp.route('/delete/<string:event_name>', methods=['POST'])
 def delete_event_route(event_name):
     event = get_event_by_name(event_name)
@@ -160,16 +221,7 @@ def finalize_event(event_name):
     segments = sorted(load_segments(sluggified_name), key=lambda s: s.get('position', 0))
 
     # Re-evaluate warnings on POST to ensure current state
-    event_warnings = []
-    if event.get('Status') == 'Past':
-        all_matches_data = load_matches(sluggified_name)
-        for segment in segments:
-            if segment.get('type') == 'Match' and segment.get('match_id'):
-                match_id = segment['match_id']
-                match = next((m for m in all_matches_data if m.get('match_id') == match_id), None)
-                if match and match.get('warnings'):
-                    for warning in match['warnings']:
-                        event_warnings.append(f"Segment {segment['position']}: {warning}")
+    event_warnings = _get_event_warnings(event)
 
     if event_warnings and not request.form.get('acknowledge_warnings'):
         flash('Please acknowledge the warnings before finalizing the event.', 'danger')
@@ -177,81 +229,46 @@ def finalize_event(event_name):
         prefs = load_preferences() # Load prefs for template
         return render_template('booker/events/form.html', event=event, segments=segments, status_options=STATUS_OPTIONS, original_name=event_name, event_warnings=event_warnings, prefs=prefs)
 
-    all_tagteams = load_tagteams()
-    for segment in segments:
-        if segment.get('type') == 'Match' and segment.get('match_id'):
-            match = get_match_by_id(_slugify(event_name), segment['match_id'])
-            if not match: continue
-            all_teams_in_match = _get_all_tag_teams_involved(match.get('sides', []), all_tagteams)
-            for team_name in all_teams_in_match:
-                team_result = match['team_results'].get(team_name)
-                if team_result:
-                    update_tagteam_record(team_name, team_result)
-                    team_data = get_tagteam_by_name(team_name)
-                    if team_data and team_data.get('Members'):
-                        for member_name in team_data['Members'].split('|'):
-                            update_wrestler_record(member_name, 'tag', team_result)
-            all_wrestlers_in_match = _get_all_wrestlers_involved(match.get('sides', []))
-            for wrestler_name in all_wrestlers_in_match:
-                result = match['individual_results'].get(wrestler_name)
-                if result:
-                    record_match_class = None
-                    if match.get('match_class') == 'singles':
-                        record_match_class = 'singles'
-                    elif match.get('match_class') == 'tag':
-                        record_match_class = 'tag'
-                    
-                    if record_match_class:
-                        update_wrestler_record(wrestler_name, record_match_class, result)
-            belt_name = match.get('match_championship')
-            if belt_name:
-                belt = get_belt_by_name(belt_name)
-                winning_side_idx = match.get('winning_side_index', -1)
-                if belt and belt['Status'] == 'Active' and winning_side_idx != -1:
-                    winning_side = match['sides'][winning_side_idx]
-                    winner_name = None
-                    if belt['Holder_Type'] == 'Singles' and len(winning_side) == 1:
-                        winner_name = winning_side[0]
-                    elif belt['Holder_Type'] == 'Tag-Team':
-                        winning_teams = _get_all_tag_teams_involved([winning_side], all_tagteams)
-                        if winning_teams: winner_name = winning_teams[0]
-                    if winner_name and belt.get('Current_Holder') != winner_name:
-                        process_championship_change(belt, winner_name, event['Date'])
-                    elif winner_name and belt.get('Current_Holder') == winner_name:
-                        history = load_history_for_belt(belt['ID'])
-                        for reign in history:
-                            if reign.get('Champion_Name') == belt['Current_Holder'] and not reign.get('Date_Lost'):
-                                reign['Defenses'] = reign.get('Defenses', 0) + 1
-                                update_reign_in_history(reign['Reign_ID'], reign)
-                                break
-    
-    # Generate consolidated event summary
-    prefs = load_preferences()
-    summary_parts = []
-    
-    for segment in segments:
-        # Load match data if it's a match to check visibility settings
-        match = None
-        if segment.get('type') == 'Match' and segment.get('match_id'):
-            match = get_match_by_id(_slugify(event_name), segment['match_id'])
-            # Skip if match summary is hidden
-            if match and match.get('match_visibility', {}).get('hide_summary'):
-                continue # Skip this segment entirely from the summary
-
-        summary_content = load_summary_content(segment.get('summary_file'))
-        if segment.get('type') == 'Match':
-            summary_parts.append(f"### {segment['header']}\n#### {segment['participants_display']}\n\n{summary_content}")
-        elif prefs.get('fan_mode_show_non_match_headers'):
-            summary_parts.append(f"### {segment['header']}\n\n{summary_content}")
-        else:
-            summary_parts.append(summary_content)
-            
-    final_summary = "\n\n---\n\n".join(summary_parts)
-    summary_file_path = save_event_summary(_slugify(event_name), final_summary)
-    event['event_summary_file'] = summary_file_path
+    # Records, championships and the event summary are updated in the background; the event
+    # is only marked finalized once every step has been applied, so the job cannot be cancelled
+    job_id = submit_job('finalize_event', f"Finalize {event_name}", finalize_event_results, event_name,
+                        collections=('wrestlers', 'tagteams', 'belts', 'belt_history', 'events', 'standings', 'ratings'),
+                        cancellable=False, return_url=url_for('events.edit_event', event_name=event_name))
+    return redirect(url_for('jobs.view_job', job_id=job_id))
 
-    event['Finalized'] = True
-    update_event(event_name, event)
-    flash(f"Event '{event_name}' has been finalized and records updated!", 'success')
-    return redirect(url_for('events.edit_event', event_name=event_name))
 
+@events_bp.route('/finalize-preview/<string:event_name>')
+def finalize_preview(event_name):
+    """Shows everything finalizing an event would change, without changing anything."""
+    event = get_event_by_name(event_name)
+    if not event or event.get('Finalized'):
+        flash('Event not found or already finalized.', 'warning')
+        return redirect(url_for('events.list_events'))
+    plan = preview_event_results(event_name)
+    return render_template('booker/events/finalize_preview.html', event=event, plan=plan)
+
+@events_bp.route('/ai-write-card/<string:event_name>', methods=['POST'])
+def ai_write_card(event_name):
+    """Queues AI summaries for every segment on an event's card."""
+    event = get_event_by_name(event_name)
+    if not event or event.get('Finalized'):
+        flash('Event not found or already finalized.', 'warning')
+        return redirect(url_for('events.list_events'))
+    try:
+        get_litellm_model(load_preferences())
+    except AIConfigError as e:
+        flash(str(e), 'danger')
+        return redirect(url_for('events.edit_event', event_name=event_name))
+
+    direction = {
+        'feud_summary': request.form.get('feud_summary', '').strip(),
+        'detail_level': request.form.get('detail_level', 'Brief Summary'),
+        'narrative_style': request.form.get('narrative_style', 'Standard Commentary'),
+        'include_entrances': 'include_entrances' in request.form,
+        'commentary_level': request.form.get('commentary_level', 'None'),
+    }
+    job_id = submit_job('ai_write_card', f"AI write card for {event_name}", generate_card_summaries,
+                        event_name, direction, overwrite_existing='overwrite_existing' in request.form,
+                        use_cache='bypass_cache' not in request.form,
+                        collections=('events',), return_url=url_for('events.edit_event', event_name=event_name))
+    return redirect(url_for('jobs.view_job', job_id=job_id))
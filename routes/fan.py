@@ -1,51 +1,83 @@
 import datetime
-from flask import Blueprint, render_template, flash, redirect, url_for
-from src.prefs import load_preferences
-from src.wrestlers import load_wrestlers, get_wrestler_by_name
-from src.tagteams import load_tagteams, get_tagteam_by_name
-from src.divisions import load_divisions
-from src.events import load_events, get_event_by_name, load_event_summary_content, get_event_by_slug
+from flask import Blueprint, render_template, flash, redirect, url_for, request
+from markupsafe import Markup
+from src.league import get_league_snapshot
+from src.belts import _get_belts_file_path
+from src.tagteams import _get_tagteams_file_path
+from src.wrestlers import _get_wrestlers_file_path
+from src.divisions import _get_divisions_file_path
+from src.standings import build_division_standings, FORM_LENGTH, MIN_MATCHES_FOR_PERCENTAGE
+from src.ratings import get_rating, get_team_rating, _get_ratings_file_path
 import markdown
-from src.segments import load_segments, get_match_by_id, _slugify # Import _slugify for event_slug
-from src.belts import load_belts, get_belt_by_id, load_history_for_belt, get_belt_by_name
-from src.news import load_news_posts, get_news_post_by_id
+from src.segments import _slugify # Import _slugify for event_slug
 from src.date_utils import get_current_working_date # Import the new utility
 
 fan_bp = Blueprint('fan', __name__, url_prefix='/fan')
 
-@fan_bp.route('/champions')
-def champions_list():
-    """Renders the fan mode champions list page."""
-    prefs = load_preferences()
-    all_belts = load_belts()
-    all_belts.sort(key=lambda b: b.get('Display_Position', 0))
-    all_tagteams = load_tagteams()
+ROSTER_SORT_ORDERS = ('Alphabetical', 'Total Wins', 'Win Percentage', 'Power Rating')
 
-    for belt in all_belts:
-        belt['display_holder'] = belt.get('Current_Holder', '')
+def _get_belts_with_holders(league):
+    """Returns the league's belts in display order, each copied with a 'display_holder' for the templates."""
+    belts = []
+    for belt in sorted(league.belts, key=lambda b: b.get('Display_Position', 0)):
+        display_holder = belt.get('Current_Holder', '')
         if belt.get('Holder_Type') == 'Tag-Team' and belt.get('Current_Holder'):
             team_name = belt['Current_Holder']
-            tagteam = next((tt for tt in all_tagteams if tt['Name'] == team_name), None)
+            tagteam = league.tagteams_by_name.get(team_name)
             if tagteam:
                 members = [m for m in [tagteam.get('Member1'), tagteam.get('Member2')] if m]
                 if members:
-                    belt['display_holder'] = f"{team_name} ({', '.join(members)})"
-    
-    return render_template('fan/champions_list.html', belts=all_belts, prefs=prefs)
+                    display_holder = f"{team_name} ({', '.join(members)})"
+        belts.append(dict(belt, display_holder=display_holder))
+    return belts
+
+_champions_fragments = {} # Variant -> (belts and tag teams versions, rendered HTML)
+
+def render_champions_fragment(league, variant='list'):
+    """
+    Returns the rendered champions block. It only depends on the belts and tag teams, so it is
+    rendered once per version of those files and reused by every page that shows it.
+    """
+    key = (league.get_version(_get_belts_file_path()), league.get_version(_get_tagteams_file_path()), request.script_root)
+    cached = _champions_fragments.get(variant)
+    if cached and cached[0] == key:
+        return cached[1]
+    belts = _get_belts_with_holders(league)
+    html = Markup(render_template('fan/_champions.html', belts=belts, variant=variant)) if belts else Markup('')
+    _champions_fragments[variant] = (key, html) # Replacing the entry is atomic, so no lock is needed
+    return html
+
+def _with_champion_title(record, league):
+    """Returns a copy of a wrestler or tag team with 'current_champion_title_display' set if it holds a belt."""
+    record = dict(record)
+    if record.get('Belt'):
+        belt_obj = league.get_belt_by_name(record['Belt'])
+        if belt_obj:
+            record['current_champion_title_display'] = belt_obj.get('Champion_Title', 'Champion')
+        else:
+            record['current_champion_title_display'] = record['Belt'] # Fallback to belt name
+    return record
+
+@fan_bp.route('/champions')
+def champions_list():
+    """Renders the fan mode champions list page."""
+    league = get_league_snapshot()
+    return render_template('fan/champions_list.html', champions_html=render_champions_fragment(league), prefs=league.prefs)
 
 @fan_bp.route('/belt/<string:belt_id>')
 def belt_history(belt_id):
     """Renders the fan mode belt history page for a specific belt."""
-    prefs = load_preferences() # Load preferences for _fan_base.html
-    belt = get_belt_by_id(belt_id)
+    league = get_league_snapshot()
+    prefs = league.prefs # Preferences for _fan_base.html
+    belt = league.belts_by_id.get(belt_id)
     if not belt:
         flash("Belt not found.", 'danger')
         return redirect(url_for('fan.champions_list'))
 
-    history = load_history_for_belt(belt_id)
+    history = [dict(reign) for reign in league.reigns_by_belt.get(belt_id, ())]
     history.sort(key=lambda r: datetime.datetime.strptime(r['Date_Won'], '%Y-%m-%d'), reverse=True)
 
-    current_working_date = get_current_working_date() # Use the new utility function
+    current_working_date = get_current_working_date(prefs) # Use the new utility function
     
     for reign in history:
         date_won = datetime.datetime.strptime(reign['Date_Won'], '%Y-%m-%d')
@@ -76,12 +108,13 @@ def _sort_key_ignore_the(name):
 @fan_bp.route('/home')
 def home():
     """Renders the fan home page."""
-    prefs = load_preferences()
+    league = get_league_snapshot()
+    prefs = league.prefs
 
     # 1. Handle News
     news_posts = []
     if prefs.get('fan_mode_home_show_news') != 'Off':
-        all_news = load_news_posts()
+        all_news = list(league.news)
         # Sort news posts by date descending (newest first)
         all_news.sort(key=lambda p: datetime.datetime.strptime(p.get('Date', '1900-01-01'), '%Y-%m-%d'), reverse=True)
         
@@ -89,14 +122,12 @@ def home():
         news_posts = all_news[:num_news]
 
         if prefs.get('fan_mode_home_show_news') == 'Show Full Posts':
-            for post in news_posts:
-                post['RenderedContent'] = markdown.markdown(post.get('Content', ''))
+            news_posts = [dict(post, RenderedContent=markdown.markdown(post.get('Content', ''))) for post in news_posts]
 
     # 2. Handle Upcoming Events
     upcoming_events = []
     if prefs.get('fan_mode_show_future_events'):
-        all_events = load_events()
-        for event in all_events:
+        for event in league.events:
             if event.get('Status') == 'Future':
                 upcoming_events.append(event)
         # Sort upcoming events by date ascending
@@ -107,8 +138,7 @@ def home():
     # 3. Handle Recent Events
     recent_events = []
     if prefs.get('fan_mode_home_show_recent_events'):
-        all_events = load_events()
-        for event in all_events:
+        for event in league.events:
             if event.get('Finalized') == True:
                 recent_events.append(event)
         # Sort finalized events by date descending (newest first)
@@ -116,25 +146,12 @@ def home():
         num_events = int(prefs.get('fan_mode_home_number_events', 5))
         recent_events = recent_events[:num_events]
         # Ensure event_slug is present for linking in the template
-        for event in recent_events:
-            event['event_slug'] = _slugify(event.get('Event_Name', ''))
+        recent_events = [dict(event, event_slug=_slugify(event.get('Event_Name', ''))) for event in recent_events]
 
     # 4. Handle Champions
-    belts = []
+    champions_html = ''
     if prefs.get('fan_mode_home_show_champions'):
-        belts = load_belts()
-        belts.sort(key=lambda b: b.get('Display_Position', 0))
-        all_tagteams = load_tagteams()
-
-        for belt in belts:
-            belt['display_holder'] = belt.get('Current_Holder', '')
-            if belt.get('Holder_Type') == 'Tag-Team' and belt.get('Current_Holder'):
-                team_name = belt['Current_Holder']
-                tagteam = next((tt for tt in all_tagteams if tt['Name'] == team_name), None)
-                if tagteam:
-                    members = [m for m in [tagteam.get('Member1'), tagteam.get('Member2')] if m]
-                    if members:
-                        belt['display_holder'] = f"{team_name} ({', '.join(members)})"
+        champions_html = render_champions_fragment(league, 'home')
 
     return render_template(
         'fan/home.html',
@@ -142,39 +159,29 @@ def home():
         news_posts=news_posts,
         upcoming_events=upcoming_events,
         recent_events=recent_events,
-        belts=belts
+        champions_html=champions_html
     )
 
 @fan_bp.route('/wrestler/<string:wrestler_name>')
 def view_wrestler(wrestler_name):
     """Renders the fan view page for a specific wrestler."""
-    prefs = load_preferences()
-    wrestler = get_wrestler_by_name(wrestler_name)
+    league = get_league_snapshot()
+    prefs = league.prefs
+    wrestler = league.wrestlers_by_name.get(wrestler_name)
 
     if not wrestler:
         flash(f"Wrestler '{wrestler_name}' not found.", 'danger')
         return redirect(url_for('fan.roster'))
 
     # Add champion_title_display for individual wrestler view
-    if wrestler.get('Belt'):
-        belt_obj = get_belt_by_name(wrestler['Belt'])
-        if belt_obj:
-            wrestler['current_champion_title_display'] = belt_obj.get('Champion_Title', 'Champion')
-        else:
-            wrestler['current_champion_title_display'] = wrestler['Belt'] # Fallback to belt name
+    wrestler = _with_champion_title(wrestler, league)
 
     # Calculate total record
-    singles_wins = int(wrestler.get('Singles_Wins', 0))
-    singles_losses = int(wrestler.get('Singles_Losses', 0))
-    singles_draws = int(wrestler.get('Singles_Draws', 0))
-    tag_wins = int(wrestler.get('Tag_Wins', 0))
-    tag_losses = int(wrestler.get('Tag_Losses', 0))
-    tag_draws = int(wrestler.get('Tag_Draws', 0))
-
+    record = league.wrestler_records.row(wrestler_name)
     total_record = {
-        'wins': singles_wins + tag_wins,
-        'losses': singles_losses + tag_losses,
-        'draws': singles_draws + tag_draws
+        'wins': record['Singles_Wins'] + record['Tag_Wins'],
+        'losses': record['Singles_Losses'] + record['Tag_Losses'],
+        'draws': record['Singles_Draws'] + record['Tag_Draws']
     }
 
     return render_template('fan/wrestler.html', wrestler=wrestler, prefs=prefs, total_record=total_record)
@@ -182,161 +189,130 @@ def view_wrestler(wrestler_name):
 @fan_bp.route('/tagteam/<string:tagteam_name>')
 def view_tagteam(tagteam_name):
     """Renders the fan view page for a specific tag team."""
-    prefs = load_preferences()
-    tagteam = get_tagteam_by_name(tagteam_name)
+    league = get_league_snapshot()
+    prefs = league.prefs
+    tagteam = league.tagteams_by_name.get(tagteam_name)
 
     if not tagteam:
         flash(f"Tag Team '{tagteam_name}' not found.", 'danger')
         return redirect(url_for('fan.roster'))
 
     # Add champion_title_display for individual tagteam view
-    if tagteam.get('Belt'):
-        belt_obj = get_belt_by_name(tagteam['Belt'])
-        if belt_obj:
-            tagteam['current_champion_title_display'] = belt_obj.get('Champion_Title', 'Champion')
-        else:
-            tagteam['current_champion_title_display'] = tagteam['Belt'] # Fallback to belt name
+    tagteam = _with_champion_title(tagteam, league)
 
     return render_template('fan/tagteam.html', tagteam=tagteam, prefs=prefs)
 
 @fan_bp.route('/event/<string:event_slug>')
 def view_event(event_slug):
     """Renders the fan view page for a specific event."""
-    prefs = load_preferences()
-    event = get_event_by_slug(event_slug) # Use the new function to find by slug
+    league = get_league_snapshot()
+    prefs = league.prefs
+    event = league.events_by_slug.get(event_slug) # Find the event by its slugified name
 
     if not event:
         flash(f"Event '{event_slug}' not found.", 'danger')
         return redirect(url_for('fan.home')) # Redirect to fan home if event not found
 
-    segments = load_segments(_slugify(event_slug))
-    segments.sort(key=lambda s: s.get('position', 9999)) # Sort segments by position
-
-    # Iterate through segments to merge match visibility data
-    for segment in segments:
-        if segment.get('type') == 'Match' and segment.get('match_id'):
-            match_data = get_match_by_id(_slugify(event_slug), segment['match_id'])
-            if match_data and 'match_visibility' in match_data:
-                # Merge visibility flags into the segment dictionary
-                segment['on_card'] = not match_data['match_visibility'].get('hide_from_card', False)
-                segment['include_in_results'] = not match_data['match_visibility'].get('hide_result', False)
-                # Note: hide_summary is handled in the finalize_event process, not directly here for display logic
-            else:
-                # Default to visible if match data or visibility info is missing
-                segment['on_card'] = True
-                segment['include_in_results'] = True
-        else:
-            # Non-match segments are always considered "on card" and "in results" for display purposes
-            segment['on_card'] = True
-            segment['include_in_results'] = True
-
-    event_summary_content = load_event_summary_content(event.get('event_summary_file'))
+    card = league.get_event_card(event)
 
     return render_template(
         'fan/event.html',
         event=event,
-        segments=segments,
+        segments=card['segments'],
         prefs=prefs,
-        event_summary_content=event_summary_content
+        event_summary_content=card['summary']
     )
 
-@fan_bp.route('/roster')
-def roster():
-    """Renders the fan roster page with sorted wrestlers and tag teams."""
-    prefs = load_preferences()
-    all_wrestlers_raw = load_wrestlers()
-    all_tagteams_raw = load_tagteams()
-    all_divisions = load_divisions()
-
-    # Filter out wrestlers and tag teams hidden from the fan roster
-    active_wrestlers = [w for w in all_wrestlers_raw if w.get('Status') == 'Active' and not w.get('Hide_From_Fan_Roster', False)]
-    active_tagteams = [tt for tt in all_tagteams_raw if tt.get('Status') == 'Active' and not tt.get('Hide_From_Fan_Roster', False)]
+_roster_cache = {} # Sort order -> (roster file versions, roster grouped by division)
+
+def _roster_sort_key(record, sort_order, league, is_tagteam):
+    """Returns an entry's roster sort key, read from the snapshot's record tables or power ratings."""
+    name = _sort_key_ignore_the(record.get('Name', '')) if is_tagteam else record.get('Name', '')
+    if sort_order == 'Alphabetical':
+        return name
+    if sort_order == 'Power Rating':
+        if is_tagteam:
+            return get_team_rating(league.ratings, record.get('Members', '').split('|'))
+        return get_rating(league.ratings, record.get('Name'))
+    records = league.tagteam_records if is_tagteam else league.wrestler_records
+    wins = records.get(record.get('Name'), 'Wins' if is_tagteam else 'Singles_Wins')
+    if sort_order == 'Total Wins':
+        return wins
+    losses = records.get(record.get('Name'), 'Losses' if is_tagteam else 'Singles_Losses')
+    total_matches = wins + losses
+    # If less than 5 matches or 0-0 record, sort alphabetically at the bottom
+    if total_matches < 5:
+        return (-1.0, name) # -1.0 ensures it's at the bottom when sorting descending
+    return (wins / total_matches, name) # Win percentage, then name for tie-breaking
+
+def _build_roster(league, sort_order):
+    """
+    Groups the active fan roster by division in one pass over the wrestlers and tag teams, then
+    sorts each group. The result is cached per sort order until a roster file is saved.
+    """
+    key = tuple(league.get_version(path) for path in (_get_wrestlers_file_path(), _get_tagteams_file_path(),
+                                                       _get_divisions_file_path(), _get_belts_file_path(),
+                                                       _get_ratings_file_path()))
+    cached = _roster_cache.get(sort_order)
+    if cached and cached[0] == key:
+        return cached[1]
+
+    # Bucket wrestlers and tag teams hidden from neither the fan roster nor inactive by division ID
+    buckets = {}
+    for records, slot in ((league.wrestlers, 0), (league.tagteams, 1)):
+        for record in records:
+            if record.get('Status') == 'Active' and not record.get('Hide_From_Fan_Roster', False):
+                buckets.setdefault(record.get('Division'), ([], []))[slot].append(record)
 
-    # Prepare a dictionary to hold roster data, grouped by division
     # Sort divisions by Display_Position for consistent display
-    sorted_divisions = sorted(all_divisions, key=lambda d: d.get('Display_Position', 0))
-    
     roster_by_division = {}
-    for division in sorted_divisions:
-        division_id = division.get('ID')
-        division_name = division.get('Name')
-        # Store the division type as well for template logic
-        roster_by_division[division_name] = {'wrestlers': [], 'tagteams': [], 'type': division.get('Holder_Type')}
-
-        # Add wrestlers to their division
-        for wrestler in active_wrestlers:
-            if wrestler.get('Division') == division_id:
-                if wrestler.get('Belt'):
-                    belt_obj = get_belt_by_name(wrestler['Belt'])
-                    if belt_obj:
-                        wrestler['current_champion_title_display'] = belt_obj.get('Champion_Title', 'Champion')
-                    else:
-                        wrestler['current_champion_title_display'] = wrestler['Belt'] # Fallback to belt name
-                roster_by_division[division_name]['wrestlers'].append(wrestler)
-        
-        # Add tag teams to their division
-        for tagteam in active_tagteams:
-            if tagteam.get('Division') == division_id:
-                if tagteam.get('Belt'):
-                    belt_obj = get_belt_by_name(tagteam['Belt'])
-                    if belt_obj:
-                        tagteam['current_champion_title_display'] = belt_obj.get('Champion_Title', 'Champion')
-                    else:
-                        tagteam['current_champion_title_display'] = tagteam['Belt'] # Fallback to belt name
-                roster_by_division[division_name]['tagteams'].append(tagteam)
+    descending = sort_order in ('Total Wins', 'Win Percentage', 'Power Rating')
+    for division in sorted(league.divisions, key=lambda d: d.get('Display_Position', 0)):
+        wrestlers, tagteams = buckets.get(division.get('ID'), ([], []))
+        if sort_order in ROSTER_SORT_ORDERS:
+            if division.get('Holder_Type') == 'Singles': # Only sort wrestlers if the division is Singles
+                wrestlers = sorted(wrestlers, key=lambda w: _roster_sort_key(w, sort_order, league, False), reverse=descending)
+            tagteams = sorted(tagteams, key=lambda t: _roster_sort_key(t, sort_order, league, True), reverse=descending)
+        roster_by_division[division.get('Name')] = {
+            'wrestlers': [_with_champion_title(w, league) for w in wrestlers],
+            'tagteams': [_with_champion_title(t, league) for t in tagteams],
+            'type': division.get('Holder_Type'),
+            'id': division.get('ID'),
+        }
 
     # Filter out divisions that have no active wrestlers or tagteams
-    # This needs to be done after sorting and grouping
-    filtered_roster_by_division = {
-        div_name: data for div_name, data in roster_by_division.items()
-        if data['wrestlers'] or data['tagteams']
-    }
+    roster_by_division = {name: data for name, data in roster_by_division.items() if data['wrestlers'] or data['tagteams']}
+    _roster_cache[sort_order] = (key, roster_by_division)
+    return roster_by_division
+
+@fan_bp.route('/roster')
+def roster():
+    """Renders the fan roster page with sorted wrestlers and tag teams."""
+    league = get_league_snapshot()
+    prefs = league.prefs
+    roster_data = _build_roster(league, prefs.get('fan_mode_roster_sort_order', 'Alphabetical'))
+    return render_template('fan/roster.html', roster_data=roster_data, prefs=prefs)
+
+@fan_bp.route('/division/<string:division_id>')
+def division_standings(division_id):
+    """Renders the fan standings page for a division."""
+    league = get_league_snapshot()
+    prefs = league.prefs
+    division = league.divisions_by_id.get(division_id)
+    if not division or not prefs.get('fan_mode_show_records'):
+        flash("Division standings not found.", 'danger')
+        return redirect(url_for('fan.roster'))
 
-    # Sorting logic
-    sort_order = prefs.get('fan_mode_roster_sort_order', 'Alphabetical')
-
-    # Apply sorting to the filtered data
-    for division_name, data in filtered_roster_by_division.items():
-        # Sort wrestlers
-        if data['type'] == 'Singles': # Only sort wrestlers if the division is Singles
-            if sort_order == 'Alphabetical':
-                data['wrestlers'].sort(key=lambda w: w.get('Name', ''))
-            elif sort_order == 'Total Wins':
-                data['wrestlers'].sort(key=lambda w: int(w.get('Singles_Wins', 0)), reverse=True)
-            elif sort_order == 'Win Percentage':
-                def get_wrestler_win_percentage_key(wrestler):
-                    wins = int(wrestler.get('Singles_Wins', 0))
-                    losses = int(wrestler.get('Singles_Losses', 0))
-                    total_matches = wins + losses
-                    # If less than 5 matches or 0-0 record, sort alphabetically at the bottom
-                    if total_matches < 5 or (wins == 0 and losses == 0):
-                        return (-1.0, wrestler.get('Name', '')) # -1.0 ensures it's at the bottom when sorting descending
-                    return (wins / total_matches, wrestler.get('Name', '')) # Win percentage, then name for tie-breaking
-                data['wrestlers'].sort(key=get_wrestler_win_percentage_key, reverse=True)
-
-        # Sort tag teams
-        if sort_order == 'Alphabetical':
-            data['tagteams'].sort(key=lambda tt: _sort_key_ignore_the(tt.get('Name', '')))
-        elif sort_order == 'Total Wins':
-            data['tagteams'].sort(key=lambda tt: int(tt.get('Wins', 0)), reverse=True)
-        elif sort_order == 'Win Percentage':
-            def get_tagteam_win_percentage_key(tagteam):
-                wins = int(tagteam.get('Wins', 0))
-                losses = int(tagteam.get('Losses', 0))
-                total_matches = wins + losses
-                # If less than 5 matches or 0-0 record, sort alphabetically at the bottom
-                if total_matches < 5 or (wins == 0 and losses == 0):
-                    return (-1.0, _sort_key_ignore_the(tagteam.get('Name', '')))
-                return (wins / total_matches, _sort_key_ignore_the(tagteam.get('Name', '')))
-            data['tagteams'].sort(key=get_tagteam_win_percentage_key, reverse=True)
-
-    return render_template('fan/roster.html', roster_data=filtered_roster_by_division, prefs=prefs)
+    standings = build_division_standings(division, league.wrestlers, league.tagteams, league.standings)
+    return render_template('fan/division.html', division=division, standings=standings, prefs=prefs,
+                           form_length=FORM_LENGTH, min_matches=MIN_MATCHES_FOR_PERCENTAGE)
 
 @fan_bp.route('/events')
 def events_list():
     """Renders the fan mode events index page."""
-    prefs = load_preferences()
-    all_events = load_events()
+    league = get_league_snapshot()
+    prefs = league.prefs
+    all_events = league.events
 
     upcoming_events = []
     if prefs.get('fan_mode_show_future_events'):
@@ -368,8 +344,9 @@ def events_list():
 @fan_bp.route('/events/<int:year>')
 def archive_by_year(year):
     """Renders the fan mode events archive page for a specific year."""
-    prefs = load_preferences() # Load preferences here
-    all_events = load_events()
+    league = get_league_snapshot()
+    prefs = league.prefs
+    all_events = league.events
     archive_events = []
 
     for event in all_events:
@@ -397,8 +374,9 @@ def archive_by_year(year):
 @fan_bp.route('/news')
 def news_list():
     """Renders the fan mode news index page."""
-    prefs = load_preferences()
-    all_news_posts = load_news_posts()
+    league = get_league_snapshot()
+    prefs = league.prefs
+    all_news_posts = league.news
 
     # Get unique years from news posts for archive links
     years = sorted(list(set(datetime.datetime.strptime(p.get('Date'), '%Y-%m-%d').year for p in all_news_posts if p.get('Date'))), reverse=True)
@@ -413,8 +391,9 @@ def news_list():
 @fan_bp.route('/news/<int:year>')
 def news_archive_by_year(year):
     """Renders the fan mode news archive page for a specific year."""
-    prefs = load_preferences()
-    all_news_posts = load_news_posts()
+    league = get_league_snapshot()
+    prefs = league.prefs
+    all_news_posts = league.news
     archive_news_posts = []
 
     for post in all_news_posts:
@@ -439,14 +418,15 @@ def news_archive_by_year(year):
 @fan_bp.route('/news/<string:news_id>')
 def view_news(news_id):
     """Renders the fan mode view page for a specific news post."""
-    prefs = load_preferences()
-    news_post = get_news_post_by_id(news_id)
+    league = get_league_snapshot()
+    prefs = league.prefs
+    news_post = league.news_by_id.get(news_id)
 
     if not news_post:
         flash("News post not found.", 'danger')
         return redirect(url_for('fan.news_list'))
     
-    news_post['RenderedContent'] = markdown.markdown(news_post.get('Content', ''))
+    news_post = dict(news_post, RenderedContent=markdown.markdown(news_post.get('Content', '')))
 
     return render_template(
         'fan/news_view.html',
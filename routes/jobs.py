@@ -0,0 +1,35 @@
+from flask import Blueprint, render_template, redirect, url_for, flash, jsonify
+from src.jobs import list_jobs, get_job, cancel_job, is_job_finished
+
+jobs_bp = Blueprint('jobs', __name__, url_prefix='/jobs')
+
+@jobs_bp.route('/')
+def list_jobs_route():
+    """Renders the list of recent background jobs."""
+    return render_template('tools/jobs.html', jobs=list_jobs())
+
+@jobs_bp.route('/<string:job_id>')
+def view_job(job_id):
+    """Renders the progress page for a single job."""
+    job = get_job(job_id)
+    if not job:
+        flash('Job not found.', 'danger')
+        return redirect(url_for('jobs.list_jobs_route'))
+    return render_template('tools/job.html', job=job, finished=is_job_finished(job))
+
+@jobs_bp.route('/<string:job_id>/status')
+def job_status(job_id):
+    """Returns a job record as JSON for progress polling."""
+    job = get_job(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found.'}), 404
+    return jsonify(dict(job, Is_Finished=is_job_finished(job)))
+
+@jobs_bp.route('/<string:job_id>/cancel', methods=['POST'])
+def cancel_job_route(job_id):
+    """Requests cancellation of a queued or running job."""
+    if cancel_job(job_id):
+        flash('Cancellation requested.', 'info')
+    else:
+        flash('This job can no longer be cancelled.', 'warning')
+    return redirect(url_for('jobs.view_job', job_id=job_id))
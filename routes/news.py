@@ -3,7 +3,7 @@ from src.news import (
     load_news_posts, get_news_post_by_id, add_news_post,
     update_news_post, delete_news_post, NEWS_DATE_FORMAT
 )
-from src.prefs import load_preferences, save_preferences # Import save_preferences
+from src.prefs import load_preferences, update_preferences
 from src.date_utils import get_current_working_date # Import the new utility
 from datetime import datetime
 import markdown
@@ -59,8 +59,7 @@ def create_news():
 
         # Update game_date if checkbox is checked and mode is 'latest-event-date'
         if prefs.get('game_date_mode') == 'latest-event-date' and request.form.get('update_game_date'):
-            prefs['game_date'] = news_data['Date']
-            save_preferences(prefs)
+            update_preferences({'game_date': news_data['Date']})
             flash(f"Game date updated to {news_data['Date']}.", 'info')
 
         flash('News post created successfully!', 'success')
@@ -97,8 +96,7 @@ def edit_news(news_id):
 
         # Update game_date if checkbox is checked and mode is 'latest-event-date'
         if prefs.get('game_date_mode') == 'latest-event-date' and request.form.get('update_game_date'):
-            prefs['game_date'] = news_data['Date']
-            save_preferences(prefs)
+            update_preferences({'game_date': news_data['Date']})
             flash(f"Game date updated to {news_data['Date']}.", 'info')
 
         flash('News post updated successfully!', 'success')
@@ -1,17 +1,23 @@
 import os
 from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
 from werkzeug.utils import secure_filename
-from src.prefs import load_preferences, save_preferences
+from src.prefs import load_preferences, update_preferences
 from src.wrestlers import reset_all_wrestler_records
 from src.tagteams import reset_all_tagteam_records, recalculate_all_tagteam_weights # Import new function
+from src.standings import reset_standings
+from src.ratings import recompute_ratings
 from src.system import delete_all_temporary_files, get_league_logo_path, LEAGUE_LOGO_FILENAME, INCLUDES_DIR
 from src.date_utils import get_current_working_date # Import the new utility
+from src.jobs import submit_job
+from src.ai_cache import get_cache_stats, clear_cache
+from src.ai_mock import MOCK_PROVIDER, MOCK_MODELS
 
 prefs_bp = Blueprint('prefs', __name__, url_prefix='/prefs')
 
 AVAILABLE_MODELS = {
     "Google": ["gemini-2.5-pro", "gemini-2.5-flash"],
-    "OpenAI": ["gpt-5.0", "gpt-4.0", "gpt-3.5"]
+    "OpenAI": ["gpt-5.0", "gpt-4.0", "gpt-3.5"],
+    MOCK_PROVIDER: MOCK_MODELS # Offline provider for testing and benchmarks
 }
 
 @prefs_bp.route('/preferences', methods=['GET', 'POST'])
@@ -40,6 +46,12 @@ def general_prefs():
         ai_model = request.form.get('ai_model', '')
         google_api_key = request.form.get('google_api_key', '')
         openai_api_key = request.form.get('openai_api_key', '')
+        ai_concurrency_limit = max(int(request.form.get('ai_concurrency_limit', 4)), 1)
+        ai_max_retries = max(int(request.form.get('ai_max_retries', 2)), 0)
+        ai_cache_ttl_hours = max(float(request.form.get('ai_cache_ttl_hours', 168)), 0)
+        ai_cache_max_entries = max(int(request.form.get('ai_cache_max_entries', 500)), 1)
+        ai_mock_latency_ms = max(int(request.form.get('ai_mock_latency_ms', 800)), 0)
+        ai_mock_error_rate = min(max(float(request.form.get('ai_mock_error_rate', 0.0)), 0.0), 1.0)
 
         # New Game Date preferences
         game_date_mode = request.form.get('game_date_mode', 'real-time')
@@ -48,6 +60,8 @@ def general_prefs():
         # New Weight Unit preference
         weight_unit = request.form.get('weight_unit', 'lbs.')
 
+        snapshot_retention = max(int(request.form.get('snapshot_retention', 10)), 1)
+
         updated_prefs = {
             "league_name": league_name,
             "league_short": league_short,
@@ -69,11 +83,17 @@ def general_prefs():
             "ai_model": ai_model,
             "google_api_key": google_api_key,
             "openai_api_key": openai_api_key,
+            "ai_concurrency_limit": ai_concurrency_limit,
+            "ai_max_retries": ai_max_retries,
+            "ai_cache_ttl_hours": ai_cache_ttl_hours,
+            "ai_cache_max_entries": ai_cache_max_entries,
+            "ai_mock_latency_ms": ai_mock_latency_ms,
+            "ai_mock_error_rate": ai_mock_error_rate,
             "game_date_mode": game_date_mode, # Save new preference
-            "game_date": prefs.get("game_date"), # Preserve existing game_date, it's updated elsewhere
-            "weight_unit": weight_unit # Save new weight unit preference
+            "weight_unit": weight_unit, # Save new weight unit preference
+            "snapshot_retention": snapshot_retention
         }
-        save_preferences(updated_prefs)
+        update_preferences(updated_prefs) # game_date is left as saved; it's updated by events/news
 
         # Handle logo upload
         if 'league_logo' in request.files:
@@ -109,19 +129,25 @@ def general_prefs():
 
     current_game_date = get_current_working_date().isoformat() # Get the current working date for display
 
-    return render_template('booker/prefs.html', prefs=prefs, league_logo_url=league_logo_url, available_models=AVAILABLE_MODELS, current_game_date=current_game_date)
+    return render_template('booker/prefs.html', prefs=prefs, league_logo_url=league_logo_url, available_models=AVAILABLE_MODELS, mock_provider=MOCK_PROVIDER, current_game_date=current_game_date, ai_cache_stats=get_cache_stats())
 
 @prefs_bp.route('/reset-records', methods=['POST'])
 def reset_records():
-    """Handles the resetting of all wrestler and tag team records."""
+    """Queues the resetting of all wrestler and tag team records."""
     if request.form.get('confirmation') == 'RESET':
-        reset_all_wrestler_records()
-        reset_all_tagteam_records()
-        flash('All wrestler and tag team win/loss records have been reset to 0.', 'success')
-    else:
-        flash('Confirmation text was incorrect. Records were not reset.', 'danger')
+        job_id = submit_job('reset_records', 'Reset win/loss records', _reset_records_job,
+                            collections=('wrestlers', 'tagteams', 'standings'), return_url=url_for('prefs.general_prefs'))
+        return redirect(url_for('jobs.view_job', job_id=job_id))
+    flash('Confirmation text was incorrect. Records were not reset.', 'danger')
     return redirect(url_for('prefs.general_prefs'))
 
+def _reset_records_job(progress=None):
+    """Background job body for resetting wrestler and tag team records."""
+    reset_all_wrestler_records(progress=progress)
+    reset_all_tagteam_records(progress=progress)
+    reset_standings()
+    return 'All wrestler and tag team win/loss records and division standings have been reset to 0.'
+
 @prefs_bp.route('/clear-temp-files', methods=['POST'])
 def clear_temp_files():
     """Handles the deletion of all temporary files."""
@@ -134,13 +160,38 @@ def clear_temp_files():
         flash('Confirmation text was incorrect. Temporary files were not cleared.', 'danger')
     return redirect(url_for('prefs.general_prefs'))
 
+@prefs_bp.route('/clear-ai-cache', methods=['POST'])
+def clear_ai_cache():
+    """Handles emptying the AI completion cache."""
+    if clear_cache():
+        flash('The AI response cache has been cleared.', 'success')
+    else:
+        flash('The AI response cache could not be cleared. It may be in use; please try again.', 'danger')
+    return redirect(url_for('prefs.general_prefs'))
+
 @prefs_bp.route('/recalculate-tagteam-weights', methods=['POST'])
 def recalculate_tagteam_weights_route():
-    """Handles the recalculation of all tag team weights."""
-    updated_count = recalculate_all_tagteam_weights()
+    """Queues the recalculation of all tag team weights."""
+    job_id = submit_job('recalculate_weights', 'Recalculate tag team weights', _recalculate_weights_job,
+                        collections=('tagteams',), return_url=url_for('prefs.general_prefs'))
+    return redirect(url_for('jobs.view_job', job_id=job_id))
+
+def _recalculate_weights_job(progress=None):
+    """Background job body for recalculating tag team weights."""
+    updated_count = recalculate_all_tagteam_weights(progress=progress)
     if updated_count > 0:
-        flash(f'Successfully recalculated weights for {updated_count} tag teams.', 'success')
-    else:
-        flash('No tag team weights needed recalculation.', 'info')
-    return redirect(url_for('prefs.general_prefs'))
+        return f'Successfully recalculated weights for {updated_count} tag teams.'
+    return 'No tag team weights needed recalculation.'
+
+@prefs_bp.route('/recalculate-ratings', methods=['POST'])
+def recalculate_ratings_route():
+    """Queues a full recalculation of the power ratings."""
+    job_id = submit_job('recalculate_ratings', 'Recalculate power ratings', _recalculate_ratings_job,
+                        collections=('ratings',), return_url=url_for('prefs.general_prefs'))
+    return redirect(url_for('jobs.view_job', job_id=job_id))
+
+def _recalculate_ratings_job(progress=None):
+    """Background job body for recalculating the power ratings."""
+    rated_count = recompute_ratings(progress=progress)
+    return f'Recalculated power ratings for {rated_count} wrestlers.'
 
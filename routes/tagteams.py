@@ -3,11 +3,13 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash
 from src.tagteams import (
     load_tagteams, get_tagteam_by_name, add_tagteam, update_tagteam, 
     delete_tagteam, get_wrestler_names, get_active_members_status,
-    _calculate_tagteam_weight
+    _calculate_tagteam_weight, TAGTEAM_EDITABLE_FIELDS
 )
 from src.wrestlers import update_wrestler_team_affiliation
 from src import divisions
 from src.prefs import load_preferences # Import load_preferences
+from src.storage import StaleRecordError, record_etag, diff_records
+from src.records import TAGTEAM_RECORD_FIELDS
 from werkzeug.utils import escape
 
 tagteams_bp = Blueprint('tagteams', __name__, url_prefix='/tagteams')
@@ -23,7 +25,7 @@ ALIGNMENT_OPTIONS = ['Babyface', 'Tweener', 'Heel']
 
 def is_tagteam_deletable(team):
     """Check if a tag team has a non-zero record."""
-    return all(int(team.get(key, 0)) == 0 for key in ['Wins', 'Losses', 'Draws'])
+    return all(team.get(key, 0) == 0 for key in TAGTEAM_RECORD_FIELDS)
 
 def _get_form_data(form):
     """Extracts and processes tag-team data from the form."""
@@ -41,9 +43,9 @@ def _get_form_data(form):
 
     return {
         "Name": escape(form.get('Name', '')).strip(),
-        "Wins": escape(form.get('Wins', '0')),
-        "Losses": escape(form.get('Losses', '0')),
-        "Draws": escape(form.get('Draws', '0')),
+        "Wins": 0, # Records are only changed by finalized matches
+        "Losses": 0,
+        "Draws": 0,
         "Status": tagteam_status,
         "Division": escape(form.get('Division', '')).strip(),
         "Location": escape(form.get('Location', '')).strip(),
@@ -118,29 +120,18 @@ def edit_tagteam(tagteam_name):
     wrestler_names = get_wrestler_names()
     all_divisions = divisions.get_all_division_ids_and_names()
     old_members = set(tagteam.get('Members', '').split('|')) if tagteam else set()
+    etag, conflict = record_etag(tagteam, fields=TAGTEAM_EDITABLE_FIELDS), None
 
     if request.method == 'POST':
+        etag = request.form.get('record_etag') # Keep the version the form was opened with
         # Get processed form data using the helper function
         form_data_processed = _get_form_data(request.form)
 
-        # Start with a copy of the existing tagteam data to preserve non-editable fields
-        # (like Wins, Losses, Draws, Belt which are not part of the edit form)
-        updated_data = tagteam.copy() 
-
-        # Update fields from the processed form data
-        updated_data["Name"] = form_data_processed["Name"]
-        updated_data["Status"] = form_data_processed["Status"] # _get_form_data handles status validation and flashing
-        updated_data["Division"] = form_data_processed["Division"]
-        updated_data["Location"] = form_data_processed["Location"]
-        updated_data["Weight"] = form_data_processed["Weight"]
-        updated_data["Alignment"] = form_data_processed["Alignment"]
-        updated_data["Music"] = form_data_processed["Music"]
-        updated_data["Members"] = form_data_processed["Members"]
-        updated_data["Faction"] = form_data_processed["Faction"]
-        updated_data["Manager"] = form_data_processed["Manager"]
-        updated_data["Moves"] = form_data_processed["Moves"]
-        updated_data["Awards"] = form_data_processed["Awards"]
-        updated_data["Hide_From_Fan_Roster"] = form_data_processed["Hide_From_Fan_Roster"]
+        # Only the form's fields are saved; non-editable fields (like Wins, Losses, Draws, Belt)
+        # keep whatever values they have when the change is written
+        # (_get_form_data handles status validation and flashing)
+        changes = {key: form_data_processed[key] for key in TAGTEAM_EDITABLE_FIELDS}
+        updated_data = dict(tagteam, **changes)
 
         if not updated_data['Name']:
             flash('Tag-team Name is required.', 'danger')
@@ -149,24 +140,31 @@ def edit_tagteam(tagteam_name):
         elif updated_data['Name'] != tagteam_name and get_tagteam_by_name(updated_data['Name']):
             flash(f"A tag-team with the name '{updated_data['Name']}' already exists.", 'danger')
         else:
-            update_tagteam(tagteam_name, updated_data)
-            
-            # Sync wrestler team fields
-            new_members = set(updated_data.get('Members', '').split('|'))
-            removed_members = old_members - new_members
-            added_members = new_members - old_members
-            name_changed = updated_data['Name'] != tagteam_name
-
-            for member in removed_members:
-                if member: update_wrestler_team_affiliation(member, '') # Clear team
-            for member in added_members:
-                if member: update_wrestler_team_affiliation(member, updated_data['Name'])
-            if name_changed: # If team name changed, update all current members
-                for member in new_members:
+            try:
+                updated = update_tagteam(tagteam_name, changes, expected_etag=etag, etag_fields=TAGTEAM_EDITABLE_FIELDS)
+            except StaleRecordError as e:
+                flash(str(e), 'danger')
+                etag, conflict = e.etag, diff_records(changes, e.current)
+                updated = None
+            if updated is False:
+                flash(f"Failed to update tag-team '{tagteam_name}'. New name might already exist.", 'danger')
+            elif updated:
+                # Sync wrestler team fields
+                new_members = set(updated_data.get('Members', '').split('|'))
+                removed_members = old_members - new_members
+                added_members = new_members - old_members
+                name_changed = updated_data['Name'] != tagteam_name
+
+                for member in removed_members:
+                    if member: update_wrestler_team_affiliation(member, '') # Clear team
+                for member in added_members:
                     if member: update_wrestler_team_affiliation(member, updated_data['Name'])
+                if name_changed: # If team name changed, update all current members
+                    for member in new_members:
+                        if member: update_wrestler_team_affiliation(member, updated_data['Name'])
 
-            flash(f"Tag-team '{updated_data['Name']}' updated successfully!", 'success')
-            return redirect(url_for('tagteams.list_tagteams'))
+                flash(f"Tag-team '{updated_data['Name']}' updated successfully!", 'success')
+                return redirect(url_for('tagteams.list_tagteams'))
         
         # If validation fails, re-render the form with the updated_data (which includes form submissions)
         # and also ensure member fields are split back out for the form.
@@ -174,15 +172,15 @@ def edit_tagteam(tagteam_name):
         updated_data['Member1'] = members_list_for_form[0] if len(members_list_for_form) > 0 else ''
         updated_data['Member2'] = members_list_for_form[1] if len(members_list_for_form) > 1 else ''
         updated_data['Member3'] = members_list_for_form[2] if len(members_list_for_form) > 2 else ''
-        return render_template('booker/tagteams/form.html', tagteam=updated_data, status_options=STATUS_OPTIONS, alignment_options=ALIGNMENT_OPTIONS, wrestler_names=wrestler_names, divisions=all_divisions, edit_mode=True, prefs=prefs) # Pass preferences
+        return render_template('booker/tagteams/form.html', tagteam=updated_data, status_options=STATUS_OPTIONS, alignment_options=ALIGNMENT_OPTIONS, wrestler_names=wrestler_names, divisions=all_divisions, edit_mode=True, prefs=prefs, record_etag=etag, record_conflict=conflict) # Pass preferences
     
     # Pre-fill form for GET request
     # Ensure all fields are present for rendering, defaulting to empty string or appropriate value if missing.
     # Convert stored '|' to '\n' for multi-line text areas for 'Moves' and 'Awards'.
     tagteam['Name'] = tagteam.get('Name', '')
-    tagteam['Wins'] = tagteam.get('Wins', '0')
-    tagteam['Losses'] = tagteam.get('Losses', '0')
-    tagteam['Draws'] = tagteam.get('Draws', '0')
+    tagteam['Wins'] = tagteam.get('Wins', 0)
+    tagteam['Losses'] = tagteam.get('Losses', 0)
+    tagteam['Draws'] = tagteam.get('Draws', 0)
     tagteam['Status'] = tagteam.get('Status', '')
     tagteam['Division'] = tagteam.get('Division', '')
     tagteam['Location'] = tagteam.get('Location', '')
@@ -200,7 +198,7 @@ def edit_tagteam(tagteam_name):
     tagteam['Member1'] = members_list[0] if len(members_list) > 0 else ''
     tagteam['Member2'] = members_list[1] if len(members_list) > 1 else ''
     tagteam['Member3'] = members_list[2] if len(members_list) > 2 else ''
-    return render_template('booker/tagteams/form.html', tagteam=tagteam, status_options=STATUS_OPTIONS, alignment_options=ALIGNMENT_OPTIONS, wrestler_names=wrestler_names, divisions=all_divisions, edit_mode=True, prefs=prefs) # Pass preferences
+    return render_template('booker/tagteams/form.html', tagteam=tagteam, status_options=STATUS_OPTIONS, alignment_options=ALIGNMENT_OPTIONS, wrestler_names=wrestler_names, divisions=all_divisions, edit_mode=True, prefs=prefs, record_etag=etag) # Pass preferences
 
 @tagteams_bp.route('/view/<string:tagteam_name>')
 def view_tagteam(tagteam_name):
@@ -1,15 +1,22 @@
 import os
-import zipfile
-import shutil # Import shutil for directory operations
-from datetime import datetime
-import litellm
 import json
-import html # Import the html module for unescaping
 import base64 # Import base64 for encoding/decoding JSON data
-from flask import Blueprint, render_template, request, redirect, url_for, flash, send_file
-from src.system import get_project_root, DATA_DIR, delete_all_temporary_files
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, Response, stream_with_context
+from src.backups import (
+    stream_data_backup, get_backup_filename, list_snapshots, get_snapshot,
+    create_snapshot, restore_snapshot, delete_snapshot, save_uploaded_archive,
+    restore_from_archive, DEFAULT_SNAPSHOT_RETENTION
+)
+from src.jobs import submit_job, get_job, ALL_DATA_COLLECTIONS
 from src.prefs import load_preferences
+from src.schema import has_league_data
 from src.wrestlers import add_wrestler
+from src.ai import get_litellm_model, complete, is_provider_error, AIConfigError, DEFAULT_CONCURRENCY_LIMIT, DEFAULT_MAX_RETRIES
+from src.ai_roster import (
+    build_roster_messages, get_roster_request_params, parse_roster_response, encode_wrestler,
+    create_roster_batch, set_batch_job, get_roster_batch, generate_roster_in_chunks,
+    ROSTER_SINGLE_REQUEST_LIMIT, ROSTER_MAX_WRESTLERS
+)
 
 tools_bp = Blueprint('tools', __name__, url_prefix='/tools')
 
@@ -20,187 +27,107 @@ def tools_main():
 
 @tools_bp.route('/backup')
 def backup_restore():
-    """Renders the backup and restore section within the tools dashboard."""
-    return render_template('tools/main.html', active_tool='backup_restore')
+    """Renders the backup and restore page, including the list of snapshots."""
+    return render_template('tools/backup_restore.html', snapshots=list_snapshots())
 
 @tools_bp.route('/ai-roster-generator')
 def ai_roster_generator_form():
     """Renders the AI Roster Generator input form."""
-    return render_template('tools/roster_generator.html')
+    return render_template('tools/roster_generator.html', max_wrestlers_limit=ROSTER_MAX_WRESTLERS,
+                           single_request_limit=ROSTER_SINGLE_REQUEST_LIMIT)
 
 @tools_bp.route('/generate-roster', methods=['POST'])
 def generate_roster():
     """
     Generates a roster of wrestlers using AI based on user input and displays them for review.
+    Rosters larger than one request can reliably return are generated in concurrent chunks by
+    a background job, and the review page fills in as the chunks arrive.
     """
     roster_prompt = request.form.get('roster_prompt')
     content_mode = request.form.get('content_mode')
-    max_wrestlers = min(int(request.form.get('max_wrestlers', 10)), 30) # Cap at 30
+    max_wrestlers = min(max(int(request.form.get('max_wrestlers', 10)), 1), ROSTER_MAX_WRESTLERS)
+    use_cache = 'bypass_cache' not in request.form
 
     if not roster_prompt:
         flash("Roster prompt cannot be empty.", "danger")
         return redirect(url_for('tools.ai_roster_generator_form'))
 
+    ai_content = ''
     try:
         # Load AI preferences
         prefs = load_preferences()
-        model_provider = prefs.get('ai_provider') # Corrected key
-        model_name = prefs.get('ai_model')        # Corrected key
-        
-        api_key = None
-        if model_provider == "Google":
-            api_key = prefs.get('google_api_key')
-            os.environ["GEMINI_API_KEY"] = api_key # Set environment variable for litellm
-        elif model_provider == "OpenAI":
-            api_key = prefs.get('openai_api_key')
-            os.environ["OPENAI_API_KEY"] = api_key # Set environment variable for litellm
-        # Add other providers and their respective environment variables if necessary
-
-        if not all([model_provider, model_name, api_key]):
+        try:
+            litellm_model_string = get_litellm_model(prefs)
+        except AIConfigError:
             flash("AI model preferences are not fully configured. Please check your preferences.", "danger")
             return redirect(url_for('tools.ai_roster_generator_form'))
 
-        system_prompt = f"""
-        You are an expert wrestling booker and creative writer. Your task is to generate a list of {max_wrestlers} professional wrestlers based on the user's prompt.
-        The output MUST be a single, valid JSON object with a top-level key "wrestlers" containing an array of wrestler objects.
-        Each wrestler object MUST strictly adhere to the following schema, which only includes the creative elements:
-        {{
-          "Name": "STRING (e.g., Ric Flair) - Must be unique and creative.",
-          "nickname": "STRING (e.g., 'The Nature Boy') - Can be empty if no nickname.",
-          "location": "STRING (e.g., 'Charlotte, North Carolina' or 'Parts Unknown')",
-          "Alignment": "STRING (MUST be one of: 'Babyface', 'Heel', 'Tweener')",
-          "Wrestling_Styles": "ARRAY OF STRINGS (List 1-3 appropriate styles, e.g., ['Technical', 'Brawler', 'High-Flyer'])",
-          "Moves": "ARRAY OF STRINGS (List 3-5 signature moves. Use generic names only for non-finishers. MUST include one clear finisher name)",
-          "Finisher": "STRING (The name of the finisher move, must match one item in 'Moves')",
-          "Height": "STRING (e.g., '5 ft. 1 in.' or '185 cm')",
-          "Weight": "STRING (e.g., '243 lbs.')",
-          "DOB": "DATE (e.g. '1972-07-04') - Must be a valid date in YYYY-MM-DD format."
-        }}
-        Ensure all fields are populated with creative and realistic data relevant to the prompt.
-        The 'Name' field must be unique for each wrestler.
-        """
-
-        # --- Fix 1: Dynamically Modify System Prompt for Real-World Grounding ---
-        if content_mode == 'real_world':
-            # This is the CRITICAL instruction to force tool use
-            system_prompt += f"""
-            
-            *** CRITICAL REAL-WORLD INSTRUCTION ***
-            You are in REAL-WORLD mode. You MUST use the Google Search grounding tool to find the real names, 
-            heights, weights, birthdates, and move sets of historical or active wrestlers matching the user's prompt. 
-            Do NOT invent any data for this mode. Use the information found via search exclusively.
-            """
-            user_prompt = f"Using your search tool, generate {max_wrestlers} REAL-WORLD wrestlers. Creative prompt: '{roster_prompt}'"
-
-        else:
-            # Revert to standard fictional prompt for clarity
-            user_prompt = f"Generate {max_wrestlers} FICTIONAL wrestlers. Creative prompt: '{roster_prompt}'"
-        
-        # Grounding logic
-        tools = []
-        if content_mode == 'real_world':
-            tools = [{"google_search": {}}]
-
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ]
-
-        # Construct the model string in the format litellm expects (e.g., "gemini/gemini-1.5-flash")
-        litellm_model_string = ""
-        if model_provider == "Google":
-            litellm_model_string = f"gemini/{model_name}"
-        elif model_provider == "OpenAI":
-            litellm_model_string = f"openai/{model_name}"
-        # Add other providers if necessary
-
-        if not litellm_model_string:
-            flash("Unsupported AI provider configured.", "danger")
-            return redirect(url_for('tools.ai_roster_generator_form'))
-
-        response = litellm.completion(
-            model=litellm_model_string,
-            messages=messages,
-            tools=tools,
-            response_format={"type": "json_object"}, # Instruct API to return JSON
-            temperature=0.7 # A bit of creativity
-        )
-
-        # Extract content from the response
-        ai_content = response.choices[0].message.content
-        
-        # Parse the JSON response
-        generated_data = json.loads(ai_content)
-        generated_roster_raw = generated_data.get('wrestlers', [])
-
-        
-        for wrestler_data in generated_roster_raw:
-            # --- START FIX: Key Capitalization and Normalization ---
-            # Now ADD the capitalized key without removing the lowercase one.
-            # This satisfies both the HTML template (which uses lowercase keys for display)
-            # and the database commit (which uses capitalized keys).
-            
-            # 1. Normalize 'location' to 'Location'
-            if 'location' in wrestler_data:
-                wrestler_data['Location'] = wrestler_data['location'] # ADD capitalized key
-            
-            # 2. Normalize 'nickname' to 'Nickname'
-            if 'nickname' in wrestler_data:
-                wrestler_data['Nickname'] = wrestler_data['nickname'] # ADD capitalized key
-            # --- END FIX ---
-            
-            # Set Belt, Status, and Stats defaults (previous fix)
-            if 'Status' not in wrestler_data:
-                wrestler_data['Status'] = 'Inactive' 
-            if 'Belt' not in wrestler_data:
-                wrestler_data['Belt'] = '' 
-            if 'Team' not in wrestler_data:
-                wrestler_data['Team'] = ''
-
-            # Initialize all match record fields if missing
-            for key in ['Singles_Wins', 'Singles_Losses', 'Singles_Draws', 'Tag_Wins', 'Tag_Losses', 'Tag_Draws']:
-                if key not in wrestler_data:
-                    wrestler_data[key] = '0'
-        
+        if max_wrestlers > ROSTER_SINGLE_REQUEST_LIMIT:
+            batch_id = create_roster_batch(max_wrestlers)
+            job_id = submit_job(
+                'generate_roster', f"Generate {max_wrestlers} wrestlers with AI", generate_roster_in_chunks,
+                batch_id, litellm_model_string, roster_prompt, content_mode,
+                concurrency=int(prefs.get('ai_concurrency_limit', DEFAULT_CONCURRENCY_LIMIT)),
+                max_retries=int(prefs.get('ai_max_retries', DEFAULT_MAX_RETRIES)),
+                use_cache=use_cache,
+                return_url=url_for('tools.review_roster_batch', batch_id=batch_id)
+            )
+            set_batch_job(batch_id, job_id)
+            return redirect(url_for('tools.review_roster_batch', batch_id=batch_id))
+
+        messages = build_roster_messages(roster_prompt, content_mode, max_wrestlers)
+        ai_content = complete(litellm_model_string, messages, use_cache=use_cache, **get_roster_request_params(content_mode))
 
         # Prepare roster for template: original data for display, encoded data for form submission
-        generated_roster_for_template = []
-        for wrestler_data in generated_roster_raw:
-            # Convert dict to JSON string, then Base64 encode it
-            encoded_wrestler = base64.b64encode(json.dumps(wrestler_data).encode('utf-8')).decode('utf-8')
-            generated_roster_for_template.append({
-                'display_data': wrestler_data,
-                'encoded_data': encoded_wrestler
-            })
+        generated_roster_for_template = [
+            {'display_data': wrestler_data, 'encoded_data': encode_wrestler(wrestler_data)}
+            for wrestler_data in parse_roster_response(ai_content)
+        ]
 
         if not generated_roster_for_template:
             flash("AI generated an empty roster or invalid structure. Please try again.", "warning")
             return redirect(url_for('tools.ai_roster_generator_form'))
 
-        # --- Fix 2: Extract Grounding Sources (Even if unused right now, it's necessary for inspection) ---
-        search_sources = []
-        try:
-            # litellm response structure may vary, check for standard grounding metadata
-            if response.get('usage', {}).get('grounding_metadata'):
-                search_sources = response['usage']['grounding_metadata'].get('grounding_attributions', [])
-        except AttributeError:
-            # Handle cases where the response structure is unexpected
-            pass 
-
         # Render the review page
-        return render_template('tools/roster_generator.html', 
-                               generated_roster=generated_roster_for_template, 
-                               search_sources=search_sources)
+        return render_template('tools/roster_generator.html',
+                               generated_roster=generated_roster_for_template)
 
     except json.JSONDecodeError as e:
         flash(f"AI response was not valid JSON. Error: {e}. Raw response: {ai_content[:500]}...", "danger")
         return redirect(url_for('tools.ai_roster_generator_form'))
-    except litellm.exceptions.APIError as e:
-        flash(f"AI API Error: {e}. Please check your API key and model configuration.", "danger")
-        return redirect(url_for('tools.ai_roster_generator_form'))
     except Exception as e:
-        flash(f"An unexpected error occurred: {e}", "danger")
+        if is_provider_error(e):
+            flash(f"AI API Error: {e}. Please check your API key and model configuration.", "danger")
+        else:
+            flash(f"An unexpected error occurred: {e}", "danger")
+        return redirect(url_for('tools.ai_roster_generator_form'))
+
+@tools_bp.route('/roster-batch/<batch_id>')
+def review_roster_batch(batch_id):
+    """Renders the review page for a chunked roster, which polls for wrestlers as they are generated."""
+    if not get_roster_batch(batch_id):
+        flash("That generated roster is no longer available. Please generate it again.", "warning")
         return redirect(url_for('tools.ai_roster_generator_form'))
+    return render_template('tools/roster_generator.html', batch_id=batch_id, generated_roster=[])
+
+@tools_bp.route('/roster-batch/<batch_id>/status')
+def roster_batch_status(batch_id):
+    """Returns the wrestlers generated since index `start`, and the batch's progress, as JSON."""
+    batch = get_roster_batch(batch_id, start=request.args.get('start', 0, type=int))
+    if not batch:
+        return jsonify({'error': 'Roster batch not found or expired.'}), 404
+    job = get_job(batch['job_id']) if batch['job_id'] else None
+    return jsonify({
+        'wrestlers': [{'display_data': w, 'encoded_data': encode_wrestler(w)} for w in batch['wrestlers']],
+        'count': batch['count'],
+        'total': batch['total'],
+        'requests': batch['requests'],
+        'duplicates': batch['duplicates'],
+        'errors': batch['errors'],
+        'finished': batch['finished'],
+        'job_url': url_for('jobs.view_job', job_id=batch['job_id']) if batch['job_id'] else None,
+        'message': job.get('Message', '') if job else '',
+    })
 
 @tools_bp.route('/commit-roster', methods=['POST'])
 def commit_roster():
@@ -241,37 +168,88 @@ def commit_roster():
 
 @tools_bp.route('/backup_data', methods=['GET'])
 def backup_data():
-    """Handles the backup of all league data."""
-    try:
-        root_path = get_project_root()
-        data_path = os.path.join(root_path, DATA_DIR)
-        
-        if not os.path.exists(data_path):
-            flash("No data directory found to backup.", "danger")
-            return redirect(url_for('tools.backup_restore'))
-
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_filename = f"slamsim_backup_{timestamp}" # No .zip extension here for make_archive
-        
-        # Create the zip archive
-        # shutil.make_archive(base_name, format, root_dir, base_dir)
-        # base_name: The name of the archive file to create, including the path, but without the .zip extension.
-        # format: The archive format, e.g., 'zip'.
-        # root_dir: The directory from which to start archiving.
-        # base_dir: The directory that will be archived.
-        archive_path = shutil.make_archive(
-            os.path.join(root_path, backup_filename), # Archive will be created in root_path
-            'zip',
-            root_path, # Start archiving from the project root
-            DATA_DIR    # Archive the 'data' directory relative to root_path
-        )
-
-        flash("League data backed up successfully!", "success")
-        return send_file(archive_path, as_attachment=True, download_name=os.path.basename(archive_path))
+    """Streams a zip backup of all league data straight to the browser."""
+    if not has_league_data():
+        flash("No league data found to backup.", "danger")
+        return redirect(url_for('tools.backup_restore'))
 
+    # The archive is built while it is being sent, so no temporary zip is left behind
+    return Response(
+        stream_with_context(stream_data_backup()),
+        mimetype='application/zip',
+        headers={'Content-Disposition': f'attachment; filename="{get_backup_filename()}"'}
+    )
+
+def _get_snapshot_retention():
+    """Returns the configured number of snapshots to keep."""
+    return int(load_preferences().get('snapshot_retention', DEFAULT_SNAPSHOT_RETENTION))
+
+def _create_snapshot_job(note, retention, progress=None):
+    """Background job body for a manual snapshot."""
+    snapshot = create_snapshot(note=note, retention=retention, progress=progress)
+    return f"Snapshot created ({snapshot['Changed_Files']} of {snapshot['File_Count']} files changed)."
+
+def _delete_snapshot_job(snapshot_id, progress=None):
+    """Background job body for deleting a snapshot and the objects only it referenced."""
+    if not delete_snapshot(snapshot_id):
+        raise ValueError("Snapshot not found.")
+    return "Snapshot deleted."
+
+def _restore_snapshot_job(snapshot_id, retention, progress=None):
+    """Background job body for a snapshot restore. The current state is snapshotted first so the restore can be undone."""
+    try:
+        create_snapshot(note=f"Automatic snapshot before restoring {snapshot_id}", retention=retention + 1)
+    except Exception as e:
+        raise ValueError(f"Could not snapshot current data before restoring: {e}")
+    success, message = restore_snapshot(snapshot_id, progress=progress)
+    if not success:
+        raise ValueError(message)
+    return message
+
+def _restore_archive_job(archive_path, original_filename, retention, progress=None):
+    """Background job body for restoring an uploaded backup, snapshotting the current data first."""
+    try:
+        create_snapshot(note=f"Automatic snapshot before restoring {original_filename}", retention=retention)
+    except FileNotFoundError:
+        pass # Nothing to safeguard yet
     except Exception as e:
-        flash(f"Error creating backup: {e}", "danger")
+        os.remove(archive_path)
+        raise ValueError(f"Could not snapshot current data before restoring: {e}")
+    success, message = restore_from_archive(archive_path, progress=progress)
+    if not success:
+        raise ValueError(message)
+    return message
+
+@tools_bp.route('/snapshots/create', methods=['POST'])
+def create_snapshot_route():
+    """Queues an incremental snapshot of the current league data."""
+    job_id = submit_job('snapshot', 'Create data snapshot', _create_snapshot_job,
+                        request.form.get('note', '').strip(), _get_snapshot_retention(),
+                        collections=('snapshots',), return_url=url_for('tools.backup_restore'))
+    return redirect(url_for('jobs.view_job', job_id=job_id))
+
+@tools_bp.route('/snapshots/<string:snapshot_id>/restore', methods=['POST'])
+def restore_snapshot_route(snapshot_id):
+    """Queues a restore of league data to a previous snapshot."""
+    if not get_snapshot(snapshot_id):
+        flash("Snapshot not found.", "danger")
+        return redirect(url_for('tools.backup_restore'))
+    # Restores replace the whole data directory, so they wait for every other job and cannot be stopped half way
+    job_id = submit_job('restore', f"Restore snapshot {snapshot_id}", _restore_snapshot_job,
+                        snapshot_id, _get_snapshot_retention(), collections=ALL_DATA_COLLECTIONS,
+                        cancellable=False, return_url=url_for('tools.backup_restore'))
+    return redirect(url_for('jobs.view_job', job_id=job_id))
+
+@tools_bp.route('/snapshots/<string:snapshot_id>/delete', methods=['POST'])
+def delete_snapshot_route(snapshot_id):
+    """Queues the deletion of a snapshot."""
+    if not get_snapshot(snapshot_id):
+        flash("Snapshot not found.", "danger")
         return redirect(url_for('tools.backup_restore'))
+    # Deleting removes unreferenced objects, so it must wait for any snapshot still writing its objects
+    job_id = submit_job('snapshot_delete', f"Delete snapshot {snapshot_id}", _delete_snapshot_job, snapshot_id,
+                        collections=('snapshots',), cancellable=False, return_url=url_for('tools.backup_restore'))
+    return redirect(url_for('jobs.view_job', job_id=job_id))
 
 @tools_bp.route('/restore_data', methods=['POST'])
 def restore_data():
@@ -285,67 +263,18 @@ def restore_data():
         flash('No selected file', 'danger')
         return redirect(url_for('tools.backup_restore'))
 
-    if file and file.filename.endswith('.zip'):
-        root_path = get_project_root()
-        data_path = os.path.join(root_path, DATA_DIR)
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        old_data_path = f"{data_path}_old_{timestamp}"
-        temp_zip_path = os.path.join(root_path, f"temp_restore_{timestamp}.zip") # Unique temp name
-
-        try:
-            # 1. Save the uploaded zip file temporarily
-            file.save(temp_zip_path)
-
-            # 2. Rename existing data directory as a safeguard
-            if os.path.exists(data_path):
-                shutil.move(data_path, old_data_path)
-                flash(f"Existing data moved to '{os.path.basename(old_data_path)}' as a safeguard.", "info")
-            
-            # 3. Create a new, empty data directory
-            os.makedirs(data_path, exist_ok=True)
-            
-            # 4. Unzip the contents of the uploaded file into the new data directory
-            with zipfile.ZipFile(temp_zip_path, 'r') as zip_ref:
-                # Check if the zip contains a 'data/' directory at its root
-                # If so, extract to root_path so 'data/' is created correctly
-                namelist = zip_ref.namelist()
-                if any(name.startswith(f'{DATA_DIR}/') for name in namelist):
-                    zip_ref.extractall(root_path)
-                else:
-                    # Otherwise, extract directly into the new data_path
-                    zip_ref.extractall(data_path)
-
-            # 5. Clean up temporary files and old data directory
-            os.remove(temp_zip_path)
-            if os.path.exists(old_data_path):
-                shutil.rmtree(old_data_path) # Remove the old data directory after successful restore
-            
-            # 6. Clear any temporary files generated by the application
-            delete_all_temporary_files()
-
-            flash('League data restored successfully!', 'success')
-            return redirect(url_for('booker.dashboard'))
-
-        except zipfile.BadZipFile:
-            flash('Invalid backup file. Please upload a valid .zip file.', 'danger')
-            # Attempt to revert if extraction failed due to bad zip
-            if os.path.exists(data_path):
-                shutil.rmtree(data_path) # Remove the incomplete new data dir
-            if os.path.exists(old_data_path):
-                shutil.move(old_data_path, data_path) # Restore old data
-                flash("Attempted to restore previous data due to invalid backup file.", "info")
-        except Exception as e:
-            flash(f'Error restoring data: {e}. Please check the "{os.path.basename(old_data_path)}" directory for manual recovery.', 'danger')
-            # If any other error, ensure old data is preserved and new (potentially corrupt) data is removed
-            if os.path.exists(data_path):
-                shutil.rmtree(data_path) # Remove the incomplete new data dir
-            if os.path.exists(old_data_path) and not os.path.exists(data_path): # Only move back if data_path is truly gone
-                shutil.move(old_data_path, data_path) # Restore old data
-                flash("Attempted to restore previous data due to restoration error.", "info")
-        finally:
-            if os.path.exists(temp_zip_path):
-                os.remove(temp_zip_path)
-    else:
+    if not file.filename.endswith('.zip'):
         flash('Invalid file type. Please upload a .zip file.', 'danger')
-    
-    return redirect(url_for('tools.backup_restore'))
+        return redirect(url_for('tools.backup_restore'))
+
+    try:
+        archive_path = save_uploaded_archive(file)
+    except OSError as e:
+        flash(f"Error saving uploaded backup: {e}", 'danger')
+        return redirect(url_for('tools.backup_restore'))
+
+    job_id = submit_job('restore', f"Restore backup {file.filename}", _restore_archive_job,
+                        archive_path, file.filename, _get_snapshot_retention(),
+                        collections=ALL_DATA_COLLECTIONS, cancellable=False,
+                        return_url=url_for('booker.dashboard'))
+    return redirect(url_for('jobs.view_job', job_id=job_id))
@@ -1,7 +1,9 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash
-from src.wrestlers import load_wrestlers, get_wrestler_by_name, add_wrestler, update_wrestler, delete_wrestler
+from src.wrestlers import load_wrestlers, get_wrestler_by_name, add_wrestler, update_wrestler, delete_wrestler, WRESTLER_EDITABLE_FIELDS
 from src import divisions
 from src.prefs import load_preferences # Import load_preferences
+from src.storage import StaleRecordError, record_etag, diff_records
+from src.records import WRESTLER_RECORD_FIELDS
 import html
 
 wrestlers_bp = Blueprint('wrestlers', __name__, url_prefix='/wrestlers')
@@ -11,7 +13,7 @@ ALIGNMENT_OPTIONS = ['Hero', 'Babyface', 'Anti-hero', 'Tweener', 'Heel', 'Villai
 WRESTLING_STYLES_OPTIONS = ["All-Rounder", "Brawler", "Dirty", "High-Flyer", "Luchador", "Powerhouse", "Striker", "Submission Specialist", "Technical"]
 
 def is_wrestler_deletable(wrestler):
-    return all(int(wrestler.get(key, 0)) == 0 for key in ['Singles_Wins', 'Singles_Losses', 'Singles_Draws', 'Tag_Wins', 'Tag_Losses', 'Tag_Draws'])
+    return all(wrestler.get(key, 0) == 0 for key in WRESTLER_RECORD_FIELDS)
 
 def _get_form_data(form):
     return {
@@ -63,7 +65,7 @@ def create_wrestler():
         wrestler_data['Status'] = 'Inactive' # Set default status for new wrestlers
         wrestler_data['Team'] = '' # Initialize read-only fields
         wrestler_data['Belt'] = '' # Initialize Belt as empty
-        wrestler_data.update({'Singles_Wins': '0', 'Singles_Losses': '0', 'Singles_Draws': '0', 'Tag_Wins': '0', 'Tag_Losses': '0', 'Tag_Draws': '0'})
+        wrestler_data.update({key: 0 for key in WRESTLER_RECORD_FIELDS})
         
         if not wrestler_data.get('Name'): flash('Wrestler Name is required.', 'error')
         elif add_wrestler(wrestler_data):
@@ -82,17 +84,19 @@ def edit_wrestler(wrestler_name):
         return redirect(url_for('wrestlers.list_wrestlers'))
     all_divisions = divisions.get_all_division_ids_and_names()
     if request.method == 'POST':
-        updated_data = _get_form_data(request.form)
-        # Preserve read-only fields from the original data
-        for key in ['Team', 'Belt', 'Singles_Wins', 'Singles_Losses', 'Singles_Draws', 'Tag_Wins', 'Tag_Losses', 'Tag_Draws']:
-            updated_data[key] = wrestler.get(key, '0')
-
-        if not updated_data.get('Name'): flash('Wrestler Name is required.', 'error')
-        elif update_wrestler(wrestler_name, updated_data):
-            flash(f'Wrestler "{updated_data["Name"]}" updated successfully!', 'success')
-            return redirect(url_for('wrestlers.list_wrestlers'))
-        else: flash(f'Failed to update wrestler "{wrestler_name}". New name might already exist.', 'error')
-        return render_template('booker/wrestlers/form.html', wrestler=updated_data, status_options=STATUS_OPTIONS, alignment_options=ALIGNMENT_OPTIONS, divisions=all_divisions, wrestling_styles_options=WRESTLING_STYLES_OPTIONS, edit_mode=True, prefs=prefs) # Pass preferences
+        updated_data = _get_form_data(request.form) # Only the form's fields; records, Team and Belt are kept as saved
+
+        etag, conflict = request.form.get('record_etag'), None
+        try:
+            if not updated_data.get('Name'): flash('Wrestler Name is required.', 'error')
+            elif update_wrestler(wrestler_name, updated_data, expected_etag=etag, etag_fields=WRESTLER_EDITABLE_FIELDS):
+                flash(f'Wrestler "{updated_data["Name"]}" updated successfully!', 'success')
+                return redirect(url_for('wrestlers.list_wrestlers'))
+            else: flash(f'Failed to update wrestler "{wrestler_name}". New name might already exist.', 'error')
+        except StaleRecordError as e:
+            flash(str(e), 'error')
+            etag, conflict = e.etag, diff_records(updated_data, e.current)
+        return render_template('booker/wrestlers/form.html', wrestler=dict(wrestler, **updated_data), status_options=STATUS_OPTIONS, alignment_options=ALIGNMENT_OPTIONS, divisions=all_divisions, wrestling_styles_options=WRESTLING_STYLES_OPTIONS, edit_mode=True, prefs=prefs, record_etag=etag, record_conflict=conflict) # Pass preferences
 
     wrestler_display = wrestler.copy()
 
@@ -120,7 +124,7 @@ def edit_wrestler(wrestler_name):
     # Ensure Weight is just the number for the form input, converting to string first if necessary
     wrestler_display['Weight'] = str(wrestler_display.get('Weight', '')).split(' ')[0]
 
-    return render_template('booker/wrestlers/form.html', wrestler=wrestler_display, status_options=STATUS_OPTIONS, alignment_options=ALIGNMENT_OPTIONS, divisions=all_divisions, wrestling_styles_options=WRESTLING_STYLES_OPTIONS, edit_mode=True, prefs=prefs) # Pass preferences
+    return render_template('booker/wrestlers/form.html', wrestler=wrestler_display, status_options=STATUS_OPTIONS, alignment_options=ALIGNMENT_OPTIONS, divisions=all_divisions, wrestling_styles_options=WRESTLING_STYLES_OPTIONS, edit_mode=True, prefs=prefs, record_etag=record_etag(wrestler, fields=WRESTLER_EDITABLE_FIELDS)) # Pass preferences
 
 @wrestlers_bp.route('/view/<string:wrestler_name>')
 def view_wrestler(wrestler_name):
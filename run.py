@@ -1,37 +1,85 @@
+import argparse
 import subprocess
 import os
 import webbrowser
 import time
 import sys # Import sys
+import urllib.request
+import urllib.error
+
+READY_TIMEOUT = 30 # Seconds to wait for the server to answer its readiness probe
+READY_POLL_INTERVAL = 0.1
+
+def wait_until_ready(url, process, timeout=READY_TIMEOUT):
+    """Polls the app's /healthz endpoint until it answers. Returns False if the server exits or never becomes ready."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            return False
+        try:
+            with urllib.request.urlopen(f"{url}healthz", timeout=1) as response:
+                if response.status == 200:
+                    return True
+        except (urllib.error.URLError, ConnectionError, TimeoutError):
+            pass
+        time.sleep(READY_POLL_INTERVAL)
+    return False
 
 def main():
+    parser = argparse.ArgumentParser(description="Start SlamSim! and open it in a browser.")
+    parser.add_argument('--production', action='store_true', help="Serve from a multi-threaded WSGI server instead of the debug server")
+    parser.add_argument('--server', default='auto', help="Production server: auto, waitress, gunicorn or werkzeug")
+    parser.add_argument('--workers', type=int, default=1, help="Worker processes (production only)")
+    parser.add_argument('--threads', type=int, default=8, help="Threads per worker (production only)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--fan-only', action='store_true', help="Serve only the fan pages, without the booker tools or AI libraries")
+    parser.add_argument('--no-browser', action='store_true', help="Do not open a browser once the server is ready")
+    args = parser.parse_args()
+
     base_dir = os.path.dirname(os.path.abspath(__file__))
-    app_script_path = os.path.join(base_dir, 'src', 'app.py')
-    
+
     # Construct the PYTHONPATH for the subprocess
     # This ensures the project root (base_dir) is in the Python path for the Flask app
     env = os.environ.copy()
     current_python_path = env.get('PYTHONPATH', '')
-    
+
     # Prepend the project's base directory to PYTHONPATH
     if current_python_path:
         env['PYTHONPATH'] = f"{base_dir}{os.pathsep}{current_python_path}"
     else:
         env['PYTHONPATH'] = base_dir
 
-    print(f"Starting Flask application from {app_script_path} with PYTHONPATH={env['PYTHONPATH']}...")
-    
-    # Start the Flask app as a non-blocking process
-    process = subprocess.Popen(['python', app_script_path], env=env) # Pass the modified environment
-    
-    # Give the server a moment to start up
-    time.sleep(1) 
-    
-    # Open the index page in a new browser tab
-    print("Opening browser to http://127.0.0.1:5000/")
-    webbrowser.open_new_tab('http://127.0.0.1:5000/')
-    
-    process.wait() # Wait for the Flask app to be terminated
+    server_args = ['--host', args.host, '--port', str(args.port)]
+    if args.production:
+        server_args += ['--production', '--server', args.server, '--workers', str(args.workers), '--threads', str(args.threads)]
+    if args.fan_only:
+        server_args.append('--fan-only')
+
+    print(f"Starting SlamSim! with PYTHONPATH={env['PYTHONPATH']}...")
+
+    # Start the server as a non-blocking process
+    process = subprocess.Popen([sys.executable, '-m', 'src.server'] + server_args, env=env, cwd=base_dir) # Pass the modified environment
+
+    # Wait for the readiness probe rather than a fixed delay
+    browse_host = '127.0.0.1' if args.host in ('0.0.0.0', '::') else args.host
+    url = f"http://{browse_host}:{args.port}/"
+    if not wait_until_ready(url, process):
+        print("The server did not become ready. Check the output above for errors.")
+        if process.poll() is None:
+            process.terminate()
+        sys.exit(1)
+
+    if not args.no_browser:
+        # Open the index page in a new browser tab
+        print(f"Opening browser to {url}")
+        webbrowser.open_new_tab(url)
+
+    try:
+        process.wait() # Wait for the server to be terminated
+    except KeyboardInterrupt:
+        process.terminate()
+        process.wait()
 
 if __name__ == "__main__":
     main()
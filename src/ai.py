@@ -0,0 +1,316 @@
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, as_completed
+from src.ai_mock import mock_completion, is_mock_model, MOCK_PROVIDER, MOCK_MODEL_PREFIX
+from src.ai_cache import make_cache_key, get_cached_completion, store_completion, DEFAULT_CACHE_TTL_HOURS, DEFAULT_CACHE_MAX_ENTRIES
+from src.prefs import load_preferences
+
+AI_WORKERS = 4 # Completions running at once; further requests queue behind them
+AI_MAX_PENDING = 16 # Running plus queued completions before new requests are turned away
+AI_REQUEST_TIMEOUT = 120 # Seconds allowed for a whole completion
+STREAM_RETENTION = 300 # Seconds a finished stream is kept so a reconnecting browser can catch up
+STREAM_HEARTBEAT = 15 # Seconds between keep-alive events while waiting for tokens
+DEFAULT_CONCURRENCY_LIMIT = 4
+DEFAULT_MAX_RETRIES = 2
+RETRY_BASE_DELAY = 1.0 # Seconds before the first retry; doubled on every further attempt
+RETRY_MAX_DELAY = 30.0
+
+class AIConfigError(ValueError):
+    """Raised when the AI preferences are missing something a completion needs."""
+    pass
+
+class AIBusyError(RuntimeError):
+    """Raised when too many completions are already queued."""
+    pass
+
+def _get_litellm():
+    """
+    Imports litellm on first use. It takes a long time to import, so pages that never
+    talk to a provider, and the whole fan site, start without it.
+    """
+    import litellm
+    return litellm
+
+def is_provider_error(error):
+    """Returns True if an exception is an API error raised by litellm."""
+    litellm = sys.modules.get('litellm') # Nothing litellm raised can exist before it was imported
+    return litellm is not None and isinstance(error, litellm.exceptions.APIError)
+
+_executor = ThreadPoolExecutor(max_workers=AI_WORKERS, thread_name_prefix='slamsim-ai')
+_pending = threading.BoundedSemaphore(AI_MAX_PENDING)
+_streams = {}
+_streams_lock = threading.Lock()
+
+def get_litellm_model(prefs):
+    """
+    Returns the litellm model string for the configured provider and model, and makes
+    the provider's API key available to litellm. Raises AIConfigError if anything is missing.
+    """
+    provider = prefs.get('ai_provider')
+    model_name = prefs.get('ai_model')
+    if not model_name:
+        raise AIConfigError('AI model not configured in preferences.')
+    if provider == 'Google':
+        if not prefs.get('google_api_key'):
+            raise AIConfigError('Google API key not configured in preferences.')
+        os.environ["GEMINI_API_KEY"] = prefs['google_api_key'] # Set environment variable for litellm
+        return f"gemini/{model_name}"
+    if provider == 'OpenAI':
+        if not prefs.get('openai_api_key'):
+            raise AIConfigError('OpenAI API key not configured in preferences.')
+        os.environ["OPENAI_API_KEY"] = prefs['openai_api_key'] # Set environment variable for litellm
+        return f"openai/{model_name}"
+    if provider == MOCK_PROVIDER:
+        return f"{MOCK_MODEL_PREFIX}{model_name}" # Answered locally, no API key needed
+    raise AIConfigError('Unsupported AI provider configured.')
+
+def _submit(func, *args, **kwargs):
+    """Queues work on the AI executor, refusing it if the queue is already full."""
+    if not _pending.acquire(blocking=False):
+        raise AIBusyError('Too many AI requests are in progress. Please try again shortly.')
+    try:
+        future = _executor.submit(func, *args, **kwargs)
+    except Exception:
+        _pending.release()
+        raise
+    future.add_done_callback(lambda f: _pending.release())
+    return future
+
+def _provider_completion(model, messages, timeout, stream=False, **params):
+    """Sends a request to the provider behind a model string: the local mock or litellm."""
+    if is_mock_model(model):
+        return mock_completion(model, messages, stream=stream, timeout=timeout, **params)
+    litellm = _get_litellm()
+    litellm.drop_params = True # Enable dropping of unsupported parameters for AI models
+    return litellm.completion(model=model, messages=messages, stream=stream, timeout=timeout, **params)
+
+def _completion(model, messages, timeout, **params):
+    """Runs a single blocking completion and returns the message content."""
+    response = _provider_completion(model, messages, timeout, **params)
+    return response.choices[0].message.content
+
+def _get_cache_settings():
+    """Returns (ttl_hours, max_entries) for the completion cache from the preferences."""
+    prefs = load_preferences()
+    return (float(prefs.get('ai_cache_ttl_hours', DEFAULT_CACHE_TTL_HOURS)),
+            int(prefs.get('ai_cache_max_entries', DEFAULT_CACHE_MAX_ENTRIES)))
+
+def _lookup_cache(model, messages, params, use_cache):
+    """Returns (cache_key, cached_content). Content is None on a miss or when the cache is bypassed."""
+    cache_key = make_cache_key(model, messages, params)
+    if not use_cache:
+        return cache_key, None
+    ttl_hours, _ = _get_cache_settings()
+    return cache_key, get_cached_completion(cache_key, ttl_hours)
+
+def _store_in_cache(cache_key, model, content):
+    """Caches a fresh completion. Bypassed requests still store their result so the next lookup sees it."""
+    _, max_entries = _get_cache_settings()
+    store_completion(cache_key, model, content, max_entries)
+
+def complete(model, messages, timeout=AI_REQUEST_TIMEOUT, use_cache=True, **params):
+    """
+    Runs a completion on the AI executor and waits for its content. Identical requests are
+    answered from the completion cache unless use_cache is False. Raises TimeoutError
+    if it takes longer than `timeout` seconds.
+    """
+    cache_key, cached = _lookup_cache(model, messages, params, use_cache)
+    if cached is not None:
+        return cached
+    future = _submit(_completion, model, messages, timeout, **params)
+    try:
+        content = future.result(timeout=timeout)
+    except FutureTimeoutError:
+        future.cancel()
+        raise TimeoutError(f"The AI provider did not respond within {timeout} seconds.")
+    _store_in_cache(cache_key, model, content)
+    return content
+
+def _is_retryable(error):
+    """Returns True for provider errors that are worth retrying: rate limits, timeouts and outages."""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    litellm = sys.modules.get('litellm')
+    if litellm is None:
+        return False
+    retryable = (litellm.RateLimitError, litellm.Timeout, litellm.APIConnectionError,
+                 litellm.ServiceUnavailableError, litellm.InternalServerError)
+    return isinstance(error, retryable)
+
+def _completion_with_retries(model, messages, timeout, max_retries, params):
+    """Runs a completion, retrying transient failures with exponential backoff and jitter."""
+    attempt = 0
+    while True:
+        try:
+            return _completion(model, messages, timeout, **params)
+        except Exception as e:
+            if attempt >= max_retries or not _is_retryable(e):
+                raise
+            delay = min(RETRY_BASE_DELAY * (2 ** attempt), RETRY_MAX_DELAY)
+            time.sleep(delay + random.uniform(0, delay / 2))
+            attempt += 1
+
+def complete_with_retries(model, messages, max_retries=DEFAULT_MAX_RETRIES, timeout=AI_REQUEST_TIMEOUT, use_cache=True, **params):
+    """
+    Runs a completion in the calling thread, retrying transient failures, with the completion
+    cache in front. For callers that run their own bounded pool of requests.
+    """
+    cache_key, cached = _lookup_cache(model, messages, params, use_cache)
+    if cached is not None:
+        return cached
+    content = _completion_with_retries(model, messages, timeout, max_retries, params)
+    _store_in_cache(cache_key, model, content)
+    return content
+
+def complete_many(model, message_lists, concurrency=DEFAULT_CONCURRENCY_LIMIT, max_retries=DEFAULT_MAX_RETRIES,
+                  timeout=AI_REQUEST_TIMEOUT, progress=None, use_cache=True, **params):
+    """
+    Runs one completion per message list with at most `concurrency` in flight, so a batch takes
+    about as long as its slowest request. Cached answers are used without a request unless
+    use_cache is False. Returns a list, in input order, of {'content': ..., 'error': ...} dicts.
+    `progress(done, total, message)` is called from the calling thread as each request finishes;
+    if it raises, requests not yet started are dropped.
+    """
+    results = [None] * len(message_lists)
+    if not message_lists:
+        return results
+    cache_keys = []
+    for i, messages in enumerate(message_lists):
+        cache_key, cached = _lookup_cache(model, messages, params, use_cache)
+        cache_keys.append(cache_key)
+        if cached is not None:
+            results[i] = {'content': cached, 'error': None}
+    done = len(message_lists) - results.count(None)
+    pool = ThreadPoolExecutor(max_workers=max(int(concurrency), 1), thread_name_prefix='slamsim-ai-batch')
+    try:
+        futures = {
+            pool.submit(_completion_with_retries, model, messages, timeout, max_retries, params): i
+            for i, messages in enumerate(message_lists) if results[i] is None
+        }
+        for future in as_completed(futures):
+            i = futures[future]
+            done += 1
+            try:
+                results[i] = {'content': future.result(), 'error': None}
+                _store_in_cache(cache_keys[i], model, results[i]['content'])
+            except Exception as e:
+                print(f"Error calling Litellm API: {e}")
+                results[i] = {'content': None, 'error': str(e)}
+            if progress: progress(done, len(message_lists), f"{done} of {len(message_lists)} AI requests finished")
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return results
+
+# --- Streaming ---
+
+def _prune_streams():
+    """Forgets finished streams nobody has read for STREAM_RETENTION seconds."""
+    cutoff = time.monotonic() - STREAM_RETENTION
+    with _streams_lock:
+        expired = [sid for sid, s in _streams.items() if s['finished_at'] and s['finished_at'] < cutoff]
+        for sid in expired:
+            del _streams[sid]
+
+def _finish_stream(stream, error=None):
+    """Marks a stream finished and wakes every reader."""
+    with stream['condition']:
+        stream['error'] = error
+        stream['done'] = True
+        stream['finished_at'] = time.monotonic()
+        stream['condition'].notify_all()
+
+def _run_stream(stream, model, messages, timeout, params, cache_key):
+    """Worker body: streams a completion into the stream's chunk list as tokens arrive."""
+    deadline = time.monotonic() + timeout
+    try:
+        response = _provider_completion(model, messages, timeout, stream=True, **params)
+        for chunk in response:
+            if stream['cancelled']:
+                break
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"The AI provider did not finish within {timeout} seconds.")
+            text = chunk.choices[0].delta.content if chunk.choices else None
+            if text:
+                with stream['condition']:
+                    stream['chunks'].append(text)
+                    stream['condition'].notify_all()
+        if not stream['cancelled']:
+            _store_in_cache(cache_key, model, ''.join(stream['chunks']))
+        _finish_stream(stream)
+    except Exception as e:
+        print(f"Error calling Litellm API: {e}")
+        _finish_stream(stream, error=str(e))
+
+def start_stream(model, messages, timeout=AI_REQUEST_TIMEOUT, use_cache=True, **params):
+    """
+    Starts a streamed completion on the AI executor and returns its stream ID straight away.
+    Tokens are read back with iter_stream. A cached answer is served as a single, already
+    finished chunk unless use_cache is False.
+    """
+    _prune_streams()
+    cache_key, cached = _lookup_cache(model, messages, params, use_cache)
+    stream_id = uuid.uuid4().hex
+    stream = {
+        'chunks': [],
+        'done': False,
+        'error': None,
+        'cancelled': False,
+        'finished_at': None,
+        'condition': threading.Condition(),
+    }
+    with _streams_lock:
+        _streams[stream_id] = stream
+    if cached is not None:
+        stream['chunks'].append(cached)
+        _finish_stream(stream)
+        return stream_id
+    try:
+        _submit(_run_stream, stream, model, messages, timeout, params, cache_key)
+    except AIBusyError:
+        with _streams_lock:
+            del _streams[stream_id]
+        raise
+    return stream_id
+
+def cancel_stream(stream_id):
+    """Asks a running stream to stop reading from the provider."""
+    with _streams_lock:
+        stream = _streams.get(stream_id)
+    if stream:
+        stream['cancelled'] = True
+    return stream is not None
+
+def iter_stream(stream_id, start=0):
+    """
+    Yields ('token', index, text) for each chunk from `start` onwards as it arrives, then a final
+    ('done', None, full_text) or ('error', None, message). Yields ('heartbeat', None, '') while
+    waiting so callers can keep a connection alive.
+    """
+    with _streams_lock:
+        stream = _streams.get(stream_id)
+    if not stream:
+        yield ('error', None, 'Stream not found or expired.')
+        return
+
+    index = start
+    while True:
+        with stream['condition']:
+            if index >= len(stream['chunks']) and not stream['done']:
+                stream['condition'].wait(timeout=STREAM_HEARTBEAT)
+            new_chunks = stream['chunks'][index:]
+            done, error = stream['done'], stream['error']
+        for text in new_chunks:
+            yield ('token', index, text)
+            index += 1
+        if done and index >= len(stream['chunks']):
+            if error:
+                yield ('error', None, f"Error generating content: {error}. Please check your API key and model settings in preferences.")
+            else:
+                yield ('done', None, ''.join(stream['chunks']))
+            return
+        if not new_chunks:
+            yield ('heartbeat', None, '')
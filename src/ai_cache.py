@@ -0,0 +1,178 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from src.system import get_project_root, INCLUDES_DIR
+
+AI_CACHE_FILENAME = 'ai_cache.sqlite3'
+DEFAULT_CACHE_TTL_HOURS = 168 # One week
+DEFAULT_CACHE_MAX_ENTRIES = 500
+
+_cache_lock = threading.Lock()
+_schema_ready = set()
+
+def _get_cache_path():
+    """Returns the absolute path to the completion cache database."""
+    return os.path.join(get_project_root(), INCLUDES_DIR, AI_CACHE_FILENAME)
+
+def _connect():
+    """Opens the cache database, creating its tables on first use."""
+    cache_path = _get_cache_path()
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    conn = sqlite3.connect(cache_path, timeout=10)
+    if cache_path not in _schema_ready or not os.path.getsize(cache_path):
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS completions (
+                cache_key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                content TEXT NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            )""")
+        conn.execute("CREATE INDEX IF NOT EXISTS completions_last_used ON completions (last_used)")
+        conn.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        conn.commit()
+        _schema_ready.add(cache_path)
+    return conn
+
+def _bump_stat(conn, name):
+    """Adds one to a persistent hit/miss counter."""
+    conn.execute("INSERT INTO stats (name, value) VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET value = value + 1", (name,))
+
+def make_cache_key(model, messages, params=None):
+    """Returns a stable hash of everything that determines a completion: the model, the messages and the parameters."""
+    payload = json.dumps({'model': model, 'messages': messages, 'params': params or {}}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def get_cached_completion(cache_key, ttl_hours=DEFAULT_CACHE_TTL_HOURS):
+    """
+    Returns the cached content for a key, or None on a miss. Expired entries count as misses and
+    are removed. A cache that cannot be read (e.g. locked or read-only) also counts as a miss.
+    """
+    now = time.time()
+    with _cache_lock:
+        try:
+            conn = _connect()
+        except (sqlite3.Error, OSError) as e:
+            print(f"Error opening the AI completion cache, treating it as a miss: {e}")
+            return None
+        try:
+            row = conn.execute("SELECT content, created FROM completions WHERE cache_key = ?", (cache_key,)).fetchone()
+            if row and (not ttl_hours or now - row[1] <= float(ttl_hours) * 3600):
+                try:
+                    conn.execute("UPDATE completions SET last_used = ?, hits = hits + 1 WHERE cache_key = ?", (now, cache_key))
+                    _bump_stat(conn, 'hits')
+                    conn.commit()
+                except sqlite3.Error as e:
+                    print(f"Error updating the AI completion cache statistics: {e}")
+                return row[0]
+            if row:
+                conn.execute("DELETE FROM completions WHERE cache_key = ?", (cache_key,))
+            _bump_stat(conn, 'misses')
+            conn.commit()
+            return None
+        except sqlite3.Error as e:
+            print(f"Error reading the AI completion cache, treating it as a miss: {e}")
+            return None
+        finally:
+            conn.close()
+
+def store_completion(cache_key, model, content, max_entries=DEFAULT_CACHE_MAX_ENTRIES):
+    """
+    Caches a completion, evicting the least recently used entries beyond max_entries. If the
+    cache cannot be written (e.g. locked or read-only), the completion is simply not cached.
+    """
+    if not content:
+        return
+    now = time.time()
+    with _cache_lock:
+        try:
+            conn = _connect()
+        except (sqlite3.Error, OSError) as e:
+            print(f"Error opening the AI completion cache, not caching this completion: {e}")
+            return
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO completions (cache_key, model, content, created, last_used, hits) VALUES (?, ?, ?, ?, ?, 0)",
+                (cache_key, model, content, now, now)
+            )
+            conn.execute(
+                "DELETE FROM completions WHERE cache_key NOT IN (SELECT cache_key FROM completions ORDER BY last_used DESC LIMIT ?)",
+                (max(int(max_entries), 1),)
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"Error writing the AI completion cache, not caching this completion: {e}")
+        finally:
+            conn.close()
+
+def get_cache_stats():
+    """
+    Returns entry count, stored size and lifetime hit/miss counts for the completion cache. A
+    cache that cannot be read (e.g. locked or corrupt) is reported as empty.
+    """
+    empty = {'entries': 0, 'size_bytes': 0, 'hits': 0, 'misses': 0, 'hit_rate': 0.0}
+    if not os.path.exists(_get_cache_path()):
+        return empty
+    with _cache_lock:
+        try:
+            conn = _connect()
+        except (sqlite3.Error, OSError) as e:
+            print(f"Error opening the AI completion cache, reporting it as empty: {e}")
+            return empty
+        try:
+            entries, size_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(content)), 0) FROM completions").fetchone()
+            stats = dict(conn.execute("SELECT name, value FROM stats").fetchall())
+        except sqlite3.Error as e:
+            print(f"Error reading the AI completion cache statistics, reporting it as empty: {e}")
+            return empty
+        finally:
+            conn.close()
+    hits, misses = stats.get('hits', 0), stats.get('misses', 0)
+    lookups = hits + misses
+    return {
+        'entries': entries,
+        'size_bytes': size_bytes,
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / lookups * 100, 1) if lookups else 0.0,
+    }
+
+def clear_cache():
+    """
+    Removes every cached completion and resets the statistics. A corrupt cache file is deleted
+    and recreated. Returns False if the cache could not be cleared, e.g. because it is locked.
+    """
+    cache_path = _get_cache_path()
+    if not os.path.exists(cache_path):
+        return True
+    with _cache_lock:
+        try:
+            conn = _connect()
+            try:
+                conn.execute("DELETE FROM completions")
+                conn.execute("DELETE FROM stats")
+                conn.commit()
+                conn.execute("VACUUM")
+            finally:
+                conn.close()
+            return True
+        except sqlite3.OperationalError as e: # Locked or unwritable; deleting it would not help
+            print(f"Error clearing the AI completion cache: {e}")
+            return False
+        except sqlite3.DatabaseError as e:
+            print(f"The AI completion cache is corrupt, recreating it: {e}")
+        except OSError as e:
+            print(f"Error clearing the AI completion cache: {e}")
+            return False
+        _schema_ready.discard(cache_path)
+        try:
+            os.remove(cache_path)
+            _connect().close()
+        except (sqlite3.Error, OSError) as e:
+            print(f"Error recreating the AI completion cache: {e}")
+            return False
+        return True
@@ -0,0 +1,85 @@
+from src.ai import get_litellm_model, complete_many, DEFAULT_CONCURRENCY_LIMIT, DEFAULT_MAX_RETRIES
+from src.ai_prompts import get_segment_participants, build_segment_prompts
+from src.dossiers import get_dossiers
+from src.events import get_event_by_name
+from src.prefs import load_preferences
+from src.segments import _slugify, _get_segments_file_path, load_segments, load_summary_content, save_summary_content
+from src.storage import file_lock
+from src.tagteams import load_tagteams
+
+def build_card_prompts(event, segments, direction):
+    """
+    Builds the AI prompt for every segment up front, drawing each participant's dossier from
+    the shared dossier cache. Returns a list of full prompts in segment order.
+    """
+    all_tagteams_data = load_tagteams()
+    prompts = []
+    for segment in segments:
+        dossiers = get_dossiers(sorted(get_segment_participants(segment, all_tagteams_data)))
+        final_prompt, _ = build_segment_prompts(event, segment, direction, dossiers)
+        prompts.append(final_prompt)
+    return prompts
+
+def _find_current_segment(event_slug, segment):
+    """Returns the segment as it is saved now, or None if it was deleted or moved since it was read."""
+    for current in load_segments(event_slug):
+        if all(current.get(key) == segment.get(key) for key in ('position', 'summary_file', 'match_id')):
+            return current
+    return None
+
+def generate_card_summaries(event_name, direction, overwrite_existing=False, use_cache=True, progress=None):
+    """
+    Writes AI summaries for every segment of an event. All completions run concurrently, limited
+    by the ai_concurrency_limit preference, and the summary files are only written once every
+    request has finished. Segments that already have a summary are skipped unless
+    overwrite_existing is set; this is checked again before each write, under the event's
+    segments lock, so a summary typed meanwhile is kept and a deleted or moved segment is
+    skipped. Cached responses are reused unless use_cache is False. Returns a status message.
+    """
+    event = get_event_by_name(event_name)
+    if not event:
+        raise ValueError('Event not found.')
+    if event.get('Finalized'):
+        raise ValueError('Finalized events cannot be changed.')
+
+    prefs = load_preferences()
+    ai_model = get_litellm_model(prefs)
+
+    event_slug = _slugify(event_name)
+    segments = sorted((s for s in load_segments(event_slug) if s.get('summary_file')), key=lambda s: s.get('position', 0))
+    if not overwrite_existing:
+        segments = [s for s in segments if not load_summary_content(s.get('summary_file')).strip()]
+    if not segments:
+        return 'Every segment already has a summary; nothing was generated.'
+
+    if progress: progress(0, len(segments), f"Sending {len(segments)} segment(s) to the AI")
+    prompts = build_card_prompts(event, segments, direction)
+    results = complete_many(
+        ai_model,
+        [[{"role": "user", "content": prompt}] for prompt in prompts],
+        concurrency=int(prefs.get('ai_concurrency_limit', DEFAULT_CONCURRENCY_LIMIT)),
+        max_retries=int(prefs.get('ai_max_retries', DEFAULT_MAX_RETRIES)),
+        progress=progress,
+        use_cache=use_cache
+    )
+
+    # Write every summary in one pass once all requests are done
+    failed, skipped = [], []
+    for segment, result in zip(segments, results):
+        if result['error'] or not result['content']:
+            failed.append(f"Segment {segment.get('position')}: {result['error'] or 'empty response'}")
+            continue
+        with file_lock(_get_segments_file_path(event_slug)): # Segment edits wait until the summary is written
+            current = _find_current_segment(event_slug, segment)
+            if current is None or (not overwrite_existing and load_summary_content(current['summary_file']).strip()):
+                skipped.append(str(segment.get('position')))
+                continue
+            save_summary_content(current['summary_file'], result['content'])
+
+    written = len(segments) - len(failed) - len(skipped)
+    message = f"AI summaries written for {written} of {len(segments)} segment(s)."
+    if skipped:
+        message += f" Skipped segment(s) {', '.join(skipped)}, which changed while the summaries were generated."
+    if failed:
+        message += " Failed: " + "; ".join(failed)
+    return message
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import random
+import re
+import time
+from types import SimpleNamespace
+from src.prefs import load_preferences
+
+MOCK_PROVIDER = 'Local Mock'
+MOCK_MODEL_PREFIX = 'mock/'
+MOCK_MODELS = ['mock-writer']
+DEFAULT_MOCK_LATENCY_MS = 800
+DEFAULT_MOCK_ERROR_RATE = 0.0
+STREAM_CHUNK_WORDS = 3
+
+_FIRST_NAMES = ['Rex', 'Vince', 'Dominic', 'Marcus', 'Tyler', 'Jax', 'Eli', 'Santos', 'Kenji', 'Victor', 'Cole',
+                'Nova', 'Raven', 'Luna', 'Tessa', 'Mia', 'Kai', 'Brody', 'Hector', 'Ivan', 'Otis', 'Zane', 'Ash', 'Dante']
+_LAST_NAMES = ['Steele', 'Cruz', 'Blackwood', 'Kane', 'Rivers', 'Volkov', 'Hart', 'Storm', 'Mendez', 'Sato', 'Graves',
+               'Knox', 'Vega', 'Stone', 'Marlowe', 'Reyes', 'Thorne', 'Wilde', 'Fox', 'Drake', 'Okafor', 'Bishop']
+_NICKNAMES = ['The Machine', 'The Phenom', 'The Wolf', 'Mr. Excitement', 'The Natural', 'The Storm', 'The Hammer', '']
+_LOCATIONS = ['Charlotte, North Carolina', 'Parts Unknown', 'Mexico City, Mexico', 'Tokyo, Japan', 'Calgary, Alberta',
+              'Memphis, Tennessee', 'London, England', 'Chicago, Illinois']
+_STYLES = ['Technical', 'Brawler', 'High-Flyer', 'Powerhouse', 'Luchador', 'Submission Specialist', 'Showman']
+_MOVES = ['suplex', 'clothesline', 'dropkick', 'DDT', 'powerbomb', 'spinebuster', 'moonsault', 'German suplex',
+          'superkick', 'piledriver', 'arm-drag', 'enzuigiri']
+_FINISHER_WORDS = ['Driver', 'Bomb', 'Crusher', 'Lock', 'Cutter', 'Splash', 'Breaker', 'Clutch']
+_SUMMARY_SENTENCES = [
+    "{a} started fast, backing {b} into the corner with a flurry of strikes.",
+    "{b} cut off the momentum with a stiff clothesline and a near fall that had the crowd on its feet.",
+    "The pace picked up as {a} and {b} traded suplexes in the middle of the ring.",
+    "{a} hit a high-impact move off the ropes, but {b} kicked out at two.",
+    "After a tense exchange, {a} found an opening and landed the finisher for the decisive moment.",
+    "The crowd rallied behind {b}, who refused to stay down.",
+]
+_PROMO_SENTENCES = [
+    "{a} marched to the ring to a mixed reaction and demanded the microphone.",
+    "{a} called out the locker room, promising that nobody was safe.",
+    "The crowd tried to drown {a} out, but the message came through loud and clear.",
+    "{a} looked straight into the camera and laid down a challenge for the next show.",
+    "{a} dropped the microphone and stood tall as the lights went down.",
+]
+
+class MockProviderError(ConnectionError):
+    """Simulated provider outage. A ConnectionError, so callers treat it as retryable."""
+    pass
+
+# Settings set by benchmarks; take precedence over the preferences when not None
+_overrides = {'latency_ms': None, 'error_rate': None}
+
+def configure_mock(latency_ms=None, error_rate=None):
+    """Overrides the mock latency and error rate for this process, e.g. from a benchmark script."""
+    _overrides['latency_ms'] = latency_ms
+    _overrides['error_rate'] = error_rate
+
+def _get_mock_settings():
+    """Returns (latency_seconds, error_rate) from the overrides or the preferences."""
+    latency_ms, error_rate = _overrides['latency_ms'], _overrides['error_rate']
+    if latency_ms is None or error_rate is None:
+        prefs = load_preferences()
+        if latency_ms is None:
+            latency_ms = prefs.get('ai_mock_latency_ms', DEFAULT_MOCK_LATENCY_MS)
+        if error_rate is None:
+            error_rate = prefs.get('ai_mock_error_rate', DEFAULT_MOCK_ERROR_RATE)
+    return max(float(latency_ms), 0) / 1000, min(max(float(error_rate), 0.0), 1.0)
+
+def is_mock_model(model):
+    """Returns True if a litellm model string names the local mock provider."""
+    return model.startswith(MOCK_MODEL_PREFIX)
+
+def _seeded_random(messages):
+    """Returns a random generator seeded from the messages, so identical prompts get identical answers."""
+    digest = hashlib.sha256(json.dumps(messages, sort_keys=True).encode('utf-8')).hexdigest()
+    return random.Random(int(digest[:16], 16))
+
+def _mock_wrestler(rng, used_names):
+    """Builds one wrestler that follows the roster generator's schema."""
+    for _ in range(50):
+        name = f"{rng.choice(_FIRST_NAMES)} {rng.choice(_LAST_NAMES)}"
+        if name not in used_names:
+            break
+    else:
+        name = f"{rng.choice(_FIRST_NAMES)} {rng.choice(_LAST_NAMES)} {len(used_names) + 1}"
+    used_names.add(name)
+    finisher = f"The {name.split()[-1]} {rng.choice(_FINISHER_WORDS)}"
+    moves = rng.sample(_MOVES, rng.randint(2, 4)) + [finisher]
+    height_in = rng.randint(66, 82)
+    return {
+        "Name": name,
+        "nickname": rng.choice(_NICKNAMES),
+        "location": rng.choice(_LOCATIONS),
+        "Alignment": rng.choice(['Babyface', 'Heel', 'Tweener']),
+        "Wrestling_Styles": rng.sample(_STYLES, rng.randint(1, 3)),
+        "Moves": moves,
+        "Finisher": finisher,
+        "Height": f"{height_in // 12} ft. {height_in % 12} in.",
+        "Weight": f"{rng.randint(160, 340)} lbs.",
+        "DOB": f"{rng.randint(1965, 2002)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+    }
+
+def _mock_roster(rng, prompt_text):
+    """Returns roster JSON for the number of wrestlers asked for, avoiding any name already in the prompt."""
+    count_match = re.search(r'[Gg]enerate (\d+)', prompt_text)
+    count = int(count_match.group(1)) if count_match else 10
+    used_names = {f"{first} {last}" for first in _FIRST_NAMES for last in _LAST_NAMES if f"{first} {last}" in prompt_text}
+    return json.dumps({"wrestlers": [_mock_wrestler(rng, used_names) for _ in range(count)]})
+
+def _mock_summary(rng, prompt_text):
+    """Returns a short match or promo summary naming the participants found in the prompt."""
+    names = re.findall(r'"Name": "([^"]+)"', prompt_text) or re.findall(r'Promo Speaker: (\S[^\n]*)', prompt_text)[:1]
+    if len(names) == 1:
+        return " ".join(sentence.format(a=names[0]) for sentence in rng.sample(_PROMO_SENTENCES, 3))
+    a, b = names[:2] if names else ('The first competitor', 'The second competitor')
+    sentences = rng.sample(_SUMMARY_SENTENCES, 4)
+    return " ".join(sentence.format(a=a, b=b) for sentence in sentences)
+
+def _mock_content(messages, params):
+    """Builds the deterministic response content for a request."""
+    rng = _seeded_random(messages)
+    prompt_text = "\n".join(str(m.get('content', '')) for m in messages)
+    if (params.get('response_format') or {}).get('type') == 'json_object' and 'wrestlers' in prompt_text:
+        return _mock_roster(rng, prompt_text)
+    return _mock_summary(rng, prompt_text)
+
+def _maybe_fail(error_rate):
+    """Raises a simulated outage with probability error_rate."""
+    if error_rate and random.random() < error_rate:
+        raise MockProviderError('Local Mock provider simulated an outage.')
+
+def mock_completion(model, messages, stream=False, timeout=None, **params):
+    """
+    Stands in for litellm.completion with a local, deterministic provider. Responses have the
+    same shape as litellm's, arrive after the configured latency, and fail at the configured rate.
+    """
+    latency, error_rate = _get_mock_settings()
+    content = _mock_content(messages, params)
+    if not stream:
+        time.sleep(latency)
+        _maybe_fail(error_rate)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    def chunks():
+        words = content.split(' ')
+        pieces = [' '.join(words[i:i + STREAM_CHUNK_WORDS]) + ' ' for i in range(0, len(words), STREAM_CHUNK_WORDS)]
+        pieces[-1] = pieces[-1].rstrip(' ')
+        # Half the latency before the first token, the rest spread across the stream
+        time.sleep(latency / 2)
+        _maybe_fail(error_rate)
+        for piece in pieces:
+            time.sleep(latency / 2 / len(pieces))
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+    return chunks()
@@ -0,0 +1,214 @@
+import json
+from src.segments import _get_all_wrestlers_involved, _get_all_tag_teams_involved
+
+CONCISE_NARRATIVE_PROMPT = """
+ACT AS A FAST-PACED, ACTION-FOCUSED COMMENTATOR, providing a concise, move-by-move summary for a wrestling newsletter or match report.
+CRITICAL RULES FOR THIS STYLE:
+1. **Focus on Action ONLY:** Describe the moves and the immediate flow of momentum.
+2. **Elaborate on General Actions:** When a general action (e.g., "several power moves") is implied or given, expand upon it by describing specific moves appropriate to the participants' 'Wrestling_Styles' and 'Signature_Moves' (provided in their dossiers). Use generic names for non-signature moves.
+3. **STRICTLY EXCLUDE DIRECT MENTION OF STATS/STYLES:** Do not explicitly mention wrestler stats (height, weight), alignment, or wrestling styles in the narrative. Instead, *show* their style through the moves described.
+4. **Be Brief and Punchy:** Use short, sharp sentences to drive the action forward without flowery descriptions.
+"""
+
+STANDARD_NARRATIVE_PROMPT = """
+Your description of the match should be vivid and reflect the participants' unique styles.
+- You MUST incorporate some of their listed Signature Moves into the narrative.
+- You SHOULD describe other common wrestling moves that are appropriate for their selected Wrestling Styles (e.g., describe suplexes for a Powerhouse, quick arm-drags for a Luchador, or brawling outside the ring for a Brawler).
+- Use the provided physical stats (height, weight) to inform the story of the match where appropriate (e.g., a smaller wrestler using speed against a larger one).
+- **CRITICAL RULE:** You must *only* use the specific, branded move names provided in a wrestler's 'Signature Moves' list. For all other moves, you MUST use the generic, common name for that maneuver (e.g., "piledriver," "suplex," "DDT"). You are NOT allowed to invent new branded move names (like "The Matthews Driver") for any wrestler.
+"""
+
+NARRATIVE_STYLE_INSTRUCTIONS = {
+    "Standard Commentary": STANDARD_NARRATIVE_PROMPT,
+    "Concise": CONCISE_NARRATIVE_PROMPT,
+    "Dirt Sheet / Tabloid": STANDARD_NARRATIVE_PROMPT, # Can be customized later
+    "Cinematic": STANDARD_NARRATIVE_PROMPT, # Can be customized later
+}
+
+def segment_from_ai_input(user_input):
+    """Builds a temporary segment dictionary from AI assistant form input, for segments not saved yet."""
+    # Ensure 'position' from user_input is used, defaulting to 0 if not provided or invalid
+    segment_position_from_input = user_input.get('position')
+    try:
+        segment_position_from_input = int(segment_position_from_input)
+    except (ValueError, TypeError):
+        segment_position_from_input = 0 # Default to 0 if conversion fails
+
+    segment = {
+        'position': segment_position_from_input,
+        'type': user_input.get('segment_type'),
+        'header': user_input.get('segment_header', ''),
+    }
+    if segment['type'] == 'Match':
+        segment['sides'] = json.loads(user_input.get('match_sides_json', '[]'))
+        segment['match_championship'] = user_input.get('match_championship', '')
+        segment['match_result'] = user_input.get('overall_match_result', '')
+        segment['winner_method'] = user_input.get('winner_method', '')
+        segment['match_time'] = user_input.get('match_time', '')
+        segment['match_visibility'] = json.loads(user_input.get('match_visibility_json', '{}'))
+    # For Promo segments, we might need to capture the speaker from user_input if it's a new segment
+    if segment['type'] == 'Promo':
+        segment['promo_speaker'] = user_input.get('promo_speaker', '')
+    return segment
+
+def get_segment_participants(segment, all_tagteams_data):
+    """Returns the names of the wrestlers and tag teams a segment's prompt should carry dossiers for."""
+    participants = set()
+    if segment['type'] == 'Match':
+        wrestlers_in_match = _get_all_wrestlers_involved(segment.get('sides', []))
+        teams_in_match = _get_all_tag_teams_involved(segment.get('sides', []), all_tagteams_data)
+        participants.update(wrestlers_in_match)
+        participants.update(teams_in_match)
+    elif segment['type'] == 'Promo':
+        # If a speaker is specified for a promo, add them to participants
+        if segment.get('promo_speaker'):
+            participants.add(segment['promo_speaker'])
+    return participants
+
+def build_dossier(name, all_wrestlers_data, all_tagteams_data):
+    """Builds the prompt dossier for a wrestler or tag team, or returns None if the name is unknown."""
+    wrestler = next((w for w in all_wrestlers_data if w.get('Name') == name), None)
+    if wrestler:
+        return {
+            "Type": "Wrestler",
+            "Name": wrestler.get('Name'),
+            "Nickname": wrestler.get('Nickname'),
+            "Alignment": wrestler.get('Alignment'),
+            "Wrestling_Styles": wrestler.get('Wrestling_Styles', '').split('|') if wrestler.get('Wrestling_Styles') else [],
+            "Belt": wrestler.get('Belt'),
+            "Manager": wrestler.get('Manager'),
+            "Faction": wrestler.get('Faction'),
+            "Height": wrestler.get('Height'),
+            "Weight": wrestler.get('Weight'),
+            "Moves": wrestler.get('Moves', '').split('|') if wrestler.get('Moves') else [],
+        }
+    tagteam = next((t for t in all_tagteams_data if t.get('Name') == name), None)
+    if tagteam:
+        return {
+            "Type": "Tag-Team",
+            "Name": tagteam.get('Name'),
+            "Members": tagteam.get('Members', '').split('|') if tagteam.get('Members') else [],
+            "Alignment": tagteam.get('Alignment'),
+            "Belt": tagteam.get('Belt'),
+            "Manager": tagteam.get('Manager'),
+            "Faction": tagteam.get('Faction'),
+            "Moves": tagteam.get('Moves', '').split('|') if tagteam.get('Moves') else [],
+        }
+    return None
+
+def _event_context_lines(event, segment, promo_speaker, promo_style):
+    """Prompt lines describing the event and the segment being written."""
+    lines = []
+    lines.append("\n--- Event Context ---")
+    lines.append(f"Event Name: {event.get('Event_Name', 'N/A')}")
+    lines.append(f"Event Date: {event.get('Date', 'N/A')}")
+    lines.append(f"Segment Position: {segment.get('position', 'N/A')}")
+    lines.append(f"Segment Type: {segment.get('type', 'N/A')}")
+    if segment.get('header'):
+        lines.append(f"Segment Header: {segment.get('header')}")
+
+    if segment.get('type') == 'Match':
+        if segment.get('match_championship'):
+            lines.append(f"Championship on the line: {segment.get('match_championship')}")
+        if segment.get('match_result'):
+            lines.append(f"Overall Match Result: {segment.get('match_result')}")
+        if segment.get('winner_method'):
+            lines.append(f"Winning Method: {segment.get('winner_method')}")
+        if segment.get('match_time'):
+            lines.append(f"Match Time: {segment.get('match_time')}")
+        if segment.get('match_visibility', {}).get('hide_from_card'):
+            lines.append("Match Visibility: Hidden from card")
+        if segment.get('match_visibility', {}).get('hide_summary'):
+            lines.append("Match Visibility: Summary hidden from event summary")
+        if segment.get('match_visibility', {}).get('hide_result'):
+            lines.append("Match Visibility: Result hidden from card")
+    elif segment.get('type') == 'Promo':
+        if promo_speaker:
+            lines.append(f"Promo Speaker: {promo_speaker}")
+        if promo_style:
+            lines.append(f"Promo Style: {promo_style}")
+    return lines
+
+def _creative_direction_lines(segment, user_input):
+    """Prompt lines carrying the booker's creative direction."""
+    feud_summary = user_input.get('feud_summary', '')
+    story_beats = user_input.get('story_beats', '')
+    detail_level = user_input.get('detail_level', 'Brief Summary')
+    narrative_style = user_input.get('narrative_style', 'Standard Commentary')
+    include_entrances = user_input.get('include_entrances', False)
+    commentary_level = user_input.get('commentary_level', 'None')
+    promo_speaker = user_input.get('promo_speaker', '')
+    promo_style = user_input.get('promo_style', '')
+
+    lines = []
+    if feud_summary:
+        lines.append(f"Feud/Storyline Summary: {feud_summary}")
+    if story_beats:
+        lines.append(f"Key Story Beats & Desired Outcome: {story_beats}")
+
+    if segment.get('type') == 'Match':
+        lines.append(f"Desired Level of Detail: {detail_level}")
+        lines.append(f"Narrative Style: {narrative_style}")
+        lines.append(f"Include Ring Entrances: {'Yes' if include_entrances else 'No'}")
+        lines.append(f"Commentary Level: {commentary_level}")
+    elif segment.get('type') == 'Promo':
+        lines.append(f"Promo Speaker: {promo_speaker}")
+        lines.append(f"Promo Style: {promo_style}")
+        if detail_level != 'Brief Summary':
+            lines.append(f"Desired Level of Detail: {detail_level}")
+        if narrative_style != 'Standard Commentary':
+            lines.append(f"Narrative Style: {narrative_style}")
+    else:
+        if detail_level != 'Brief Summary':
+            lines.append(f"Desired Level of Detail: {detail_level}")
+        if narrative_style != 'Standard Commentary':
+            lines.append(f"Narrative Style: {narrative_style}")
+    return lines
+
+def build_segment_prompts(event, segment, user_input, dossiers):
+    """
+    Assembles the prompts for a segment summary. Returns (full_prompt, review_prompt): the
+    full prompt is sent to the AI, the review prompt is the shorter version shown to the booker.
+    """
+    narrative_style = user_input.get('narrative_style', 'Standard Commentary')
+    include_entrances = user_input.get('include_entrances', False)
+    commentary_level = user_input.get('commentary_level', 'None')
+    promo_speaker = user_input.get('promo_speaker', '')
+    promo_style = user_input.get('promo_style', '')
+    context_lines = _event_context_lines(event, segment, promo_speaker, promo_style)
+    direction_lines = _creative_direction_lines(segment, user_input)
+
+    # Assemble the final prompt for the AI
+    ai_prompt_parts = []
+    ai_prompt_parts.append("You are an AI assistant for a professional wrestling booking simulator. Your task is to generate a segment summary based on the provided context and creative direction.")
+    ai_prompt_parts.extend(context_lines)
+    ai_prompt_parts.append("\n--- Creative Direction ---")
+    ai_prompt_parts.append("IN-RING ACTION INSTRUCTIONS:")
+    ai_prompt_parts.append(NARRATIVE_STYLE_INSTRUCTIONS.get(narrative_style, STANDARD_NARRATIVE_PROMPT))
+    ai_prompt_parts.append("---")
+    ai_prompt_parts.extend(direction_lines)
+
+    if dossiers:
+        ai_prompt_parts.append("\n--- Participant Dossiers ---")
+        for dossier in dossiers:
+            ai_prompt_parts.append(json.dumps(dossier, indent=2))
+        ai_prompt_parts.append("--- End Participant Dossiers ---")
+
+    ai_prompt_parts.append("\n--- Task ---")
+    task_description = f"Generate a segment summary for Segment {segment.get('position', 'N/A')} of {event.get('Event_Name', 'N/A')}. The summary should be written in the specified narrative style and detail level, incorporating the feud/storyline context, key story beats, and participant information."
+
+    if segment.get('type') == 'Match':
+        if include_entrances:
+            task_description += " Describe the entrances."
+        if commentary_level != 'None':
+            task_description += f" Weave in commentary appropriate to the '{commentary_level}' level."
+    elif segment.get('type') == 'Promo':
+        task_description += f" Focus on the promo delivered by {promo_speaker} in a {promo_style} style."
+
+    ai_prompt_parts.append(task_description)
+    ai_prompt_parts.append("\n--- Generated Segment Summary ---")
+    final_prompt = "\n".join(ai_prompt_parts)
+
+    # Assemble the user-facing prompt for review
+    user_review_prompt = "\n".join(context_lines + ["\n--- Creative Direction ---"] + direction_lines)
+    return final_prompt, user_review_prompt
@@ -0,0 +1,251 @@
+import base64
+import json
+import math
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from src.ai import complete_with_retries, DEFAULT_CONCURRENCY_LIMIT, DEFAULT_MAX_RETRIES
+from src.wrestlers import load_wrestlers
+
+ROSTER_SINGLE_REQUEST_LIMIT = 30 # Largest roster asked for in one completion
+ROSTER_CHUNK_SIZE = 20 # Wrestlers asked for per completion when a roster is split into chunks
+ROSTER_MAX_WRESTLERS = 300
+ROSTER_REQUEST_FACTOR = 2 # Up to this many times the planned requests are sent to make up for duplicates and failures
+BATCH_RETENTION = 3600 # Seconds a finished batch is kept for its review page
+
+_batches = {}
+_batches_lock = threading.Lock()
+
+def build_roster_messages(roster_prompt, content_mode, count, taken_names=(), chunk_number=None):
+    """
+    Builds the messages for one roster completion. `taken_names` are listed in the prompt so the
+    AI does not reuse them, and `chunk_number` tells parallel chunks apart so they do not
+    produce the same wrestlers.
+    """
+    system_prompt = f"""
+        You are an expert wrestling booker and creative writer. Your task is to generate a list of {count} professional wrestlers based on the user's prompt.
+        The output MUST be a single, valid JSON object with a top-level key "wrestlers" containing an array of wrestler objects.
+        Each wrestler object MUST strictly adhere to the following schema, which only includes the creative elements:
+        {{
+          "Name": "STRING (e.g., Ric Flair) - Must be unique and creative.",
+          "nickname": "STRING (e.g., 'The Nature Boy') - Can be empty if no nickname.",
+          "location": "STRING (e.g., 'Charlotte, North Carolina' or 'Parts Unknown')",
+          "Alignment": "STRING (MUST be one of: 'Babyface', 'Heel', 'Tweener')",
+          "Wrestling_Styles": "ARRAY OF STRINGS (List 1-3 appropriate styles, e.g., ['Technical', 'Brawler', 'High-Flyer'])",
+          "Moves": "ARRAY OF STRINGS (List 3-5 signature moves. Use generic names only for non-finishers. MUST include one clear finisher name)",
+          "Finisher": "STRING (The name of the finisher move, must match one item in 'Moves')",
+          "Height": "STRING (e.g., '5 ft. 1 in.' or '185 cm')",
+          "Weight": "STRING (e.g., '243 lbs.')",
+          "DOB": "DATE (e.g. '1972-07-04') - Must be a valid date in YYYY-MM-DD format."
+        }}
+        Ensure all fields are populated with creative and realistic data relevant to the prompt.
+        The 'Name' field must be unique for each wrestler.
+        """
+
+    if content_mode == 'real_world':
+        # This is the CRITICAL instruction to force tool use
+        system_prompt += f"""
+
+            *** CRITICAL REAL-WORLD INSTRUCTION ***
+            You are in REAL-WORLD mode. You MUST use the Google Search grounding tool to find the real names,
+            heights, weights, birthdates, and move sets of historical or active wrestlers matching the user's prompt.
+            Do NOT invent any data for this mode. Use the information found via search exclusively.
+            """
+        user_prompt = f"Using your search tool, generate {count} REAL-WORLD wrestlers. Creative prompt: '{roster_prompt}'"
+    else:
+        user_prompt = f"Generate {count} FICTIONAL wrestlers. Creative prompt: '{roster_prompt}'"
+
+    if chunk_number is not None:
+        user_prompt += f"\nThis is part {chunk_number} of a larger roster, so give it its own mix of wrestlers."
+    if taken_names:
+        user_prompt += "\nThese names are already taken. Do NOT reuse them or close variations of them: " + ", ".join(taken_names)
+
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
+
+def get_roster_request_params(content_mode):
+    """Returns the completion parameters for a roster request."""
+    # Grounding logic
+    tools = []
+    if content_mode == 'real_world':
+        tools = [{"google_search": {}}]
+    return {
+        'tools': tools,
+        'response_format': {"type": "json_object"}, # Instruct API to return JSON
+        'temperature': 0.7, # A bit of creativity
+    }
+
+def parse_roster_response(ai_content):
+    """
+    Parses a roster completion into wrestler records ready for the review page.
+    Raises json.JSONDecodeError if the response is not valid JSON.
+    """
+    generated_data = json.loads(ai_content)
+    generated_roster_raw = generated_data.get('wrestlers', []) if isinstance(generated_data, dict) else []
+
+    wrestlers = []
+    for wrestler_data in generated_roster_raw:
+        if not isinstance(wrestler_data, dict):
+            continue
+        # Keep the lowercase keys for the review page and add the capitalized ones used when saving
+        if 'location' in wrestler_data:
+            wrestler_data['Location'] = wrestler_data['location']
+        if 'nickname' in wrestler_data:
+            wrestler_data['Nickname'] = wrestler_data['nickname']
+
+        if 'Status' not in wrestler_data:
+            wrestler_data['Status'] = 'Inactive'
+        if 'Belt' not in wrestler_data:
+            wrestler_data['Belt'] = ''
+        if 'Team' not in wrestler_data:
+            wrestler_data['Team'] = ''
+
+        # Initialize all match record fields if missing
+        for key in ['Singles_Wins', 'Singles_Losses', 'Singles_Draws', 'Tag_Wins', 'Tag_Losses', 'Tag_Draws']:
+            if key not in wrestler_data:
+                wrestler_data[key] = 0
+        wrestlers.append(wrestler_data)
+    return wrestlers
+
+def encode_wrestler(wrestler_data):
+    """Returns a wrestler record as Base64-encoded JSON, the form the commit step expects."""
+    return base64.b64encode(json.dumps(wrestler_data).encode('utf-8')).decode('utf-8')
+
+def _name_key(name):
+    """Normalizes a wrestler name for duplicate checks."""
+    return " ".join(str(name or '').lower().split())
+
+# --- Chunked generation ---
+
+def _prune_batches():
+    """Forgets finished batches older than BATCH_RETENTION seconds."""
+    cutoff = time.monotonic() - BATCH_RETENTION
+    with _batches_lock:
+        expired = [bid for bid, b in _batches.items() if b['finished_at'] and b['finished_at'] < cutoff]
+        for bid in expired:
+            del _batches[bid]
+
+def create_roster_batch(total):
+    """Registers a new chunked roster batch and returns its ID."""
+    _prune_batches()
+    batch_id = uuid.uuid4().hex
+    with _batches_lock:
+        _batches[batch_id] = {
+            'total': total,
+            'wrestlers': [],
+            'requests': 0,
+            'duplicates': 0,
+            'errors': [],
+            'job_id': None,
+            'finished_at': None,
+        }
+    return batch_id
+
+def set_batch_job(batch_id, job_id):
+    """Links a batch to the background job generating it."""
+    with _batches_lock:
+        if batch_id in _batches:
+            _batches[batch_id]['job_id'] = job_id
+
+def get_roster_batch(batch_id, start=0):
+    """
+    Returns a snapshot of a batch with the wrestlers from index `start` onwards,
+    or None if the batch is unknown or has expired.
+    """
+    with _batches_lock:
+        batch = _batches.get(batch_id)
+        if not batch:
+            return None
+        snapshot = dict(batch)
+        snapshot['count'] = len(batch['wrestlers'])
+        snapshot['wrestlers'] = batch['wrestlers'][start:]
+        snapshot['errors'] = list(batch['errors'])
+        snapshot['finished'] = batch['finished_at'] is not None
+    return snapshot
+
+def _merge_chunk(batch, wrestlers, taken):
+    """Adds a chunk's wrestlers to the batch, skipping names already taken. Call with the lock held."""
+    for wrestler_data in wrestlers:
+        key = _name_key(wrestler_data.get('Name'))
+        if not key or key in taken:
+            batch['duplicates'] += 1
+            continue
+        if len(batch['wrestlers']) >= batch['total']:
+            break
+        taken.add(key)
+        batch['wrestlers'].append(wrestler_data)
+
+def _generate_chunk(model, roster_prompt, content_mode, count, taken_names, chunk_number, max_retries, use_cache):
+    """Worker body: requests one chunk of the roster and parses it."""
+    messages = build_roster_messages(roster_prompt, content_mode, count, taken_names, chunk_number)
+    ai_content = complete_with_retries(model, messages, max_retries=max_retries, use_cache=use_cache,
+                                       **get_roster_request_params(content_mode))
+    return parse_roster_response(ai_content)
+
+def generate_roster_in_chunks(batch_id, model, roster_prompt, content_mode, concurrency=DEFAULT_CONCURRENCY_LIMIT,
+                              max_retries=DEFAULT_MAX_RETRIES, use_cache=True, progress=None):
+    """
+    Generates a large roster as chunks of ROSTER_CHUNK_SIZE wrestlers, with at most `concurrency`
+    chunks in flight. Each new chunk is seeded with every name generated so far, and each
+    finished chunk is merged into the batch straight away, dropping duplicate names and names
+    already on the roster. Wall-clock time therefore grows with the number of chunk waves, not
+    the roster size. Returns a status message.
+    """
+    with _batches_lock:
+        batch = _batches[batch_id]
+    total = batch['total']
+    taken = {_name_key(w.get('Name')) for w in load_wrestlers()}
+    max_requests = math.ceil(total / ROSTER_CHUNK_SIZE) * ROSTER_REQUEST_FACTOR
+    concurrency = max(int(concurrency), 1)
+
+    pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='slamsim-ai-roster')
+    futures = {}
+    try:
+        if progress: progress(0, total, f"Generating {total} wrestlers in chunks of {ROSTER_CHUNK_SIZE}")
+        while True:
+            # Keep the pool full while wrestlers are still missing
+            with _batches_lock:
+                pending = sum(futures.values())
+                while len(futures) < concurrency and batch['requests'] < max_requests:
+                    count = min(ROSTER_CHUNK_SIZE, total - len(batch['wrestlers']) - pending)
+                    if count <= 0:
+                        break
+                    batch['requests'] += 1
+                    taken_names = [w.get('Name') for w in batch['wrestlers']]
+                    future = pool.submit(_generate_chunk, model, roster_prompt, content_mode, count, taken_names,
+                                         batch['requests'], max_retries, use_cache)
+                    futures[future] = count
+                    pending += count
+            if not futures:
+                break
+
+            finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in finished:
+                del futures[future]
+                try:
+                    wrestlers = future.result()
+                except Exception as e:
+                    print(f"Error generating roster chunk: {e}")
+                    with _batches_lock:
+                        batch['errors'].append(str(e))
+                    continue
+                with _batches_lock:
+                    _merge_chunk(batch, wrestlers, taken)
+            if progress: progress(len(batch['wrestlers']), total, f"{len(batch['wrestlers'])} of {total} wrestlers generated")
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        with _batches_lock:
+            batch['finished_at'] = time.monotonic()
+
+    generated = len(batch['wrestlers'])
+    if not generated and batch['errors']:
+        raise ValueError(f"Every AI request failed. Last error: {batch['errors'][-1]}")
+    message = f"Generated {generated} of {total} wrestlers in {batch['requests']} AI request(s)."
+    if batch['duplicates']:
+        message += f" Skipped {batch['duplicates']} duplicate name(s)."
+    if batch['errors']:
+        message += f" {len(batch['errors'])} request(s) failed."
+    return message
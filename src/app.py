@@ -1,56 +1,112 @@
+import importlib
 import os
+import sys
 import markdown
-from flask import Flask, render_template, url_for
-from routes.divisions import divisions_bp
-from routes.prefs import prefs_bp
-from routes.wrestlers import wrestlers_bp
-from routes.tagteams import tagteams_bp
-from routes.events import events_bp
-from routes.segments import segments_bp
-from routes.belts import belts_bp
-from routes.news import news_bp
-from routes.booker import booker_bp # Import the new booker blueprint
-from routes.fan import fan_bp       # Import the new fan blueprint
-from routes.tools import tools_bp   # Import the new tools blueprint
+from flask import Flask, render_template, redirect, url_for, jsonify, flash, request
 from src.system import INCLUDES_DIR, LEAGUE_LOGO_FILENAME # Import INCLUDES_DIR and LEAGUE_LOGO_FILENAME
+from src.storage import StorageError
+from src.schema import migrate_data
 
-app = Flask(__name__, template_folder='../templates')
-app.config['SECRET_KEY'] = 'a_very_secret_key_for_flash_messages'
-# Configure UPLOAD_FOLDER to be the 'includes' directory within the project root
-app.config['UPLOAD_FOLDER'] = os.path.join(app.root_path, INCLUDES_DIR)
-
-# Register blueprints
-app.register_blueprint(divisions_bp)
-app.register_blueprint(prefs_bp)
-app.register_blueprint(wrestlers_bp)
-app.register_blueprint(tagteams_bp)
-app.register_blueprint(events_bp)
-app.register_blueprint(segments_bp)
-app.register_blueprint(belts_bp)
-app.register_blueprint(news_bp)
-app.register_blueprint(booker_bp) # Register the booker blueprint
-app.register_blueprint(fan_bp)     # Register the fan blueprint
-app.register_blueprint(tools_bp)   # Register the tools blueprint
-
-# Register a custom Jinja2 filter for markdown
-@app.template_filter('markdown')
-def markdown_filter(text):
-    return markdown.markdown(text)
-
-@app.route('/')
-def index():
-    return render_template('index.html')
-
-@app.route('/about')
-def about():
-    """Renders the about page."""
-    return render_template('about.html')
-
-@app.route('/goodbye')
-def goodbye():
-    """Renders the goodbye page."""
-    return render_template('goodbye.html')
+# (module, blueprint) pairs in registration order. Modules are only imported when their
+# blueprint is registered, so a fan-only app never loads the booker tools or the AI libraries.
+BOOKER_BLUEPRINTS = [
+    ('routes.divisions', 'divisions_bp'),
+    ('routes.prefs', 'prefs_bp'),
+    ('routes.wrestlers', 'wrestlers_bp'),
+    ('routes.tagteams', 'tagteams_bp'),
+    ('routes.events', 'events_bp'),
+    ('routes.segments', 'segments_bp'),
+    ('routes.belts', 'belts_bp'),
+    ('routes.news', 'news_bp'),
+    ('routes.booker', 'booker_bp'),
+    ('routes.api', 'api_bp'), # JSON records with ETag / If-Match versions
+]
+FAN_BLUEPRINTS = [
+    ('routes.fan', 'fan_bp'),
+]
+TOOLS_BLUEPRINTS = [
+    ('routes.tools', 'tools_bp'),
+    ('routes.jobs', 'jobs_bp'), # Background job progress pages
+]
 
-if __name__ == '__main__':
-    app.run(debug=True)
+def create_app(fan_only=False):
+    """
+    Builds the Flask application. A fan-only app registers just the fan pages, for
+    deployments that only publish the league and never book shows or use the AI tools.
+    """
+    app = Flask(__name__, template_folder='../templates')
+    app.config['SECRET_KEY'] = 'a_very_secret_key_for_flash_messages'
+    # Configure UPLOAD_FOLDER to be the 'includes' directory within the project root
+    app.config['UPLOAD_FOLDER'] = os.path.join(app.root_path, INCLUDES_DIR)
+    app.config['FAN_ONLY'] = fan_only
+
+    migrate_data() # Bring data saved by an older version up to the current schema
+
+    if fan_only:
+        # A fan site only reads the league, so load all of it, event cards included, up front.
+        # Requests are then served from memory; the snapshot reloads when a data file changes or on SIGHUP.
+        from src.league import preload_league_snapshot
+        preload_league_snapshot(include_event_cards=True)
+
+    # Register blueprints
+    blueprints = FAN_BLUEPRINTS if fan_only else BOOKER_BLUEPRINTS + FAN_BLUEPRINTS + TOOLS_BLUEPRINTS
+    for module_name, blueprint_name in blueprints:
+        app.register_blueprint(getattr(importlib.import_module(module_name), blueprint_name))
+
+    @app.context_processor
+    def inject_fan_only():
+        """Lets templates hide links to pages a fan-only app does not serve."""
+        return {'fan_only': fan_only}
+
+    @app.before_request
+    def refuse_writes_when_fan_only():
+        """A fan-only app is read-only: anything but a page view is refused."""
+        if fan_only and request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            return jsonify({'error': 'This fan site is read-only.'}), 405
+
+    @app.errorhandler(StorageError)
+    def handle_storage_error(e):
+        """Reports a busy or changed data file instead of failing the request with a server error."""
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify({'error': str(e)}), 409
+        flash(str(e), 'error')
+        return redirect(request.referrer or url_for('index'))
+
+    # Register a custom Jinja2 filter for markdown
+    @app.template_filter('markdown')
+    def markdown_filter(text):
+        return markdown.markdown(text)
 
+    @app.route('/')
+    def index():
+        if fan_only:
+            return redirect(url_for('fan.home'))
+        return render_template('index.html')
+
+    @app.route('/healthz')
+    def healthz():
+        """Readiness probe: answers once the app is serving requests."""
+        return jsonify({'status': 'ok', 'mode': 'fan' if fan_only else 'full'})
+
+    @app.route('/about')
+    def about():
+        """Renders the about page."""
+        return render_template('about.html')
+
+    @app.route('/goodbye')
+    def goodbye():
+        """Renders the goodbye page."""
+        return render_template('goodbye.html')
+
+    return app
+
+def __getattr__(name):
+    """Builds the full application the first time `src.app.app` is used."""
+    if name == 'app':
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+if __name__ == '__main__':
+    create_app(fan_only='--fan-only' in sys.argv).run(debug=True) # Development only; src/server.py serves production
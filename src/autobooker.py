@@ -0,0 +1,205 @@
+import random
+from src.events import get_event_by_name
+from src.belts import load_belts
+from src.divisions import load_divisions
+from src.ratings import load_ratings, get_rating, get_team_rating
+from src.bookings import load_booking_index, get_bookings_on_date
+from src.storage import file_lock
+from src.segments import (
+    load_segments, load_active_wrestlers, load_active_tagteams, validate_match_data,
+    _add_segment, _get_segments_file_path, _slugify, _validate_match_structure
+)
+
+DEFAULT_MATCH_COUNT = 10
+MAX_MATCH_COUNT = 30
+
+def _get_booked_wrestlers(event):
+    """Returns everyone already on a match card of any event on the same date as this one, this event included."""
+    booked = set(get_bookings_on_date(event.get('Date')))
+    booked.update(load_booking_index()['Events'].get(_slugify(event.get('Event_Name', '')), {}).get('Participants', []))
+    return booked
+
+def _build_entries(wrestlers, tagteams, ratings):
+    """
+    Returns the bookable wrestlers and tag teams as entries with the names they put on a side
+    and their rating, keyed by name. A tag team with a member who is not active is left out.
+    """
+    wrestler_entries = {w['Name']: {'name': w['Name'], 'side': [w['Name']], 'rating': get_rating(ratings, w['Name']),
+                                    'division': w.get('Division')} for w in wrestlers if w.get('Name')}
+    team_entries = {}
+    for team in tagteams:
+        members = [m for m in team.get('Members', '').split('|') if m]
+        if team.get('Name') and members and all(m in wrestler_entries for m in members):
+            team_entries[team['Name']] = {'name': team['Name'], 'side': members, 'rating': get_team_rating(ratings, members),
+                                          'division': team.get('Division')}
+    return wrestler_entries, team_entries
+
+def _close_pairs(pool, is_free):
+    """
+    Yields pairs of free entries that are neighbours by rating, closest first: the cheapest pairings
+    to try. Once a yielded pair has been booked, the free entries left are sorted and paired again,
+    so nobody free is skipped for lack of a neighbour.
+    """
+    while True:
+        ordered = sorted((e for e in pool if is_free(e)), key=lambda e: e['rating'])
+        pairs = sorted(zip(ordered, ordered[1:]), key=lambda p: p[1]['rating'] - p[0]['rating'])
+        for first, second in pairs:
+            if not (is_free(first) and is_free(second)):
+                continue
+            yield first, second
+            if not (is_free(first) and is_free(second)):
+                break # Booked: pair the rest again
+        else:
+            return
+
+def _random_pairs(pool, rng, is_free):
+    """Yields random pairs from the pool, skipping anyone booked since the pool was shuffled."""
+    order = list(pool)
+    rng.shuffle(order)
+    waiting = None
+    for entry in order:
+        if not is_free(entry):
+            continue
+        if waiting is None or not is_free(waiting):
+            waiting = entry
+            continue
+        yield waiting, entry
+        waiting = None
+
+def _pick_challenger(holder, pool, rng, is_free, favour_close_ratings):
+    """Returns the free contender closest in rating to the champion, or a random free one."""
+    contenders = [e for e in pool if e['name'] != holder['name'] and is_free(e)
+                  and not set(e['side']) & set(holder['side'])]
+    if not contenders:
+        return None
+    if favour_close_ratings:
+        return min(contenders, key=lambda e: (abs(e['rating'] - holder['rating']), e['name']))
+    return rng.choice(contenders)
+
+def generate_card(event_name, match_count=DEFAULT_MATCH_COUNT, favour_close_ratings=True, seed=None):
+    """
+    Proposes a card of one-on-one singles matches and two-on-two tag matches for an event. Every
+    active belt with a champion gets a title defense against someone from the champion's division;
+    the other matches pair wrestlers or tag teams from the same division, taking the divisions in
+    turn. Nobody already booked on the same date is used twice. Returns (matches, notes); each
+    match has 'sides', 'match_championship' and 'ratings', title defenses last.
+    """
+    event = get_event_by_name(event_name)
+    if not event:
+        raise ValueError(f"Event '{event_name}' not found.")
+    rng = random.Random(seed)
+    ratings = load_ratings()
+    wrestler_entries, team_entries = _build_entries(load_active_wrestlers(), load_active_tagteams(), ratings)
+    booked = _get_booked_wrestlers(event)
+    notes = []
+
+    def is_free(entry):
+        return not booked.intersection(entry['side'])
+
+    def propose(first, second, belt_name=''):
+        sides = [list(first['side']), list(second['side'])]
+        if set(sides[0]) & set(sides[1]) or _validate_match_structure(sides): # Shared member, or e.g. a trio against a pair
+            return None
+        booked.update(first['side'] + second['side'])
+        return {'sides': sides, 'match_championship': belt_name, 'ratings': [round(first['rating']), round(second['rating'])]}
+
+    # Division pools, by holder type
+    pools = []
+    for division in sorted(load_divisions(), key=lambda d: d.get('Display_Position', 0)):
+        if division.get('Status') != 'Active':
+            continue
+        entries = team_entries if division.get('Holder_Type') == 'Tag-Team' else wrestler_entries
+        pool = [e for e in entries.values() if e['division'] == division.get('ID')]
+        if len(pool) >= 2:
+            pools.append(pool)
+    pool_of = {e['name']: pool for pool in pools for e in pool}
+
+    # Title defenses come first so champions are not booked elsewhere on the card
+    title_matches = []
+    for belt in load_belts():
+        if belt.get('Status') != 'Active':
+            continue
+        if not belt.get('Current_Holder'):
+            notes.append(f"{belt.get('Name')} is vacant; no defense booked.")
+            continue
+        entries = team_entries if belt.get('Holder_Type') == 'Tag-Team' else wrestler_entries
+        holder = entries.get(belt['Current_Holder'])
+        if holder is None:
+            notes.append(f"{belt.get('Name')}: {belt['Current_Holder']} is not active; no defense booked.")
+            continue
+        if not is_free(holder):
+            notes.append(f"{belt.get('Name')}: {holder['name']} is already booked on this date.")
+            continue
+        if len(title_matches) >= match_count:
+            notes.append(f"{belt.get('Name')}: no room left on the card for a defense.")
+            continue
+        pool = pool_of.get(holder['name'], list(entries.values()))
+        challenger = _pick_challenger(holder, pool, rng, is_free, favour_close_ratings)
+        match = propose(holder, challenger, belt.get('Name')) if challenger else None
+        if match:
+            title_matches.append(match)
+        else:
+            notes.append(f"{belt.get('Name')}: no free challenger for {holder['name']}.")
+
+    # Fill the rest of the card, one match per division in turn
+    matches = []
+    candidates = [_close_pairs(pool, is_free) if favour_close_ratings else _random_pairs(pool, rng, is_free) for pool in pools]
+    while candidates and len(matches) + len(title_matches) < match_count:
+        for pairs in list(candidates):
+            if len(matches) + len(title_matches) >= match_count:
+                break
+            match = None
+            for first, second in pairs:
+                if is_free(first) and is_free(second):
+                    match = propose(first, second)
+                    if match:
+                        break
+            if match:
+                matches.append(match)
+            else:
+                candidates.remove(pairs) # Division exhausted
+    if len(matches) + len(title_matches) < match_count:
+        notes.append(f"Only {len(matches) + len(title_matches)} of {match_count} matches could be booked with the free roster.")
+    return matches + title_matches, notes
+
+def book_card(event_name, matches):
+    """
+    Adds proposed matches to the end of an event's card. Every match is validated and everyone is
+    checked again first, under the event's segments lock, so a proposal that went stale (someone
+    was booked meanwhile) or has an invalid match is refused as a whole.
+    Returns (success, message).
+    """
+    event = get_event_by_name(event_name)
+    if not event or event.get('Finalized'):
+        return False, "Event not found or already finalized."
+    for i, match in enumerate(matches, start=1):
+        sides = match.get('sides') if isinstance(match, dict) else None
+        if not isinstance(sides, list) or not all(isinstance(side, list) and all(isinstance(n, str) for n in side) for side in sides):
+            return False, f"Match {i} is not a valid proposal. Generate a new card."
+        errors, _ = validate_match_data(sides)
+        if errors:
+            return False, f"Match {i}: {', '.join(errors)}"
+
+    event_slug = _slugify(event_name)
+    with file_lock(_get_segments_file_path(event_slug)): # The whole card is added as one segment edit
+        booked = _get_booked_wrestlers(event)
+        on_card = set()
+        for match in matches:
+            names = [name for side in match['sides'] for name in side]
+            clashes = booked.intersection(names) | on_card.intersection(names)
+            if clashes:
+                return False, f"{', '.join(sorted(clashes))} already booked on this date. Generate a new card."
+            on_card.update(names)
+
+        position = max((s.get('position', 0) for s in load_segments(event_slug)), default=0)
+        for match in matches:
+            position += 1
+            header = f"{match['match_championship']} Match" if match.get('match_championship') else ''
+            try:
+                success, message = _add_segment(event_slug, {'position': position, 'type': 'Match', 'header': header}, '',
+                                                {'sides': match['sides'], 'match_championship': match.get('match_championship', '')})
+            except ValueError as e:
+                success, message = False, str(e)
+            if not success:
+                return False, message
+    return True, f"{len(matches)} matches added to the card."
@@ -0,0 +1,458 @@
+import ctypes
+import errno
+import hashlib
+import json
+import os
+import shutil
+import sys
+import uuid
+import zipfile
+import zlib
+from datetime import datetime
+from src.system import get_project_root, DATA_DIR, delete_all_temporary_files, invalidate_caches
+
+SNAPSHOTS_DIR = 'snapshots'
+SNAPSHOT_OBJECTS_SUBDIR = 'objects'
+SNAPSHOT_MANIFESTS_SUBDIR = 'manifests'
+DEFAULT_SNAPSHOT_RETENTION = 10
+STREAM_CHUNK_SIZE = 64 * 1024
+MAX_REPORTED_VALIDATION_ERRORS = 10
+
+# Required keys for every record in each top-level data file. A file must hold a JSON list.
+DATA_FILE_SCHEMAS = {
+    'wrestlers.json': ('Name',),
+    'tagteams.json': ('Name',),
+    'belts.json': ('ID', 'Name'),
+    'belt_history.json': ('Belt_ID', 'Champion_Name'),
+    'divisions.json': ('ID', 'Name'),
+    'events.json': ('Event_Name',),
+    'news.json': (),
+    'prefs.json': ('Pref', 'Value'),
+}
+# Required keys for per-event files in data/events, matched by filename suffix
+EVENT_FILE_SCHEMAS = {
+    '_segments.json': ('position', 'type'),
+    '_matches.json': ('match_id', 'sides'),
+}
+
+# --- Streaming Zip Backups ---
+
+class _ZipStreamSink:
+    """
+    Minimal write-only file object for zipfile. zipfile detects that it cannot seek
+    and writes data descriptors instead, so the archive can be sent as it is built.
+    """
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        """Returns and clears everything written since the last drain."""
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+def _get_data_path():
+    """Returns the absolute path to the data directory."""
+    return os.path.join(get_project_root(), DATA_DIR)
+
+def _iter_data_files(data_path):
+    """Yields (absolute_path, relative_path) for every file under the data directory, in a stable order."""
+    for dirpath, dirnames, filenames in os.walk(data_path):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            abs_path = os.path.join(dirpath, filename)
+            rel_path = os.path.relpath(abs_path, data_path).replace(os.sep, '/')
+            yield abs_path, rel_path
+
+def stream_data_backup():
+    """
+    Generator that yields a zip archive of the data directory chunk by chunk.
+    Entries are stored under 'data/' so the archive matches the layout restore expects.
+    Nothing is written to disk.
+    """
+    data_path = _get_data_path()
+    sink = _ZipStreamSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        for abs_path, rel_path in _iter_data_files(data_path):
+            with open(abs_path, 'rb') as src, zf.open(f"{DATA_DIR}/{rel_path}", 'w') as dest:
+                while True:
+                    chunk = src.read(STREAM_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    dest.write(chunk)
+                    pending = sink.drain()
+                    if pending:
+                        yield pending
+            pending = sink.drain()
+            if pending:
+                yield pending
+    # Closing the archive writes the central directory
+    pending = sink.drain()
+    if pending:
+        yield pending
+
+def get_backup_filename():
+    """Returns a timestamped filename for a downloadable backup."""
+    return f"slamsim_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+
+# --- Incremental Snapshots ---
+
+def _get_snapshots_path(*parts):
+    """Constructs an absolute path inside the snapshots directory."""
+    return os.path.join(get_project_root(), SNAPSHOTS_DIR, *parts)
+
+def _get_object_path(file_hash):
+    """Returns the path of a content-addressed object, fanned out by the first two hex digits."""
+    return _get_snapshots_path(SNAPSHOT_OBJECTS_SUBDIR, file_hash[:2], file_hash)
+
+def _get_manifest_path(snapshot_id):
+    """Returns the path of a snapshot manifest."""
+    return _get_snapshots_path(SNAPSHOT_MANIFESTS_SUBDIR, f"{snapshot_id}.json")
+
+def _hash_file(file_path):
+    """Returns the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(STREAM_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _store_object(file_path, file_hash):
+    """Stores a compressed copy of a file under its hash. Returns True if a new object was written."""
+    object_path = _get_object_path(file_hash)
+    if os.path.exists(object_path):
+        return False
+    os.makedirs(os.path.dirname(object_path), exist_ok=True)
+    with open(file_path, 'rb') as f:
+        compressed = zlib.compress(f.read())
+    temp_path = f"{object_path}.{uuid.uuid4().hex}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(compressed)
+    os.replace(temp_path, object_path)
+    return True
+
+def _read_object(file_hash):
+    """Returns the decompressed contents of a stored object."""
+    with open(_get_object_path(file_hash), 'rb') as f:
+        return zlib.decompress(f.read())
+
+def list_snapshots():
+    """Returns all snapshot manifests, newest first."""
+    manifests_dir = _get_snapshots_path(SNAPSHOT_MANIFESTS_SUBDIR)
+    if not os.path.exists(manifests_dir):
+        return []
+    snapshots = []
+    for filename in os.listdir(manifests_dir):
+        if not filename.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(manifests_dir, filename), 'r', encoding='utf-8') as f:
+                snapshots.append(json.load(f))
+        except (IOError, json.JSONDecodeError) as e:
+            print(f"Error reading snapshot manifest {filename}: {e}")
+    snapshots.sort(key=lambda s: s.get('Created', ''), reverse=True)
+    return snapshots
+
+def get_snapshot(snapshot_id):
+    """Retrieves a single snapshot manifest by its ID."""
+    manifest_path = _get_manifest_path(snapshot_id)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def create_snapshot(note='', retention=DEFAULT_SNAPSHOT_RETENTION, progress=None):
+    """
+    Records the current state of the data directory as a snapshot.
+    Files are stored by content hash, so only files that changed since an earlier
+    snapshot take up new space. Files whose size and modification time match the
+    previous snapshot are not re-hashed.
+    Returns the new manifest.
+    """
+    data_path = _get_data_path()
+    if not os.path.exists(data_path):
+        raise FileNotFoundError("No data directory found to snapshot.")
+
+    previous = next(iter(list_snapshots()), None)
+    previous_files = previous.get('Files', {}) if previous else {}
+    previous_stats = previous.get('Stats', {}) if previous else {}
+
+    files, stats = {}, {}
+    changed_files = 0
+    for i, (abs_path, rel_path) in enumerate(_iter_data_files(data_path)):
+        if progress: progress(i, None, f"Snapshotting {rel_path}")
+        stat = os.stat(abs_path)
+        file_stat = [stat.st_size, stat.st_mtime_ns]
+        if rel_path in previous_files and previous_stats.get(rel_path) == file_stat:
+            file_hash = previous_files[rel_path]
+        else:
+            file_hash = _hash_file(abs_path)
+        _store_object(abs_path, file_hash)
+        if previous_files.get(rel_path) != file_hash:
+            changed_files += 1
+        files[rel_path] = file_hash
+        stats[rel_path] = file_stat
+
+    now = datetime.now()
+    manifest = {
+        'Snapshot_ID': f"{now.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}",
+        'Created': now.isoformat(timespec='seconds'),
+        'Note': note,
+        'Files': files,
+        'Stats': stats,
+        'File_Count': len(files),
+        'Changed_Files': changed_files,
+        'Removed_Files': len(set(previous_files) - set(files)),
+    }
+    manifest_path = _get_manifest_path(manifest['Snapshot_ID'])
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=4)
+
+    prune_snapshots(retention)
+    return manifest
+
+def delete_snapshot(snapshot_id):
+    """Deletes a snapshot manifest and any objects no other snapshot references."""
+    manifest_path = _get_manifest_path(snapshot_id)
+    if not os.path.exists(manifest_path):
+        return False
+    os.remove(manifest_path)
+    _collect_unreferenced_objects()
+    return True
+
+def prune_snapshots(retention=DEFAULT_SNAPSHOT_RETENTION):
+    """Keeps only the newest `retention` snapshots. Returns the number of snapshots removed."""
+    retention = max(int(retention), 1)
+    expired = list_snapshots()[retention:]
+    for snapshot in expired:
+        os.remove(_get_manifest_path(snapshot['Snapshot_ID']))
+    if expired:
+        _collect_unreferenced_objects()
+    return len(expired)
+
+def _collect_unreferenced_objects():
+    """Removes stored objects that no remaining snapshot references."""
+    referenced = set()
+    for snapshot in list_snapshots():
+        referenced.update(snapshot.get('Files', {}).values())
+    objects_dir = _get_snapshots_path(SNAPSHOT_OBJECTS_SUBDIR)
+    if not os.path.exists(objects_dir):
+        return
+    for fan_dir in os.listdir(objects_dir):
+        fan_path = os.path.join(objects_dir, fan_dir)
+        for object_name in os.listdir(fan_path):
+            if object_name not in referenced:
+                os.remove(os.path.join(fan_path, object_name))
+        if not os.listdir(fan_path):
+            os.rmdir(fan_path)
+
+def _exchange_paths(path_a, path_b):
+    """
+    Atomically exchanges two directory entries using renameat2(RENAME_EXCHANGE).
+    Raises OSError if the platform or filesystem does not support it.
+    """
+    if not sys.platform.startswith('linux'):
+        raise OSError(errno.ENOSYS, "Atomic exchange is only available on Linux.")
+    libc = ctypes.CDLL(None, use_errno=True)
+    renameat2 = getattr(libc, 'renameat2', None)
+    if renameat2 is None:
+        raise OSError(errno.ENOSYS, "renameat2 is not available.")
+    at_fdcwd, rename_exchange = -100, 2
+    if renameat2(at_fdcwd, os.fsencode(path_a), at_fdcwd, os.fsencode(path_b), rename_exchange) != 0:
+        err = ctypes.get_errno()
+        raise OSError(err, os.strerror(err))
+
+def _swap_in_data_dir(staged_path):
+    """
+    Replaces the live data directory with a fully prepared one. Where supported the
+    two directories are exchanged with a single atomic rename; otherwise two renames
+    on the same filesystem leave data/ missing for only an instant. The previous
+    data is removed once the new directory is in place.
+    """
+    data_path = _get_data_path()
+    if os.path.exists(data_path):
+        try:
+            _exchange_paths(staged_path, data_path)
+            shutil.rmtree(staged_path, ignore_errors=True) # staged_path now holds the old data
+            return
+        except OSError:
+            pass
+
+    old_data_path = f"{data_path}_old_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+    if os.path.exists(data_path):
+        os.rename(data_path, old_data_path)
+    try:
+        os.rename(staged_path, data_path)
+    except OSError:
+        if os.path.exists(old_data_path):
+            os.rename(old_data_path, data_path)
+        raise
+    if os.path.exists(old_data_path):
+        shutil.rmtree(old_data_path, ignore_errors=True)
+
+def restore_snapshot(snapshot_id, progress=None):
+    """
+    Restores the data directory to the state recorded in a snapshot. The files are
+    rebuilt from the object store into a staging directory next to data/ and then
+    swapped in. Returns (success, message).
+    """
+    snapshot = get_snapshot(snapshot_id)
+    if not snapshot:
+        return False, "Snapshot not found."
+
+    staged_path = f"{_get_data_path()}_staging_{uuid.uuid4().hex[:8]}"
+    try:
+        os.makedirs(staged_path)
+        snapshot_files = snapshot.get('Files', {})
+        for i, (rel_path, file_hash) in enumerate(snapshot_files.items()):
+            if progress: progress(i, len(snapshot_files), f"Restoring {rel_path}")
+            target_path = os.path.join(staged_path, *rel_path.split('/'))
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            with open(target_path, 'wb') as f:
+                f.write(_read_object(file_hash))
+        _swap_in_data_dir(staged_path)
+    except (OSError, zlib.error) as e:
+        shutil.rmtree(staged_path, ignore_errors=True)
+        return False, f"Error restoring snapshot: {e}"
+
+    invalidate_caches()
+    delete_all_temporary_files()
+    return True, f"League data restored to snapshot from {snapshot.get('Created')}."
+
+# --- Archive Restore ---
+
+def _get_schema_for_file(rel_path):
+    """Returns the required record keys for a data file, or None if the file has no known schema."""
+    if rel_path in DATA_FILE_SCHEMAS:
+        return DATA_FILE_SCHEMAS[rel_path]
+    if rel_path.startswith('events/'):
+        for suffix, required_keys in EVENT_FILE_SCHEMAS.items():
+            if rel_path.endswith(suffix):
+                return required_keys
+    return None
+
+def validate_data_file(rel_path, content):
+    """
+    Validates one data file's parsed content against the expected schema.
+    Returns a list of error messages (empty if the file is valid).
+    """
+    required_keys = _get_schema_for_file(rel_path)
+    if required_keys is None:
+        return []
+    if not isinstance(content, list):
+        return [f"{rel_path}: expected a list of records."]
+    errors = []
+    for i, record in enumerate(content):
+        if not isinstance(record, dict):
+            errors.append(f"{rel_path}: record {i + 1} is not an object.")
+            continue
+        missing = [key for key in required_keys if key not in record]
+        if missing:
+            errors.append(f"{rel_path}: record {i + 1} is missing {', '.join(missing)}.")
+    return errors
+
+def validate_data_dir(data_path):
+    """Parses and validates every JSON file in a data directory. Returns a list of error messages."""
+    errors = []
+    for abs_path, rel_path in _iter_data_files(data_path):
+        if not rel_path.endswith('.json'):
+            continue
+        try:
+            with open(abs_path, 'r', encoding='utf-8') as f:
+                raw = f.read()
+            content = json.loads(raw) if raw.strip() else []
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            errors.append(f"{rel_path}: not valid JSON ({e}).")
+            continue
+        errors.extend(validate_data_file(rel_path, content))
+    return errors
+
+def _get_archive_member_path(member_name, strip_prefix):
+    """
+    Maps a zip member to a path relative to data/, or returns None if it should be
+    skipped. Rejects absolute paths and parent-directory references.
+    """
+    name = member_name.replace('\\', '/')
+    if strip_prefix:
+        if not name.startswith(f'{DATA_DIR}/'):
+            return None
+        name = name[len(DATA_DIR) + 1:]
+    parts = [part for part in name.split('/') if part not in ('', '.')]
+    if not parts or name.startswith('/') or '..' in parts or ':' in parts[0]:
+        return None
+    return '/'.join(parts)
+
+def _extract_archive_to(archive_path, staged_path):
+    """Extracts an uploaded archive into staged_path one member at a time. Returns the number of files written."""
+    files_written = 0
+    with zipfile.ZipFile(archive_path, 'r') as zf:
+        members = zf.infolist()
+        # Backups store everything under data/; older hand-made zips may not
+        strip_prefix = any(m.filename.startswith(f'{DATA_DIR}/') for m in members)
+        for member in members:
+            if member.is_dir():
+                continue
+            rel_path = _get_archive_member_path(member.filename, strip_prefix)
+            if rel_path is None:
+                continue
+            target_path = os.path.join(staged_path, *rel_path.split('/'))
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            with zf.open(member) as src, open(target_path, 'wb') as dest:
+                shutil.copyfileobj(src, dest, STREAM_CHUNK_SIZE)
+            files_written += 1
+    return files_written
+
+def save_uploaded_archive(uploaded_file):
+    """Spools an uploaded backup to disk next to data/ and returns its path for restore_from_archive."""
+    archive_path = os.path.join(get_project_root(), f"{DATA_DIR}_upload_{uuid.uuid4().hex[:8]}.zip")
+    uploaded_file.save(archive_path, buffer_size=STREAM_CHUNK_SIZE)
+    return archive_path
+
+def restore_from_archive(archive_path, progress=None):
+    """
+    Restores league data from a saved zip backup without ever exposing a partly
+    extracted data directory. The archive is extracted member by member into a staging
+    directory, every JSON file is validated, and only then is the staging directory
+    swapped in. The archive is removed afterwards. Returns (success, message).
+    """
+    staged_path = os.path.join(get_project_root(), f"{DATA_DIR}_staging_{uuid.uuid4().hex[:8]}")
+
+    try:
+        os.makedirs(staged_path)
+        if progress: progress(0, 3, 'Extracting backup')
+        if _extract_archive_to(archive_path, staged_path) == 0:
+            return False, "The backup file does not contain any league data."
+
+        if progress: progress(1, 3, 'Validating backup')
+        errors = validate_data_dir(staged_path)
+        if errors:
+            shown = errors[:MAX_REPORTED_VALIDATION_ERRORS]
+            more = len(errors) - len(shown)
+            message = "Backup failed validation; current data was left untouched. " + " ".join(shown)
+            if more > 0:
+                message += f" ({more} more problem(s) not shown.)"
+            return False, message
+
+        if progress: progress(2, 3, 'Swapping in restored data')
+        _swap_in_data_dir(staged_path)
+    except zipfile.BadZipFile:
+        return False, "Invalid backup file. Please upload a valid .zip file."
+    except OSError as e:
+        return False, f"Error restoring data: {e}. Current data was left untouched."
+    finally:
+        if os.path.exists(archive_path):
+            os.remove(archive_path)
+        if os.path.exists(staged_path):
+            shutil.rmtree(staged_path, ignore_errors=True)
+
+    invalidate_caches()
+    delete_all_temporary_files()
+    return True, "League data restored successfully!"
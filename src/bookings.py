@@ -0,0 +1,115 @@
+import os
+from src.storage import read_json, write_json, edit_json, get_file_version
+
+BOOKINGS_FILE_RELATIVE_TO_ROOT = 'data/bookings.json'
+
+def _get_bookings_file_path():
+    """Constructs the absolute path to the booking index file."""
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    return os.path.join(project_root, BOOKINGS_FILE_RELATIVE_TO_ROOT)
+
+def _new_index():
+    """
+    Returns an empty booking index. 'Events' maps an event slug to its name, date and the
+    wrestlers on its matches; 'Dates' maps a date to each booked wrestler's event slugs.
+    """
+    return {'Events': {}, 'Dates': {}}
+
+_index_cache = None # (bookings.json version, index)
+
+def load_booking_index():
+    """Returns the booking index, re-read only when bookings.json has been saved. Treat it as read-only."""
+    global _index_cache
+    version = get_file_version(_get_bookings_file_path())
+    cache = _index_cache
+    if cache is None or cache[0] != version:
+        index = read_json(_get_bookings_file_path(), default=_new_index)
+        for key, value in _new_index().items():
+            index.setdefault(key, value)
+        cache = _index_cache = (version, index)
+    return cache[1]
+
+def _set_event_entry(index, event_slug, event, participants):
+    """Replaces an event's bookings in the index. Only the event's old and new dates are touched."""
+    old_entry = index['Events'].pop(event_slug, None)
+    if old_entry:
+        on_date = index['Dates'].get(old_entry['Date'], {})
+        for name in old_entry['Participants']:
+            slugs = [slug for slug in on_date.get(name, []) if slug != event_slug]
+            if slugs:
+                on_date[name] = slugs
+            else:
+                on_date.pop(name, None)
+        if not on_date:
+            index['Dates'].pop(old_entry['Date'], None)
+    if event and participants:
+        index['Events'][event_slug] = {'Event_Name': event.get('Event_Name'), 'Date': event.get('Date', ''),
+                                       'Participants': participants}
+        on_date = index['Dates'].setdefault(event.get('Date', ''), {})
+        for name in participants:
+            on_date.setdefault(name, []).append(event_slug)
+
+def _get_event_participants(event, event_slug):
+    """Returns everyone on an event's matches, sorted. Cancelled events book nobody."""
+    from src.segments import load_matches # Local import to avoid circular dependency
+    if not event or event.get('Status') == 'Cancelled':
+        return []
+    return sorted({name for match in load_matches(event_slug) for side in match.get('sides', []) for name in side})
+
+def refresh_event_bookings(event_slug):
+    """
+    Re-reads one event's matches into the index. Called whenever a match is added, changed or
+    deleted and when an event is renamed, moved, cancelled or deleted; only that event is read.
+    """
+    from src.events import get_event_by_slug # Local import to avoid circular dependency
+    event = get_event_by_slug(event_slug)
+    participants = _get_event_participants(event, event_slug)
+    with edit_json(_get_bookings_file_path(), default=_new_index) as index:
+        for key, value in _new_index().items():
+            index.setdefault(key, value)
+        _set_event_entry(index, event_slug, event, participants)
+
+def rebuild_booking_index(progress=None):
+    """Rebuilds the booking index from every event's matches. Used once when the index is introduced."""
+    from src.events import load_events # Local import to avoid circular dependency
+    from src.segments import _slugify
+    index = _new_index()
+    events = load_events()
+    for i, event in enumerate(events):
+        if progress: progress(i, len(events), f"Indexing bookings for {event.get('Event_Name', '')}")
+        event_slug = _slugify(event.get('Event_Name', ''))
+        _set_event_entry(index, event_slug, event, _get_event_participants(event, event_slug))
+    write_json(_get_bookings_file_path(), index)
+
+def _get_event_date(index, event_slug):
+    """Returns an event's date, from the index if it has bookings, or None for a cancelled or unknown event."""
+    entry = index['Events'].get(event_slug)
+    if entry:
+        return entry['Date']
+    from src.events import get_event_by_slug # Local import to avoid circular dependency
+    event = get_event_by_slug(event_slug)
+    return event.get('Date') if event and event.get('Status') != 'Cancelled' else None
+
+def find_double_bookings(event_slug, participants):
+    """
+    Returns {wrestler: [other event names]} for each participant also booked on another event on
+    this event's date. One index lookup per participant; no event files are read.
+    """
+    index = load_booking_index()
+    on_date = index['Dates'].get(_get_event_date(index, event_slug), {})
+    conflicts = {}
+    for name in participants:
+        others = [index['Events'][slug]['Event_Name'] for slug in on_date.get(name, ()) if slug != event_slug]
+        if others:
+            conflicts[name] = others
+    return conflicts
+
+def get_bookings_on_date(date, exclude_event_slug=None):
+    """Returns {wrestler: [event names]} for everyone booked on a date, leaving out one event if given."""
+    index = load_booking_index()
+    bookings = {}
+    for name, slugs in index['Dates'].get(date, {}).items():
+        events = [index['Events'][slug]['Event_Name'] for slug in slugs if slug != exclude_event_slug]
+        if events:
+            bookings[name] = events
+    return bookings
@@ -1,13 +1,15 @@
 import datetime
 from src.prefs import load_preferences
 
-def get_current_working_date():
+def get_current_working_date(prefs=None):
     """
     Returns the current working date based on preferences.
     If game_date_mode is 'real-time', returns today's date.
     If game_date_mode is 'latest-event-date', returns the date stored in 'game_date' preference.
+    Pass `prefs` when they are already loaded to skip reading the preferences file.
     """
-    prefs = load_preferences()
+    if prefs is None:
+        prefs = load_preferences()
     game_date_mode = prefs.get('game_date_mode', 'real-time')
     
     if game_date_mode == 'real-time':
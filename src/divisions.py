@@ -1,5 +1,6 @@
 import json
 import os
+from src.storage import read_json, write_json, edit_json
 from src.wrestlers import load_wrestlers
 from src.tagteams import load_tagteams
 
@@ -11,20 +12,14 @@ def _get_divisions_file_path():
 
 def load_divisions():
     """Loads all divisions from the JSON file."""
-    file_path = _get_divisions_file_path()
-    if not os.path.exists(file_path): return []
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-            return json.loads(content) if content else []
+        return read_json(_get_divisions_file_path())
     except (IOError, json.JSONDecodeError): return []
 
 def save_divisions(divisions_list):
     """Saves the list of divisions to the JSON file."""
-    file_path = _get_divisions_file_path()
     try:
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(divisions_list, f, indent=4)
+        write_json(_get_divisions_file_path(), divisions_list)
         return True
     except IOError: return False
 
@@ -34,28 +29,35 @@ def get_division_by_id(division_id):
 
 def add_division(division_data):
     """Adds a new division to the list."""
-    divisions = load_divisions()
-    if any(d.get('ID') == division_data['ID'] for d in divisions):
-        return False, "Division with this ID already exists."
-    divisions.append(division_data)
-    return (True, "Division added successfully.") if save_divisions(divisions) else (False, "Error saving division.")
+    try:
+        with edit_json(_get_divisions_file_path()) as divisions:
+            if any(d.get('ID') == division_data['ID'] for d in divisions):
+                return False, "Division with this ID already exists."
+            divisions.append(division_data)
+    except IOError: return False, "Error saving division."
+    return True, "Division added successfully."
 
 def update_division(original_id, updated_data):
     """Updates an existing division."""
-    divisions = load_divisions()
-    index = next((i for i, d in enumerate(divisions) if d.get('ID') == original_id), -1)
-    if index != -1:
-        divisions[index] = updated_data
-        return (True, "Division updated successfully.") if save_divisions(divisions) else (False, "Error saving division.")
-    return False, "Division not found."
+    try:
+        with edit_json(_get_divisions_file_path()) as divisions:
+            index = next((i for i, d in enumerate(divisions) if d.get('ID') == original_id), -1)
+            if index == -1:
+                return False, "Division not found."
+            divisions[index] = updated_data
+    except IOError: return False, "Error saving division."
+    return True, "Division updated successfully."
 
 def delete_division(division_id):
     """Deletes a division by its ID."""
-    divisions = load_divisions()
-    divisions_after = [d for d in divisions if d.get('ID') != division_id]
-    if len(divisions_after) < len(divisions):
-        return (True, "Division deleted successfully.") if save_divisions(divisions_after) else (False, "Error saving changes.")
-    return False, "Division not found."
+    try:
+        with edit_json(_get_divisions_file_path()) as divisions:
+            divisions_after = [d for d in divisions if d.get('ID') != division_id]
+            if len(divisions_after) == len(divisions):
+                return False, "Division not found."
+            divisions[:] = divisions_after
+    except IOError: return False, "Error saving changes."
+    return True, "Division deleted successfully."
 
 def get_division_name_by_id(division_id):
     """Returns the name of a division given its ID."""
@@ -0,0 +1,163 @@
+import os
+import threading
+from src.ai_prompts import build_dossier
+from src.belts import get_belts_by_holder, _get_belts_file_path
+from src.ratings import load_ratings, get_rating, get_team_rating, _get_ratings_file_path
+from src.events import load_events, _get_events_file_path
+from src.segments import _slugify, load_matches, _get_all_tag_teams_involved, _generate_side_display_string
+from src.system import register_cache_invalidator, register_record_listener
+from src.tagteams import load_tagteams, _get_tagteams_file_path
+from src.wrestlers import load_wrestlers, _get_wrestlers_file_path
+
+RECENT_RESULTS_LIMIT = 5
+
+_dossier_cache = {} # Participant name -> dossier
+_results_index = None # Participant name -> finalized results, newest first
+_source_stamps = {}
+_cache_lock = threading.Lock()
+
+_COLLECTION_FILES = {
+    'wrestlers': _get_wrestlers_file_path,
+    'tagteams': _get_tagteams_file_path,
+}
+
+def _get_source_files():
+    """Returns the data files dossiers are built from."""
+    return [_get_wrestlers_file_path(), _get_tagteams_file_path(), _get_belts_file_path(), _get_events_file_path(),
+            _get_ratings_file_path()]
+
+def _get_mtime(file_path):
+    """Returns a file's modification time in nanoseconds, or None if it does not exist."""
+    try:
+        return os.stat(file_path).st_mtime_ns
+    except OSError:
+        return None
+
+def _check_sources():
+    """
+    Drops every cached dossier if a source file changed behind our back, e.g. an event was
+    finalized, a title changed hands, or the file was edited by hand. Call with the lock held.
+    """
+    global _results_index
+    stamps = {path: _get_mtime(path) for path in _get_source_files()}
+    if stamps != _source_stamps:
+        _dossier_cache.clear()
+        _results_index = None
+        _source_stamps.clear()
+        _source_stamps.update(stamps)
+
+def clear_dossier_cache():
+    """Drops every cached dossier and the results index."""
+    global _results_index
+    with _cache_lock:
+        _dossier_cache.clear()
+        _results_index = None
+        _source_stamps.clear()
+
+def _on_record_changed(collection, names):
+    """Drops only the dossiers of edited wrestlers or tag teams, so the rest of the cache survives the save."""
+    if collection not in _COLLECTION_FILES:
+        return
+    with _cache_lock:
+        file_path = _COLLECTION_FILES[collection]()
+        for name in names:
+            _dossier_cache.pop(name, None)
+        if _source_stamps:
+            # The change went through our own save, so it does not need a full rebuild
+            _source_stamps[file_path] = _get_mtime(file_path)
+
+register_cache_invalidator(clear_dossier_cache)
+register_record_listener(_on_record_changed)
+
+def _build_results_index(all_tagteams_data):
+    """Scans every finalized event once and returns each participant's results, newest first."""
+    index = {}
+    finalized_events = [e for e in load_events() if e.get('Finalized')]
+    for event in finalized_events:
+        for match in load_matches(_slugify(event.get('Event_Name', ''))):
+            sides = match.get('sides', [])
+            side_displays = [_generate_side_display_string(side, all_tagteams_data) for side in sides]
+            for side_idx, side in enumerate(sides):
+                opponents = " vs. ".join(d for i, d in enumerate(side_displays) if i != side_idx)
+                side_teams = _get_all_tag_teams_involved([side], all_tagteams_data)
+                for wrestler_name in side:
+                    _add_result(index, wrestler_name, match.get('individual_results', {}).get(wrestler_name), opponents, event, match)
+                for team_name in side_teams:
+                    _add_result(index, team_name, match.get('team_results', {}).get(team_name), opponents, event, match)
+    for results in index.values():
+        results.sort(key=lambda r: (r['Date'], r['Position']), reverse=True)
+    return index
+
+def _add_result(index, name, result, opponents, event, match):
+    """Records one match result for a participant in the results index."""
+    if not result:
+        return
+    index.setdefault(name, []).append({
+        'Result': result,
+        'Opponents': opponents,
+        'Event': event.get('Event_Name', ''),
+        'Date': event.get('Date', ''),
+        'Position': match.get('segment_position', 0),
+    })
+
+def _get_streak(results):
+    """Describes the run of consecutive wins or losses leading up to the latest result."""
+    if not results or results[0]['Result'] not in ('Win', 'Loss'):
+        return None
+    latest = results[0]['Result']
+    count = 0
+    for result in results:
+        if result['Result'] != latest:
+            break
+        count += 1
+    return f"{'Won' if latest == 'Win' else 'Lost'} last {count}"
+
+def _build_derived_context(name, belts_by_holder, results_index, power_rating):
+    """Returns the cached context that would otherwise need a scan of belts and event history."""
+    results = results_index.get(name, [])
+    return {
+        "Current_Titles": [b['Name'] for b in belts_by_holder.get(name, ()) if b.get('Status') == 'Active'],
+        "Recent_Results": [
+            f"{r['Result']} vs. {r['Opponents']} at {r['Event']} ({r['Date']})" for r in results[:RECENT_RESULTS_LIMIT]
+        ],
+        "Streak": _get_streak(results),
+        "Power_Rating": round(power_rating),
+    }
+
+def get_dossiers(names):
+    """
+    Returns prompt dossiers for the given wrestler and tag team names, building and caching
+    any that are missing. Unknown names are skipped.
+    """
+    global _results_index
+    with _cache_lock:
+        _check_sources()
+        missing = [name for name in names if name not in _dossier_cache]
+        if missing:
+            all_wrestlers_data = load_wrestlers()
+            all_tagteams_data = load_tagteams()
+            belts_by_holder = get_belts_by_holder()
+            ratings = load_ratings()
+            if _results_index is None:
+                _results_index = _build_results_index(all_tagteams_data)
+            wrestlers_by_name = {w.get('Name'): w for w in all_wrestlers_data}
+            tagteams_by_name = {t.get('Name'): t for t in all_tagteams_data}
+            for name in missing:
+                record = wrestlers_by_name.get(name) or tagteams_by_name.get(name)
+                if not record:
+                    _dossier_cache[name] = None
+                    continue
+                if name in wrestlers_by_name:
+                    dossier = build_dossier(name, [record], [])
+                    power_rating = get_rating(ratings, name)
+                else:
+                    dossier = build_dossier(name, [], [record])
+                    power_rating = get_team_rating(ratings, record.get('Members', '').split('|'))
+                dossier.update(_build_derived_context(name, belts_by_holder, _results_index, power_rating))
+                _dossier_cache[name] = dossier
+        return [dict(_dossier_cache[name]) for name in names if _dossier_cache.get(name)]
+
+def get_dossier(name):
+    """Returns the prompt dossier for a single wrestler or tag team, or None."""
+    dossiers = get_dossiers([name])
+    return dossiers[0] if dossiers else None
@@ -1,8 +1,17 @@
-import json
 import os
-from src.segments import _slugify, _get_segments_file_path, load_segments, delete_summary_file
+import uuid
+from src.storage import read_json, write_json, edit_json, check_record_etag
+from src.segments import _slugify, _get_segments_file_path, load_segments, load_matches, delete_summary_file, load_summary_content, validate_match_data, _get_all_wrestlers_involved, _get_all_tag_teams_involved
+from src.wrestlers import load_wrestlers, _get_wrestlers_file_path
+from src.tagteams import load_tagteams, _get_tagteams_file_path
+from src.belts import load_belts, load_belt_history, apply_championship_changes
+from src.records import apply_record_changes
+from src.prefs import load_preferences
+from src.bookings import refresh_event_bookings
 
 EVENTS_FILE_RELATIVE_TO_ROOT = 'data/events.json'
+# Fields the edit form changes. Finalized and the summary file are set by finalizing.
+EVENT_EDITABLE_FIELDS = ('Event_Name', 'Subtitle', 'Status', 'Date', 'Venue', 'Location', 'Broadcasters')
 
 def _get_events_file_path():
     """Constructs the absolute path to the events JSON file."""
@@ -14,22 +23,11 @@ def _get_events_file_path():
 
 def load_events():
     """Loads events from the JSON file."""
-    file_path = _get_events_file_path()
-    if not os.path.exists(file_path):
-        return []
-    with open(file_path, 'r', encoding='utf-8') as f:
-        # Check if file is empty before loading JSON
-        content = f.read()
-        if not content:
-            return []
-        f.seek(0) # Reset file pointer to the beginning if content was read
-        return json.loads(content)
+    return read_json(_get_events_file_path())
 
 def save_events(events_list):
     """Saves events to the JSON file."""
-    file_path = _get_events_file_path()
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(events_list, f, indent=4)
+    write_json(_get_events_file_path(), events_list)
 
 def get_event_by_name(event_name):
     """Retrieves a single event by its name."""
@@ -49,25 +47,35 @@ def get_event_by_slug(event_slug):
 
 def add_event(event_data):
     """Adds a new event to the list."""
-    events = load_events()
-    if get_event_by_name(event_data['Event_Name']):
-        return False # Event with this name already exists
-    events.append(event_data)
-    save_events(events)
+    with edit_json(_get_events_file_path()) as events:
+        if any(event.get('Event_Name') == event_data['Event_Name'] for event in events):
+            return False # Event with this name already exists
+        events.append(event_data)
     return True
 
-def update_event(original_name, updated_data):
-    """Updates an existing event."""
-    events = load_events()
-    for i, event in enumerate(events):
-        if event.get('Event_Name') == original_name:
-            # Check if name changed and new name already exists (and it's not the same event)
-            if updated_data['Event_Name'] != original_name and get_event_by_name(updated_data['Event_Name']):
-                return False # New name conflicts with another existing event
-            events[i] = updated_data
-            save_events(events)
-            return True
-    return False # Event not found
+def update_event(original_name, changes, expected_etag=None, etag_fields=None):
+    """
+    Applies `changes` to an event as saved now, under the file lock; fields not given keep their
+    saved values. Raises StaleRecordError if `expected_etag`, taken over `etag_fields` if given,
+    is out of date.
+    """
+    new_name = changes.get('Event_Name', original_name)
+    with edit_json(_get_events_file_path()) as events:
+        for i, event in enumerate(events):
+            if event.get('Event_Name') == original_name:
+                check_record_etag(event, expected_etag, fields=etag_fields)
+                # Check if name changed and new name already exists (and it's not the same event)
+                if new_name != original_name and any(e.get('Event_Name') == new_name for e in events):
+                    return False # New name conflicts with another existing event
+                events[i] = dict(event, **changes)
+                break
+        else:
+            return False # Event not found
+    # The date, status or name may have changed, which moves the event's bookings
+    refresh_event_bookings(_slugify(original_name))
+    if new_name != original_name:
+        refresh_event_bookings(_slugify(new_name))
+    return True
 
 def load_event_summary_content(relative_summary_path):
     """Loads the content of a consolidated event summary file."""
@@ -103,10 +111,211 @@ def save_event_summary(event_slug, content):
 
 def delete_event(event_name):
     """Deletes an event by its name."""
-    events = load_events()
-    initial_len = len(events)
-    events = [event for event in events if event.get('Event_Name') != event_name]
-    if len(events) < initial_len:
-        save_events(events)
-        return True
-    return False # Event not found
+    with edit_json(_get_events_file_path()) as events:
+        initial_len = len(events)
+        events[:] = [event for event in events if event.get('Event_Name') != event_name]
+        return len(events) < initial_len
+
+RESULT_COUNTERS = {'Win': 'Wins', 'Loss': 'Losses', 'Draw': 'Draws'} # Other results leave records alone
+
+def _load_card(event_slug):
+    """Returns an event's segments in card order, each paired with its match data (None if it has none)."""
+    matches_by_id = {}
+    for match in load_matches(event_slug):
+        matches_by_id.setdefault(match.get('match_id'), match)
+    segments = sorted(load_segments(event_slug), key=lambda s: s.get('position', 0))
+    return [(segment, matches_by_id.get(segment.get('match_id'))) for segment in segments]
+
+def _first_by_name(records):
+    """Maps each name to its first record, the one the single-record updaters would change."""
+    by_name = {}
+    for record in records:
+        by_name.setdefault(record.get('Name'), record)
+    return by_name
+
+def _count_result(plan, section, records_by_name, name, field_prefix, result, position):
+    """Adds one result to a wrestler's or tag team's planned record changes."""
+    if result not in RESULT_COUNTERS:
+        return
+    if name not in records_by_name:
+        plan['issues'].append(f"Segment {position}: {name} is not on the roster, so their record will not change.")
+        return
+    field = field_prefix + RESULT_COUNTERS[result]
+    changes = plan[section].setdefault(name, {})
+    if field not in changes:
+        before = records_by_name[name].get(field, 0)
+        changes[field] = [before, before]
+    changes[field][1] += 1
+
+def _plan_match(plan, state, event, position, match):
+    """Adds one match's record and championship changes to the plan, against the state left by earlier matches."""
+    sides = match.get('sides', [])
+    for team_name in _get_all_tag_teams_involved(sides, state['tagteams_list']):
+        team_result = match.get('team_results', {}).get(team_name)
+        if team_result:
+            _count_result(plan, 'tagteams', state['tagteams'], team_name, '', team_result, position)
+            team_data = state['tagteams'].get(team_name)
+            if team_data and team_data.get('Members'):
+                for member_name in team_data['Members'].split('|'):
+                    _count_result(plan, 'wrestlers', state['wrestlers'], member_name, 'Tag_', team_result, position)
+    if match.get('match_class') in ('singles', 'tag'):
+        field_prefix = 'Singles_' if match['match_class'] == 'singles' else 'Tag_'
+        for wrestler_name in _get_all_wrestlers_involved(sides):
+            result = match.get('individual_results', {}).get(wrestler_name)
+            if result:
+                _count_result(plan, 'wrestlers', state['wrestlers'], wrestler_name, field_prefix, result, position)
+
+    belt_name = match.get('match_championship')
+    if not belt_name:
+        return
+    belt = state['belts'].get(belt_name.strip().lower())
+    winning_side_idx = match.get('winning_side_index', -1)
+    if not belt:
+        plan['issues'].append(f"Segment {position}: championship '{belt_name}' not found, so no title change will be recorded.")
+        return
+    if belt.get('Status') != 'Active':
+        plan['issues'].append(f"Segment {position}: the {belt['Name']} is not active, so no title change will be recorded.")
+        return
+    if not 0 <= winning_side_idx < len(sides):
+        plan['issues'].append(f"Segment {position}: no winner is set, so the {belt['Name']} is not affected.")
+        return
+    winning_side = sides[winning_side_idx]
+    winner_name = None
+    if belt.get('Holder_Type') == 'Singles' and len(winning_side) == 1:
+        winner_name = winning_side[0]
+    elif belt.get('Holder_Type') == 'Tag-Team':
+        winning_teams = _get_all_tag_teams_involved([winning_side], state['tagteams_list'])
+        if winning_teams: winner_name = winning_teams[0]
+    if not winner_name:
+        plan['issues'].append(f"Segment {position}: the winning side cannot hold the {belt['Name']}, so it is not affected.")
+        return
+
+    old_champion_name = belt.get('Current_Holder')
+    belt_reigns = [reign for reign in state['reigns'] if reign.get('Belt_ID') == belt['ID']]
+    if old_champion_name == winner_name:
+        reign = next((r for r in belt_reigns if r.get('Champion_Name') == winner_name and not r.get('Date_Lost')), None)
+        if reign:
+            reign['Defenses'] = reign.get('Defenses', 0) + 1
+            plan['defenses'].append({'Position': position, 'Belt': belt['Name'], 'Champion': winner_name,
+                                     'Reign_ID': reign['Reign_ID'], 'Defenses': reign['Defenses']})
+        else:
+            plan['issues'].append(f"Segment {position}: {winner_name} has no open {belt['Name']} reign, so the defense is not counted.")
+        return
+
+    # Title change: close the old reign, start a new one and move the Belt fields
+    if old_champion_name:
+        reign = next((r for r in belt_reigns if not r.get('Date_Lost')), None)
+        if reign:
+            reign['Date_Lost'] = event['Date']
+            plan['reign_closures'].append({'Position': position, 'Belt': belt['Name'], 'Champion': reign.get('Champion_Name'),
+                                           'Reign_ID': reign['Reign_ID'], 'Date_Lost': event['Date']})
+    new_reign = {
+        "Reign_ID": str(uuid.uuid4()), "Belt_ID": belt['ID'], "Champion_Name": winner_name,
+        "Date_Won": event['Date'], "Date_Lost": None, "Defenses": 0,
+        "Notes": f"Won from {old_champion_name or 'vacant status'}"
+    }
+    plan['new_reigns'].append(dict(new_reign))
+    state['reigns'].append(new_reign)
+    belt['Current_Holder'] = winner_name
+    plan['title_changes'].append({'Position': position, 'Belt_ID': belt['ID'], 'Belt': belt['Name'],
+                                  'From': old_champion_name, 'To': winner_name})
+    section = 'wrestlers' if belt.get('Holder_Type') == 'Singles' else 'tagteams'
+    if old_champion_name:
+        plan['belt_fields'][section][old_champion_name] = ''
+    plan['belt_fields'][section][winner_name] = belt['Name']
+
+def plan_event_results(event, card, wrestlers, tagteams, belts, history):
+    """
+    Works out everything finalizing an event will change, in memory and without writing: record
+    changes per wrestler and tag team, title changes, defenses and closed reigns, plus every
+    validation issue on the card. Matches are taken in card order, each seeing the titles as
+    earlier matches left them. finalize_event_results() applies this same plan.
+    """
+    event_slug = _slugify(event.get('Event_Name', ''))
+    plan = {'wrestlers': {}, 'tagteams': {}, 'belt_fields': {'wrestlers': {}, 'tagteams': {}}, 'title_changes': [],
+            'defenses': [], 'reign_closures': [], 'new_reigns': [], 'issues': []}
+    belts_by_name = {}
+    for belt in belts:
+        belts_by_name.setdefault(belt.get('Name', '').strip().lower(), dict(belt))
+    state = {'wrestlers': _first_by_name(wrestlers), 'tagteams': _first_by_name(tagteams), 'tagteams_list': tagteams,
+             'belts': belts_by_name, 'reigns': [dict(reign) for reign in history]}
+    for segment, match in card:
+        if segment.get('type') != 'Match' or not segment.get('match_id'):
+            continue
+        position = segment.get('position')
+        if not match:
+            plan['issues'].append(f"Segment {position}: match data is missing, so this match will be skipped.")
+            continue
+        errors, warnings = validate_match_data(match.get('sides', []), match, event_slug)
+        plan['issues'].extend(f"Segment {position}: {message}" for message in errors + warnings)
+        _plan_match(plan, state, event, position, match)
+    return plan
+
+def preview_event_results(event_name):
+    """Returns the plan finalizing an event would apply right now. Nothing is written."""
+    event = get_event_by_name(event_name)
+    if not event:
+        raise ValueError('Event not found.')
+    return plan_event_results(event, _load_card(_slugify(event_name)), load_wrestlers(), load_tagteams(),
+                              load_belts(), load_belt_history())
+
+def _apply_event_plan(plan):
+    """Writes a plan from plan_event_results(), with at most one save per data file."""
+    if plan['wrestlers'] or plan['belt_fields']['wrestlers']:
+        with edit_json(_get_wrestlers_file_path()) as all_wrestlers:
+            apply_record_changes(all_wrestlers, plan['wrestlers'], plan['belt_fields']['wrestlers'])
+    if plan['tagteams'] or plan['belt_fields']['tagteams']:
+        with edit_json(_get_tagteams_file_path()) as all_tagteams:
+            apply_record_changes(all_tagteams, plan['tagteams'], plan['belt_fields']['tagteams'])
+    apply_championship_changes({change['Belt_ID']: change['To'] for change in plan['title_changes']}, plan['new_reigns'],
+                               [(closure['Reign_ID'], closure['Date_Lost']) for closure in plan['reign_closures']],
+                               [defense['Reign_ID'] for defense in plan['defenses']])
+
+def finalize_event_results(event_name, progress=None):
+    """
+    Applies every match on an event's card to records and championships, writes the
+    consolidated event summary and marks the event finalized. Returns a status message.
+    """
+    event = get_event_by_name(event_name)
+    if not event or event.get('Finalized'):
+        raise ValueError('Event not found or already finalized.')
+
+    event_slug = _slugify(event_name)
+    card = _load_card(event_slug)
+    total_steps = 2 # Applying the results, then writing the summary
+    if progress: progress(0, total_steps, f"Applying results for {len(card)} segments")
+    plan = plan_event_results(event, card, load_wrestlers(), load_tagteams(), load_belts(), load_belt_history())
+    _apply_event_plan(plan)
+
+    # Generate consolidated event summary
+    if progress: progress(1, total_steps, 'Writing event summary')
+    prefs = load_preferences()
+    summary_parts = []
+
+    for segment, match in card:
+        # Check the match's visibility settings
+        if segment.get('type') == 'Match' and segment.get('match_id'):
+            # Skip if match summary is hidden
+            if match and match.get('match_visibility', {}).get('hide_summary'):
+                continue # Skip this segment entirely from the summary
+
+        summary_content = load_summary_content(segment.get('summary_file'))
+        if segment.get('type') == 'Match':
+            summary_parts.append(f"### {segment['header']}\n#### {segment['participants_display']}\n\n{summary_content}")
+        elif prefs.get('fan_mode_show_non_match_headers'):
+            summary_parts.append(f"### {segment['header']}\n\n{summary_content}")
+        else:
+            summary_parts.append(summary_content)
+
+    final_summary = "\n\n---\n\n".join(summary_parts)
+    summary_file_path = save_event_summary(event_slug, final_summary)
+    event['event_summary_file'] = summary_file_path
+
+    event['Finalized'] = True
+    update_event(event_name, {'event_summary_file': summary_file_path, 'Finalized': True}) # Leaves any concurrent edit in place
+    from src.standings import record_event_standings # Import here to avoid circular dependency
+    from src.ratings import record_event_ratings
+    record_event_standings(event) # Adds just this event to the division standings
+    record_event_ratings(event) # and to the power ratings
+    if progress: progress(total_steps, total_steps, 'Event finalized')
+    return f"Event '{event_name}' has been finalized and records updated!"
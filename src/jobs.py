@@ -0,0 +1,221 @@
+import json
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from src.system import get_project_root, INCLUDES_DIR
+
+JOBS_DIR = os.path.join(INCLUDES_DIR, 'jobs')
+JOB_WORKERS = 2
+JOB_HISTORY_LIMIT = 50
+PROGRESS_SAVE_INTERVAL = 0.5 # Seconds between progress writes to the job record
+
+# Collections a mutating job can claim. A job that replaces the whole data directory claims all of them.
+DATA_COLLECTIONS = ('wrestlers', 'tagteams', 'belts', 'belt_history', 'divisions', 'events', 'news', 'prefs', 'standings', 'ratings')
+ALL_DATA_COLLECTIONS = DATA_COLLECTIONS + ('snapshots',)
+
+STATUS_QUEUED = 'Queued'
+STATUS_RUNNING = 'Running'
+STATUS_COMPLETED = 'Completed'
+STATUS_FAILED = 'Failed'
+STATUS_CANCELLED = 'Cancelled'
+STATUS_INTERRUPTED = 'Interrupted'
+ACTIVE_STATUSES = (STATUS_QUEUED, STATUS_RUNNING)
+
+class JobCancelled(Exception):
+    """Raised inside a job's progress callback once the job has been cancelled."""
+    pass
+
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='slamsim-job')
+_jobs = {}
+_cancel_events = {}
+_jobs_lock = threading.Lock()
+_collection_locks = {name: threading.Lock() for name in ALL_DATA_COLLECTIONS}
+
+def _get_jobs_dir():
+    """Returns the absolute path to the job records directory."""
+    return os.path.join(get_project_root(), JOBS_DIR)
+
+def _get_job_file_path(job_id):
+    """Returns the absolute path to a job's record file."""
+    return os.path.join(_get_jobs_dir(), f"{job_id}.json")
+
+def _save_job(job):
+    """Writes a job record to disk, replacing the old record in one step."""
+    file_path = _get_job_file_path(job['Job_ID'])
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    temp_path = f"{file_path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(job, f, indent=4)
+    os.replace(temp_path, file_path)
+
+def _load_job_file(job_id):
+    """Loads a job record from disk. Jobs left active by a previous run are reported as interrupted."""
+    file_path = _get_job_file_path(job_id)
+    if not os.path.exists(file_path):
+        return None
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            job = json.load(f)
+    except (IOError, json.JSONDecodeError):
+        return None
+    if job.get('Status') in ACTIVE_STATUSES:
+        job['Status'] = STATUS_INTERRUPTED
+        job['Message'] = 'The application stopped before this job finished.'
+    return job
+
+def get_job(job_id):
+    """Retrieves a job record by ID, from memory if it belongs to this process."""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job:
+            return dict(job)
+    return _load_job_file(job_id)
+
+def list_jobs(limit=JOB_HISTORY_LIMIT):
+    """Returns the most recent job records, newest first."""
+    jobs_dir = _get_jobs_dir()
+    job_ids = [f[:-5] for f in os.listdir(jobs_dir) if f.endswith('.json')] if os.path.exists(jobs_dir) else []
+    jobs = [job for job in (get_job(job_id) for job_id in job_ids) if job]
+    jobs.sort(key=lambda j: j.get('Created', ''), reverse=True)
+    return jobs[:limit]
+
+def prune_jobs(keep=JOB_HISTORY_LIMIT):
+    """Deletes the records of old finished jobs, keeping the newest `keep`."""
+    for job in list_jobs(limit=None)[keep:]:
+        if job.get('Status') not in ACTIVE_STATUSES:
+            try:
+                os.remove(_get_job_file_path(job['Job_ID']))
+            except OSError:
+                pass
+
+def _update_job(job_id, persist=True, **fields):
+    """Updates fields on an in-memory job record and optionally persists it."""
+    with _jobs_lock:
+        job = _jobs[job_id]
+        job.update(fields)
+        if persist:
+            _save_job(job) # Saved under the lock so records are never written out of order
+
+def cancel_job(job_id):
+    """Requests cancellation of a queued or running job. Returns True if the request was accepted."""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if not job or job['Status'] not in ACTIVE_STATUSES or not job.get('Cancellable', True):
+            return False
+        job['Cancel_Requested'] = True
+        job['Message'] = 'Cancelling...'
+        _cancel_events[job_id].set()
+        _save_job(job)
+    return True
+
+def _acquire_collections(job_id, collections):
+    """
+    Waits for exclusive use of every collection the job mutates, in a fixed order so two
+    jobs can never deadlock. Gives up if the job is cancelled while waiting.
+    """
+    acquired = []
+    cancel_event = _cancel_events[job_id]
+    for name in sorted(collections):
+        lock = _collection_locks[name]
+        while not lock.acquire(timeout=0.25):
+            if cancel_event.is_set():
+                for held in acquired:
+                    held.release()
+                raise JobCancelled()
+        acquired.append(lock)
+    return acquired
+
+def _run_job(job_id, func, args, kwargs):
+    """Worker body: claims the job's collections, runs it and records the outcome."""
+    cancel_event = _cancel_events[job_id]
+    last_saved = [0.0]
+
+    def progress(done, total=None, message=''):
+        """Reports progress from inside a job. Raises JobCancelled if cancellation was requested."""
+        if cancel_event.is_set():
+            raise JobCancelled()
+        now = time.monotonic()
+        persist = now - last_saved[0] >= PROGRESS_SAVE_INTERVAL or (total is not None and done >= total)
+        if persist:
+            last_saved[0] = now
+        fields = {'Progress': done, 'Message': message}
+        if total is not None:
+            fields['Total'] = total
+        _update_job(job_id, persist=persist, **fields)
+
+    held_locks = []
+    try:
+        held_locks = _acquire_collections(job_id, get_job(job_id).get('Collections', []))
+        if cancel_event.is_set():
+            raise JobCancelled()
+        _update_job(job_id, Status=STATUS_RUNNING, Started=datetime.now().isoformat(timespec='seconds'))
+        result = func(*args, progress=progress, **kwargs)
+        try:
+            json.dumps(result) # Checked first, as a Result that cannot be saved would leave the job Running
+        except (TypeError, ValueError) as e:
+            raise TypeError(f"The job's result cannot be saved: {e}") from e
+        message = result if isinstance(result, str) else get_job(job_id).get('Message', '')
+        _update_job(job_id, Status=STATUS_COMPLETED, Result=result, Message=message or 'Done.',
+                    Finished=datetime.now().isoformat(timespec='seconds'))
+    except JobCancelled:
+        _update_job(job_id, Status=STATUS_CANCELLED, Message='Job was cancelled.',
+                    Finished=datetime.now().isoformat(timespec='seconds'))
+    except Exception as e:
+        traceback.print_exc()
+        _update_job(job_id, Status=STATUS_FAILED, Error=str(e), Message=f"Job failed: {e}",
+                    Finished=datetime.now().isoformat(timespec='seconds'))
+    finally:
+        for lock in held_locks:
+            lock.release()
+        _cancel_events.pop(job_id, None)
+        with _jobs_lock:
+            _jobs.pop(job_id, None) # The persisted record is now the source of truth
+
+def submit_job(kind, description, func, *args, collections=(), cancellable=True, return_url=None, **kwargs):
+    """
+    Queues `func(*args, progress=progress, **kwargs)` on the background pool and returns the new job ID.
+    `collections` names the data collections the job mutates; only one job may hold a
+    collection at a time, so later jobs on the same collection wait their turn.
+    `func` may call `progress(done, total, message)` to report progress; if the job is
+    cancelled, that call raises JobCancelled. Jobs that cannot stop safely part way through
+    should pass cancellable=False. `return_url` may be a function of the job ID, for a page
+    that shows the job's result.
+    """
+    unknown = [name for name in collections if name not in _collection_locks]
+    if unknown:
+        raise ValueError(f"Unknown job collection(s): {', '.join(unknown)}")
+
+    job_id = uuid.uuid4().hex
+    job = {
+        'Job_ID': job_id,
+        'Kind': kind,
+        'Description': description,
+        'Collections': sorted(collections),
+        'Cancellable': cancellable,
+        'Cancel_Requested': False,
+        'Status': STATUS_QUEUED,
+        'Progress': 0,
+        'Total': None,
+        'Message': 'Waiting to start...',
+        'Result': None,
+        'Error': None,
+        'Return_URL': return_url(job_id) if callable(return_url) else return_url,
+        'Created': datetime.now().isoformat(timespec='seconds'),
+        'Started': None,
+        'Finished': None,
+    }
+    _cancel_events[job_id] = threading.Event()
+    with _jobs_lock:
+        _jobs[job_id] = job
+    _save_job(job)
+    prune_jobs()
+    _executor.submit(_run_job, job_id, func, args, kwargs)
+    return job_id
+
+def is_job_finished(job):
+    """Returns True once a job record has reached a final status."""
+    return job is not None and job.get('Status') not in ACTIVE_STATUSES
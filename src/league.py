@@ -0,0 +1,244 @@
+import os
+import signal
+import threading
+from types import MappingProxyType
+from src.storage import get_file_version, register_save_listener
+from src.system import register_cache_invalidator
+from src.prefs import load_preferences, _get_prefs_file_path
+from src.wrestlers import load_wrestlers, _get_wrestlers_file_path
+from src.tagteams import load_tagteams, _get_tagteams_file_path
+from src.belts import load_belts, load_belt_history, _get_belts_file_path, _get_belt_history_file_path
+from src.events import load_events, load_event_summary_content, _get_events_file_path
+from src.divisions import load_divisions, _get_divisions_file_path
+from src.news import load_news_posts, _get_news_file_path
+from src.standings import load_standings, _get_standings_file_path
+from src.ratings import load_ratings, _get_ratings_file_path
+from src.records import RecordTable, WRESTLER_RECORD_FIELDS, TAGTEAM_RECORD_FIELDS
+from src.segments import load_segments, load_matches, _slugify, _get_project_root, EVENTS_DATA_DIR
+
+SNAPSHOT_REFRESH_INTERVAL = 1.0 # Seconds between checks for saves made by other processes
+
+def _get_snapshot_files():
+    """Returns the data files a league snapshot is built from."""
+    return (_get_prefs_file_path(), _get_wrestlers_file_path(), _get_tagteams_file_path(), _get_belts_file_path(),
+            _get_belt_history_file_path(), _get_events_file_path(), _get_divisions_file_path(), _get_news_file_path(),
+            _get_standings_file_path(), _get_ratings_file_path())
+
+def _get_event_data_files():
+    """Returns every per-event segments and matches file, which event cards are built from."""
+    events_dir = os.path.join(_get_project_root(), EVENTS_DATA_DIR)
+    if not os.path.isdir(events_dir):
+        return ()
+    return tuple(os.path.join(events_dir, name) for name in sorted(os.listdir(events_dir)) if name.endswith('.json'))
+
+def load_event_card(event):
+    """
+    Loads what the fan event page shows: the event's segments in card order, with each match's
+    visibility flags merged in as 'on_card' and 'include_in_results', and the event summary.
+    """
+    event_slug = _slugify(event.get('Event_Name', ''))
+    segments = sorted(load_segments(event_slug), key=lambda s: s.get('position', 9999)) # Sort segments by position
+    matches_by_id = {match.get('match_id'): match for match in load_matches(event_slug)}
+
+    # Iterate through segments to merge match visibility data
+    for segment in segments:
+        if segment.get('type') == 'Match' and segment.get('match_id'):
+            match_data = matches_by_id.get(segment['match_id'])
+            if match_data and 'match_visibility' in match_data:
+                # Merge visibility flags into the segment dictionary
+                segment['on_card'] = not match_data['match_visibility'].get('hide_from_card', False)
+                segment['include_in_results'] = not match_data['match_visibility'].get('hide_result', False)
+                # Note: hide_summary is handled in the finalize_event process, not directly here for display logic
+            else:
+                # Default to visible if match data or visibility info is missing
+                segment['on_card'] = True
+                segment['include_in_results'] = True
+        else:
+            # Non-match segments are always considered "on card" and "in results" for display purposes
+            segment['on_card'] = True
+            segment['include_in_results'] = True
+
+    return {'segments': segments, 'summary': load_event_summary_content(event.get('event_summary_file'))}
+
+def _freeze(value):
+    """Returns a read-only deep copy of parsed JSON: dicts become mapping proxies, lists become tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+def _index(records, key_func):
+    """Maps key_func(record) to record. The first record wins if two share a key, like the next() lookups it replaces."""
+    index = {}
+    for record in records:
+        index.setdefault(key_func(record), record)
+    return MappingProxyType(index)
+
+class LeagueSnapshot:
+    """
+    A read-only copy of the whole league with its lookup indexes. A snapshot never changes once
+    built; saves publish a new one, so readers need no locks and never see a half-applied edit.
+    """
+    __slots__ = ('versions', 'prefs', 'wrestlers', 'tagteams', 'belts', 'reigns', 'events', 'divisions', 'news',
+                 'wrestlers_by_name', 'tagteams_by_name', 'belts_by_id', 'belts_by_name', 'reigns_by_belt',
+                 'events_by_name', 'events_by_slug', 'divisions_by_id', 'news_by_id', 'standings', 'ratings', 'event_cards',
+                 'wrestler_records', 'tagteam_records')
+
+    def __init__(self, versions, prefs, wrestlers, tagteams, belts, reigns, events, divisions, news, standings,
+                 ratings, event_cards=None):
+        fields = {
+            'versions': versions,
+            'prefs': _freeze(prefs),
+            'wrestlers': _freeze(wrestlers),
+            'tagteams': _freeze(tagteams),
+            'belts': _freeze(belts),
+            'reigns': _freeze(reigns),
+            'events': _freeze(events),
+            'divisions': _freeze(divisions),
+            'news': _freeze(news), # Already migrated and sorted newest first by load_news_posts
+            'standings': _freeze(standings), # The division standings ledger
+            'ratings': _freeze(ratings), # Power ratings
+            'event_cards': _freeze(event_cards) if event_cards is not None else None, # Event slug -> load_event_card()
+        }
+        reigns_by_belt = {}
+        for reign in fields['reigns']:
+            reigns_by_belt.setdefault(reign.get('Belt_ID'), []).append(reign)
+        fields.update({
+            'wrestlers_by_name': _index(fields['wrestlers'], lambda w: w.get('Name')),
+            'tagteams_by_name': _index(fields['tagteams'], lambda t: t.get('Name')),
+            'belts_by_id': _index(fields['belts'], lambda b: b.get('ID')),
+            'belts_by_name': _index(fields['belts'], lambda b: b.get('Name', '').strip().lower()),
+            'reigns_by_belt': MappingProxyType({belt_id: tuple(reigns) for belt_id, reigns in reigns_by_belt.items()}),
+            'events_by_name': _index(fields['events'], lambda e: e.get('Event_Name')),
+            'events_by_slug': _index(fields['events'], lambda e: _slugify(e.get('Event_Name', ''))),
+            'divisions_by_id': _index(fields['divisions'], lambda d: d.get('ID')),
+            'news_by_id': _index(fields['news'], lambda p: p.get('News_ID')),
+            'wrestler_records': RecordTable(fields['wrestlers'], WRESTLER_RECORD_FIELDS), # Counters as int columns
+            'tagteam_records': RecordTable(fields['tagteams'], TAGTEAM_RECORD_FIELDS),
+        })
+        for name, value in fields.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("LeagueSnapshot is read-only; build a new one instead.")
+
+    def get_belt_by_name(self, belt_name):
+        """Finds a belt by name, ignoring case and surrounding spaces."""
+        return self.belts_by_name.get((belt_name or '').strip().lower())
+
+    def get_version(self, file_path):
+        """Returns the version a league file had when this snapshot was built."""
+        return dict(self.versions).get(file_path)
+
+    def get_event_card(self, event):
+        """Returns an event's card from the snapshot if it was preloaded, otherwise loads it from disk."""
+        if self.event_cards is not None:
+            return self.event_cards.get(_slugify(event.get('Event_Name', '')), {'segments': (), 'summary': ''})
+        return load_event_card(event)
+
+_current = None # The published snapshot; replacing this reference is the atomic swap
+_build_lock = threading.Lock() # One builder at a time; readers never take it
+_refresh_requested = threading.Event()
+_refresher_pid = None
+_include_event_cards = False # Set by preload_league_snapshot() for read-only fan sites
+_force_refresh = False
+
+def _read_versions():
+    """Returns the current version of every file a snapshot is built from."""
+    files = _get_snapshot_files() + (_get_event_data_files() if _include_event_cards else ())
+    return tuple((file_path, get_file_version(file_path)) for file_path in files)
+
+def build_league_snapshot(include_event_cards=False):
+    """Loads every league file and returns a new LeagueSnapshot, with every event's card if asked."""
+    versions = _read_versions() # Read first: a save during the build then leaves the snapshot stale, never wrongly current
+    events = load_events()
+    event_cards = None
+    if include_event_cards:
+        event_cards = {_slugify(event.get('Event_Name', '')): load_event_card(event) for event in events}
+    return LeagueSnapshot(versions, load_preferences(), load_wrestlers(), load_tagteams(), load_belts(),
+                          load_belt_history(), events, load_divisions(), load_news_posts(),
+                          load_standings(), load_ratings(), event_cards)
+
+def refresh_league_snapshot(force=False):
+    """Builds and publishes a new snapshot if any league file changed since the current one."""
+    global _current, _force_refresh
+    if _force_refresh:
+        force, _force_refresh = True, False
+    with _build_lock:
+        if not force and _current is not None and _current.versions == _read_versions():
+            return _current
+        _current = build_league_snapshot(_include_event_cards)
+        return _current
+
+def _refresh_loop():
+    """Rebuilds the snapshot after local saves, and polls for saves made by other processes."""
+    while True:
+        _refresh_requested.wait(SNAPSHOT_REFRESH_INTERVAL)
+        _refresh_requested.clear() # Saves that land during the rebuild request another pass
+        try:
+            refresh_league_snapshot()
+        except Exception as e:
+            print(f"Error refreshing league snapshot: {e}")
+
+def _ensure_refresher():
+    """Starts this process's refresher thread. A forked worker keeps the parent's snapshot and starts its own thread."""
+    global _refresher_pid
+    if _refresher_pid != os.getpid():
+        _refresher_pid = os.getpid()
+        threading.Thread(target=_refresh_loop, name='league-snapshot-refresher', daemon=True).start()
+
+def _reset_after_fork():
+    """Gives a forked worker fresh thread primitives; it keeps the inherited snapshot, shared copy-on-write."""
+    global _build_lock, _refresh_requested
+    _build_lock = threading.Lock()
+    _refresh_requested = threading.Event()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+def preload_league_snapshot(include_event_cards=True):
+    """
+    Loads the whole league into memory now, for a read-only fan site. With `include_event_cards`
+    the event pages are preloaded too, so no fan page reads a file while serving a request.
+    """
+    global _include_event_cards
+    _include_event_cards = include_event_cards
+    snapshot = refresh_league_snapshot(force=True)
+    _ensure_refresher()
+    return snapshot
+
+def request_reload(*_):
+    """Rebuilds the snapshot from disk on the refresher thread, even if no version changed. Usable as a signal handler."""
+    global _force_refresh
+    _force_refresh = True
+    _refresh_requested.set()
+
+def install_reload_signal():
+    """Makes SIGHUP reload the snapshot. Only possible on POSIX, from the main thread."""
+    if hasattr(signal, 'SIGHUP') and threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGHUP, request_reload)
+        return True
+    return False
+
+def get_league_snapshot():
+    """
+    Returns the current league snapshot without any file I/O. Only the very first call in a
+    process builds one. Saves are picked up by a background thread and swapped in whole.
+    """
+    snapshot = _current
+    if snapshot is None:
+        snapshot = refresh_league_snapshot()
+    _ensure_refresher()
+    return snapshot
+
+@register_save_listener
+def _on_file_saved(file_path):
+    """Asks the refresher for a new snapshot when a league file is saved."""
+    if file_path in _get_snapshot_files() or (_include_event_cards and file_path in _get_event_data_files()):
+        _refresh_requested.set()
+
+@register_cache_invalidator
+def _on_data_replaced():
+    """Asks for a new snapshot after a restore or reset replaced the data files."""
+    _refresh_requested.set()
@@ -1,7 +1,7 @@
-import json
 import os
 import uuid
 from datetime import datetime
+from src.storage import read_json, write_json, file_lock
 
 NEWS_FILE_RELATIVE_TO_ROOT = 'data/news.json'
 NEWS_DATE_FORMAT = '%Y-%m-%d'
@@ -15,11 +15,8 @@ def _get_news_file_path():
 def load_news_posts():
     """Loads all news posts from the JSON file."""
     file_path = _get_news_file_path()
-    if not os.path.exists(file_path):
-        return []
-    with open(file_path, 'r', encoding='utf-8') as f:
-        news_posts = json.load(f)
-    
+    news_posts = read_json(file_path)
+
     # Ensure all posts have a News_ID and sort by date descending
     for post in news_posts:
         if 'News_ID' not in post:
@@ -58,11 +55,7 @@ def load_news_posts():
 
 def save_news_posts(news_posts_list):
     """Saves the list of news posts to the JSON file."""
-    file_path = _get_news_file_path()
-    # Ensure the directory exists
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(news_posts_list, f, indent=4)
+    write_json(_get_news_file_path(), news_posts_list)
 
 def get_news_post_by_id(news_id):
     """Retrieves a single news post by its ID."""
@@ -71,28 +64,31 @@ def get_news_post_by_id(news_id):
 
 def add_news_post(news_data):
     """Adds a new news post to the list."""
-    news_posts = load_news_posts()
     news_data['News_ID'] = str(uuid.uuid4())
-    news_posts.append(news_data)
-    save_news_posts(news_posts)
+    with file_lock(_get_news_file_path()): # Held across the load and save so concurrent edits are not lost
+        news_posts = load_news_posts()
+        news_posts.append(news_data)
+        save_news_posts(news_posts)
     return news_data['News_ID']
 
 def update_news_post(news_id, updated_data):
     """Updates an existing news post."""
-    news_posts = load_news_posts()
-    for i, post in enumerate(news_posts):
-        if post.get('News_ID') == news_id:
-            news_posts[i].update(updated_data)
-            save_news_posts(news_posts)
-            return True
+    with file_lock(_get_news_file_path()):
+        news_posts = load_news_posts()
+        for i, post in enumerate(news_posts):
+            if post.get('News_ID') == news_id:
+                news_posts[i].update(updated_data)
+                save_news_posts(news_posts)
+                return True
     return False
 
 def delete_news_post(news_id):
     """Deletes a news post by its ID."""
-    news_posts = load_news_posts()
-    original_count = len(news_posts)
-    news_posts = [post for post in news_posts if post.get('News_ID') != news_id]
-    if len(news_posts) < original_count:
-        save_news_posts(news_posts)
-        return True
+    with file_lock(_get_news_file_path()):
+        news_posts = load_news_posts()
+        original_count = len(news_posts)
+        news_posts = [post for post in news_posts if post.get('News_ID') != news_id]
+        if len(news_posts) < original_count:
+            save_news_posts(news_posts)
+            return True
     return False
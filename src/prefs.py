@@ -1,6 +1,7 @@
 import json
 import os
 import datetime # Import datetime
+from src.storage import read_json, edit_json
 
 PREFS_FILE = 'data/prefs.json'
 
@@ -10,6 +11,15 @@ def _get_prefs_file_path():
     # For now, it's relative to where the app is run from, adjust if needed.
     return os.path.join(os.getcwd(), PREFS_FILE)
 
+def _prefs_from_list(json_list):
+    """Converts the saved list of {'Pref', 'Value'} items to a dictionary with lowercase keys."""
+    prefs_data = {}
+    for item in json_list:
+        if 'Pref' in item and 'Value' in item:
+            key = item['Pref'].lower() # Convert to lowercase for consistent access
+            prefs_data[key] = item['Value']
+    return prefs_data
+
 def load_preferences():
     """
     Loads preferences from data/prefs.json.
@@ -39,19 +49,21 @@ def load_preferences():
         "ai_model": "",
         "google_api_key": "",
         "openai_api_key": "",
+        "ai_concurrency_limit": 4,
+        "ai_max_retries": 2,
+        "ai_cache_ttl_hours": 168,
+        "ai_cache_max_entries": 500,
+        "ai_mock_latency_ms": 800,
+        "ai_mock_error_rate": 0.0,
         "game_date_mode": "real-time", # New preference
         "game_date": datetime.date.today().isoformat(), # New preference
-        "weight_unit": "lbs." # New preference for weight unit
+        "weight_unit": "lbs.", # New preference for weight unit
+        "snapshot_retention": 10
     }
 
     if os.path.exists(prefs_path):
         try:
-            with open(prefs_path, 'r', encoding='utf-8') as f:
-                json_list = json.load(f)
-                for item in json_list:
-                    if 'Pref' in item and 'Value' in item:
-                        key = item['Pref'].lower() # Convert to lowercase for consistent access
-                        prefs_data[key] = item['Value']
+            prefs_data = _prefs_from_list(read_json(prefs_path))
         except json.JSONDecodeError:
             print(f"Error decoding JSON from {prefs_path}. Using default preferences.")
             prefs_data = {} # Reset to empty to be filled by defaults
@@ -62,15 +74,9 @@ def load_preferences():
     
     return final_prefs
 
-def save_preferences(prefs_dict):
-    """
-    Saves preferences to data/prefs.json.
-    Expects a dictionary like {'league_name': '...', 'league_short': '...'}.
-    """
-    prefs_path = _get_prefs_file_path()
-    
-    # Convert back to the list of dictionaries format for saving
-    json_list = [
+def _prefs_to_list(prefs_dict):
+    """Converts a preferences dictionary back to the list of dictionaries format for saving."""
+    return [
         {"Pref": "League_Name", "Value": prefs_dict.get("league_name", "")},
         {"Pref": "League_Short", "Value": prefs_dict.get("league_short", "")},
         {"Pref": "Fan_Mode_Show_Logo", "Value": prefs_dict.get("fan_mode_show_logo", True)},
@@ -91,11 +97,26 @@ def save_preferences(prefs_dict):
         {"Pref": "AI_Model", "Value": prefs_dict.get("ai_model", "")},
         {"Pref": "Google_API_Key", "Value": prefs_dict.get("google_api_key", "")},
         {"Pref": "OpenAI_API_Key", "Value": prefs_dict.get("openai_api_key", "")},
+        {"Pref": "AI_Concurrency_Limit", "Value": prefs_dict.get("ai_concurrency_limit", 4)},
+        {"Pref": "AI_Max_Retries", "Value": prefs_dict.get("ai_max_retries", 2)},
+        {"Pref": "AI_Cache_TTL_Hours", "Value": prefs_dict.get("ai_cache_ttl_hours", 168)},
+        {"Pref": "AI_Cache_Max_Entries", "Value": prefs_dict.get("ai_cache_max_entries", 500)},
+        {"Pref": "AI_Mock_Latency_Ms", "Value": prefs_dict.get("ai_mock_latency_ms", 800)},
+        {"Pref": "AI_Mock_Error_Rate", "Value": prefs_dict.get("ai_mock_error_rate", 0.0)},
         {"Pref": "Game_Date_Mode", "Value": prefs_dict.get("game_date_mode", "real-time")}, # New preference
         {"Pref": "Game_Date", "Value": prefs_dict.get("game_date", datetime.date.today().isoformat())}, # New preference
-        {"Pref": "Weight_Unit", "Value": prefs_dict.get("weight_unit", "lbs.")} # New preference for weight unit
+        {"Pref": "Weight_Unit", "Value": prefs_dict.get("weight_unit", "lbs.")}, # New preference for weight unit
+        {"Pref": "Snapshot_Retention", "Value": prefs_dict.get("snapshot_retention", 10)}
     ]
 
-    os.makedirs(os.path.dirname(prefs_path), exist_ok=True)
-    with open(prefs_path, 'w', encoding='utf-8') as f:
-        json.dump(json_list, f, indent=4)
+def update_preferences(changes):
+    """
+    Saves the given preferences to data/prefs.json, e.g. {'game_date': '2025-06-01'}. The file is
+    re-read under its lock and only these keys change, so concurrent saves don't lose each other's
+    preferences. Returns the saved preferences.
+    """
+    with edit_json(_get_prefs_file_path()) as json_list:
+        prefs_dict = load_preferences() # Re-read under the lock; defaults fill any missing keys
+        prefs_dict.update(changes)
+        json_list[:] = _prefs_to_list(prefs_dict)
+    return prefs_dict
@@ -0,0 +1,143 @@
+import os
+import numpy as np
+from src.storage import read_json, write_json, edit_json
+from src.events import load_events
+from src.segments import _slugify, _classify_match
+from src.standings import _get_card_matches
+
+RATINGS_FILE_RELATIVE_TO_ROOT = 'data/ratings.json'
+INITIAL_RATING = 1500.0
+RATING_SCALE = 400.0 # A rating gap this large means 10-to-1 expected odds
+# Rating points at stake per match, by _classify_match class. A multi-side match splits them
+# across the winner's comparisons with each other side, so a battle royal moves each loser little.
+K_FACTORS = {'singles': 32.0, 'tag': 24.0, 'other': 24.0, 'battle_royal': 16.0}
+
+def _get_ratings_file_path():
+    """Constructs the absolute path to the power ratings file."""
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    return os.path.join(project_root, RATINGS_FILE_RELATIVE_TO_ROOT)
+
+def _new_ratings():
+    """Returns an empty ratings ledger."""
+    return {'Applied_Events': [], 'Wrestlers': {}}
+
+def load_ratings():
+    """Loads the power ratings: each rated wrestler's Elo rating and number of rated matches."""
+    ratings = read_json(_get_ratings_file_path(), default=_new_ratings)
+    for key, value in _new_ratings().items():
+        ratings.setdefault(key, value)
+    return ratings
+
+def get_rating(ratings, name):
+    """Returns a wrestler's rating, or the starting rating if they have no rated matches."""
+    return ratings.get('Wrestlers', {}).get(name, {}).get('Rating', INITIAL_RATING)
+
+def get_team_rating(ratings, member_names):
+    """Returns a tag team's rating: the average rating of its members."""
+    members = [name for name in member_names if name]
+    return sum(get_rating(ratings, name) for name in members) / len(members) if members else INITIAL_RATING
+
+def _compile_event(card_matches, index_of):
+    """
+    Flattens an event's matches into arrays for one batch update. Every side gets an ID; the
+    arrays list each side's members and each (side, side, score, weight) comparison. A winner
+    is compared with every other side, a draw compares all sides, and No Contests are skipped.
+    """
+    members, member_sides, side_a, side_b, scores, weights = [], [], [], [], [], []
+    side_count = 0
+    for _, match in card_matches:
+        sides = match.get('sides', [])
+        side_ids = list(range(side_count, side_count + len(sides)))
+        side_count += len(sides)
+        for side_id, side in zip(side_ids, sides):
+            for name in side:
+                members.append(index_of.setdefault(name, len(index_of)))
+                member_sides.append(side_id)
+
+        live = [i for i, side in enumerate(sides) if side]
+        winner = match.get('winning_side_index', -1)
+        if winner in live:
+            pairs = [(winner, i, 1.0) for i in live if i != winner]
+        elif 'Draw' in match.get('individual_results', {}).values():
+            pairs = [(i, j, 0.5) for n, i in enumerate(live) for j in live[n + 1:]]
+        else:
+            continue
+        weight = K_FACTORS[_classify_match(sides)] / max(len(live) - 1, 1)
+        for i, j, score in pairs:
+            side_a.append(side_ids[i])
+            side_b.append(side_ids[j])
+            scores.append(score)
+            weights.append(weight)
+    return (np.array(members, dtype=np.intp), np.array(member_sides, dtype=np.intp), np.array(side_a, dtype=np.intp),
+            np.array(side_b, dtype=np.intp), np.array(scores), np.array(weights), side_count)
+
+def _apply_batch(ratings, match_counts, batch):
+    """
+    Applies one event as a single rating period: every expected score uses the ratings from
+    before the event, and all changes are added at once. A side's rating is its members'
+    average, and every member of a side gets the side's whole change. Only members of rated
+    sides have a match added to their count.
+    """
+    members, member_sides, side_a, side_b, scores, weights, side_count = batch
+    if not len(members):
+        return
+    side_totals = np.bincount(member_sides, weights=ratings[members], minlength=side_count)
+    side_sizes = np.bincount(member_sides, minlength=side_count)
+    side_ratings = side_totals / np.maximum(side_sizes, 1)
+    if len(side_a):
+        expected = 1.0 / (1.0 + 10.0 ** ((side_ratings[side_b] - side_ratings[side_a]) / RATING_SCALE))
+        changes = weights * (scores - expected)
+        side_changes = (np.bincount(side_a, weights=changes, minlength=side_count)
+                        - np.bincount(side_b, weights=changes, minlength=side_count))
+        np.add.at(ratings, members, side_changes[member_sides])
+        rated = np.zeros(side_count, dtype=bool) # No Contests and matches without a winner are not rated
+        rated[side_a] = True
+        rated[side_b] = True
+        np.add.at(match_counts, members[rated[member_sides]], 1)
+
+def rate_events(ledger, events_with_matches):
+    """
+    Applies events to a ratings ledger in the given order. `events_with_matches` yields
+    (event name, card matches) pairs. Ratings are held in arrays while the events run.
+    """
+    wrestlers = ledger['Wrestlers']
+    index_of = {name: i for i, name in enumerate(wrestlers)}
+    ratings = np.array([entry.get('Rating', INITIAL_RATING) for entry in wrestlers.values()], dtype=float)
+    match_counts = np.array([entry.get('Matches', 0) for entry in wrestlers.values()], dtype=np.int64)
+    for event_name, card_matches in events_with_matches:
+        batch = _compile_event(card_matches, index_of)
+        if len(index_of) > len(ratings): # Newcomers start at the initial rating
+            ratings = np.concatenate([ratings, np.full(len(index_of) - len(ratings), INITIAL_RATING)])
+            match_counts = np.concatenate([match_counts, np.zeros(len(index_of) - len(match_counts), dtype=np.int64)])
+        _apply_batch(ratings, match_counts, batch)
+        ledger['Applied_Events'].append(event_name)
+    ledger['Wrestlers'] = {name: {'Rating': round(float(ratings[i]), 2), 'Matches': int(match_counts[i])}
+                           for name, i in index_of.items()}
+    return ledger
+
+def record_event_ratings(event):
+    """Updates the ratings with one just-finalized event. An event already rated is skipped."""
+    event_name = event.get('Event_Name')
+    card_matches = _get_card_matches(_slugify(event_name or ''))
+    with edit_json(_get_ratings_file_path(), default=_new_ratings) as ledger:
+        for key, value in _new_ratings().items():
+            ledger.setdefault(key, value)
+        if event_name not in ledger['Applied_Events']:
+            rate_events(ledger, [(event_name, card_matches)])
+
+def recompute_ratings(progress=None):
+    """
+    Recomputes every rating from scratch over all finalized events in date order. Incremental
+    updates rate events in the order they are finalized, so this also fixes events finalized late.
+    """
+    finalized_events = [e for e in load_events() if e.get('Finalized')]
+    finalized_events.sort(key=lambda e: e.get('Date', '')) # Stable, so same-day events keep their list order
+
+    def events_with_matches():
+        for i, event in enumerate(finalized_events):
+            if progress: progress(i, len(finalized_events), f"Rating {event.get('Event_Name', '')}")
+            yield event.get('Event_Name'), _get_card_matches(_slugify(event.get('Event_Name', '')))
+
+    ledger = rate_events(_new_ratings(), events_with_matches())
+    write_json(_get_ratings_file_path(), ledger)
+    return len(ledger['Wrestlers'])
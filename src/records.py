@@ -0,0 +1,65 @@
+from array import array
+
+WRESTLER_RECORD_FIELDS = ('Singles_Wins', 'Singles_Losses', 'Singles_Draws', 'Tag_Wins', 'Tag_Losses', 'Tag_Draws')
+TAGTEAM_RECORD_FIELDS = ('Wins', 'Losses', 'Draws')
+
+def parse_count(value):
+    """Converts a stored win/loss/draw counter to an int. Data saved before schema 2 holds them as strings."""
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+def migrate_record_counters(records, fields):
+    """Converts the counters of every record to ints in place. Returns True if anything changed."""
+    changed = False
+    for record in records:
+        for field in fields:
+            if field in record and type(record[field]) is not int:
+                record[field] = parse_count(record[field])
+                changed = True
+    return changed
+
+class RecordTable:
+    """
+    The win/loss/draw counters of a list of wrestlers or tag teams, stored as one integer array
+    per field with rows in list order. Fan pages look counters up by name without touching or
+    converting the records themselves.
+    """
+    __slots__ = ('names', 'index', 'columns')
+
+    def __init__(self, records, fields):
+        self.names = tuple(record.get('Name', '') for record in records)
+        self.index = {}
+        for i, name in enumerate(self.names):
+            self.index.setdefault(name, i)
+        self.columns = {field: array('q', (parse_count(record.get(field, 0)) for record in records)) for field in fields}
+
+    def __len__(self):
+        return len(self.names)
+
+    def get(self, name, field):
+        """Returns one counter of the named entity, or 0 if it is not in the table."""
+        i = self.index.get(name)
+        return self.columns[field][i] if i is not None else 0
+
+    def row(self, name):
+        """Returns all counters of the named entity as a dict."""
+        i = self.index.get(name)
+        return {field: (column[i] if i is not None else 0) for field, column in self.columns.items()}
+
+def apply_record_changes(records, record_changes, belt_fields=None):
+    """
+    Applies a finalize plan to a list of wrestlers or tag teams in place. `record_changes` maps a
+    name to {field: [before, after]} and each counter moves by after - before, so edits saved
+    since the plan was made are kept. `belt_fields` maps a name to its new Belt field.
+    """
+    seen = set()
+    for record in records:
+        name = record.get('Name')
+        if name not in seen: # Like the single-record updaters, only the first record with a name counts
+            seen.add(name)
+            for field, (before, after) in record_changes.get(name, {}).items():
+                record[field] = record.get(field, 0) + after - before
+        if belt_fields and name in belt_fields:
+            record['Belt'] = belt_fields[name]
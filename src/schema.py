@@ -0,0 +1,68 @@
+import os
+from src.storage import read_json, write_json, edit_json
+from src.system import register_cache_invalidator
+from src.records import migrate_record_counters, WRESTLER_RECORD_FIELDS, TAGTEAM_RECORD_FIELDS
+from src.wrestlers import _get_wrestlers_file_path
+from src.tagteams import _get_tagteams_file_path
+from src.standings import rebuild_standings
+from src.ratings import recompute_ratings
+from src.bookings import rebuild_booking_index
+
+# Version of the data file layout. Bump it and add a step to migrate_data() when stored data changes shape.
+#   1: the original layout
+#   2: win/loss/draw counters are stored as ints instead of strings
+#   3: division standings are kept in data/standings.json
+#   4: power ratings are kept in data/ratings.json
+#   5: who is booked on which date is indexed in data/bookings.json
+#   6: power rating match counts leave out unrated matches (No Contests, no winner)
+SCHEMA_VERSION = 6
+SCHEMA_FILE_RELATIVE_TO_ROOT = 'data/schema.json'
+
+def _get_schema_file_path():
+    """Constructs the absolute path to the schema version file."""
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    return os.path.join(project_root, SCHEMA_FILE_RELATIVE_TO_ROOT)
+
+def get_schema_version():
+    """Returns the schema version of the data files. Data without a schema file predates versioning."""
+    return read_json(_get_schema_file_path(), default=dict).get('Schema_Version', 1)
+
+def has_league_data():
+    """Returns True if the data directory holds anything besides the schema file."""
+    data_path = os.path.dirname(_get_schema_file_path())
+    schema_name = os.path.basename(SCHEMA_FILE_RELATIVE_TO_ROOT)
+    return os.path.isdir(data_path) and any(name != schema_name for name in os.listdir(data_path))
+
+def _migrate_counters_to_ints():
+    """Schema 2: stores every win/loss/draw counter as an int."""
+    with edit_json(_get_wrestlers_file_path()) as wrestlers:
+        migrate_record_counters(wrestlers, WRESTLER_RECORD_FIELDS)
+    with edit_json(_get_tagteams_file_path()) as tagteams:
+        migrate_record_counters(tagteams, TAGTEAM_RECORD_FIELDS)
+
+def migrate_data():
+    """Brings the data files up to SCHEMA_VERSION, running each missing step once. Returns True if any step ran."""
+    version = get_schema_version()
+    if version >= SCHEMA_VERSION:
+        return False
+    if not has_league_data(): # A new league starts out in the current layout
+        write_json(_get_schema_file_path(), {'Schema_Version': SCHEMA_VERSION})
+        return False
+    if version < 2:
+        _migrate_counters_to_ints()
+    if version < 3:
+        rebuild_standings() # Standings are updated per finalized event from now on
+    if version < 4:
+        recompute_ratings()
+    if version < 5:
+        rebuild_booking_index()
+    if 4 <= version < 6:
+        recompute_ratings() # Recounts rated matches; ratings built by the step above already leave unrated ones out
+    write_json(_get_schema_file_path(), {'Schema_Version': SCHEMA_VERSION})
+    print(f"Migrated league data from schema version {version} to {SCHEMA_VERSION}.")
+    return True
+
+@register_cache_invalidator
+def _migrate_restored_data():
+    """Migrates a restored backup, which may predate the current schema."""
+    migrate_data()
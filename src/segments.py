@@ -1,13 +1,14 @@
-import json
 import os
 import re
 import unicodedata
 import uuid
 
 from .prefs import load_preferences
+from .storage import read_json, write_json, edit_json, file_lock, record_etag, check_record_etag
 from .wrestlers import load_wrestlers
 from .tagteams import load_tagteams
 from .belts import load_belts # Added for championship logic
+from .bookings import refresh_event_bookings, find_double_bookings
 
 # Base directories
 DATA_DIR = 'data'
@@ -406,42 +407,23 @@ def _ensure_summary_dir_exists(event_slug):
 
 def load_segments(event_slug):
     """Loads segments for a specific event from its JSON file."""
-    file_path = _get_segments_file_path(event_slug)
-    if not os.path.exists(file_path):
-        return []
-    with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-        if not content:
-            return []
-        return json.loads(content)
+    return read_json(_get_segments_file_path(event_slug))
 
 
 def save_segments(event_slug, segments_list):
     """Saves segments for a specific event to its JSON file."""
-    file_path = _get_segments_file_path(event_slug)
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(segments_list, f, indent=4)
+    write_json(_get_segments_file_path(event_slug), segments_list)
 
 
 def load_matches(event_slug):
     """Loads match data for a specific event from its JSON file."""
-    file_path = _get_matches_file_path(event_slug)
-    if not os.path.exists(file_path):
-        return []
-    with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-        if not content:
-            return []
-        return json.loads(content)
+    return read_json(_get_matches_file_path(event_slug))
 
 
 def save_matches(event_slug, matches_list):
     """Saves match data for a specific event to its JSON file."""
-    file_path = _get_matches_file_path(event_slug)
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(matches_list, f, indent=4)
+    write_json(_get_matches_file_path(event_slug), matches_list)
+    refresh_event_bookings(event_slug)
 
 
 def get_segment_by_position(event_slug, position):
@@ -504,9 +486,10 @@ def _generate_participants_display_string(sides, all_tagteams_data):
     return " vs ".join(side_display_strings)
 
 
-def validate_match_data(sides, match_results=None):
+def validate_match_data(sides, match_results=None, event_slug=None):
     """
-    Validates match data based on specified rules.
+    Validates match data based on specified rules. With `event_slug`, also warns about
+    participants booked on another event on the same date.
     """
     errors = []
     warnings = []
@@ -521,6 +504,10 @@ def validate_match_data(sides, match_results=None):
 
     warnings.extend(_validate_match_structure(sides))
 
+    if event_slug:
+        for wrestler, other_events in find_double_bookings(event_slug, _get_all_wrestlers_involved(sides)).items():
+            warnings.append(f"{wrestler} is also booked on {', '.join(other_events)} on the same date.")
+
     if match_results:
         all_tagteams_data = load_tagteams()
         all_wrestlers_in_match = _get_all_wrestlers_involved(sides)
@@ -531,6 +518,12 @@ def validate_match_data(sides, match_results=None):
 
 def add_segment(event_slug, segment_data, summary_content, match_data=None):
     """Adds a new segment to an event. If it's a match, also adds match data."""
+    with file_lock(_get_segments_file_path(event_slug)): # One segment edit at a time per event
+        return _add_segment(event_slug, segment_data, summary_content, match_data)
+
+
+def _add_segment(event_slug, segment_data, summary_content, match_data=None):
+    """Does the work of add_segment(); the caller holds the event's segments lock."""
     segments = load_segments(event_slug)
     if any(s.get('position') == segment_data['position'] for s in segments):
         return False, "A segment with this position already exists."
@@ -553,7 +546,7 @@ def add_segment(event_slug, segment_data, summary_content, match_data=None):
             else:
                 segment_data['header'] = 'Match'
 
-        errors, warnings = validate_match_data(processed_match_data.get('sides', []), processed_match_data)
+        errors, warnings = validate_match_data(processed_match_data.get('sides', []), processed_match_data, event_slug)
         if errors:
             raise ValueError(f"Match data validation failed: {', '.join(errors)}")
         processed_match_data['warnings'] = warnings if warnings else []
@@ -561,7 +554,7 @@ def add_segment(event_slug, segment_data, summary_content, match_data=None):
         # Generate the match_result_display string
         all_belts_data = load_belts() # Load belts here for the display string generation
         generated_display_string = generate_match_result_display_string(processed_match_data, all_tagteams_data, all_belts_data)
-        
+    
         # Use user-provided match_result_display if available, otherwise use generated
         final_match_result_display = match_data.get('match_result_display') or generated_display_string
 
@@ -580,7 +573,7 @@ def add_segment(event_slug, segment_data, summary_content, match_data=None):
         full_match_data_to_save['match_id'] = match_id
         full_match_data_to_save['segment_position'] = segment_data['position']
         full_match_data_to_save['match_result_display'] = final_match_result_display # Also store in full match data
-        
+    
         _add_match(event_slug, full_match_data_to_save)
     else:
         # If not a match, ensure match-specific fields are cleared
@@ -608,13 +601,27 @@ def add_segment(event_slug, segment_data, summary_content, match_data=None):
 
 def _add_match(event_slug, match_data):
     """Internal function to add a new match to an event's matches file."""
-    matches = load_matches(event_slug)
-    matches.append(match_data)
-    save_matches(event_slug, matches)
+    with edit_json(_get_matches_file_path(event_slug)) as matches:
+        matches.append(match_data)
+    refresh_event_bookings(event_slug)
 
 
-def update_segment(event_slug, original_position, updated_data, summary_content, match_data=None):
-    """Updates an existing segment for an event. If it's a match, also updates match data."""
+def get_segment_etag(segment):
+    """Returns the version fingerprint of a segment, covering its summary text as well."""
+    return record_etag(segment, load_summary_content(segment.get('summary_file', '')))
+
+
+def update_segment(event_slug, original_position, updated_data, summary_content, match_data=None, expected_etag=None):
+    """
+    Updates an existing segment for an event. If it's a match, also updates match data.
+    Raises StaleRecordError if `expected_etag` is out of date.
+    """
+    with file_lock(_get_segments_file_path(event_slug)): # One segment edit at a time per event
+        return _update_segment(event_slug, original_position, updated_data, summary_content, match_data, expected_etag)
+
+
+def _update_segment(event_slug, original_position, updated_data, summary_content, match_data=None, expected_etag=None):
+    """Does the work of update_segment(); the caller holds the event's segments lock."""
     segments = load_segments(event_slug)
     segment_index = -1
     for i, segment in enumerate(segments):
@@ -626,6 +633,7 @@ def update_segment(event_slug, original_position, updated_data, summary_content,
 
     if segment_index == -1:
         return False, f"Segment at position {original_position} not found."
+    check_record_etag(segments[segment_index], expected_etag, load_summary_content(old_summary_file_path or ''))
 
     if updated_data['position'] != int(original_position) and \
        any(s.get('position') == updated_data['position'] for s in segments if s.get('position') != int(original_position)):
@@ -649,7 +657,7 @@ def update_segment(event_slug, original_position, updated_data, summary_content,
             else:
                 updated_data['header'] = 'Match'
 
-        errors, warnings = validate_match_data(processed_match_data.get('sides', []), processed_match_data)
+        errors, warnings = validate_match_data(processed_match_data.get('sides', []), processed_match_data, event_slug)
         if errors:
             raise ValueError(f"Match data validation failed: {', '.join(errors)}")
         processed_match_data['warnings'] = warnings if warnings else []
@@ -682,7 +690,7 @@ def update_segment(event_slug, original_position, updated_data, summary_content,
             updated_data['match_id'] = match_id
             full_match_data_to_save['match_id'] = match_id
             _add_match(event_slug, full_match_data_to_save)
-            
+        
     elif old_match_id:
         _delete_match(event_slug, old_match_id)
         updated_data.pop('match_id', None)
@@ -712,20 +720,25 @@ def update_segment(event_slug, original_position, updated_data, summary_content,
 
 def _update_match(event_slug, match_id, updated_match_data):
     """Internal function to update an existing match in an event's matches file."""
-    matches = load_matches(event_slug)
-    found = False
-    for i, match in enumerate(matches):
-        if match.get('match_id') == match_id:
-            matches[i] = updated_match_data
-            found = True
-            break
-    if found:
-        save_matches(event_slug, matches)
-    return found
+    with edit_json(_get_matches_file_path(event_slug)) as matches:
+        for i, match in enumerate(matches):
+            if match.get('match_id') == match_id:
+                matches[i] = updated_match_data
+                break
+        else:
+            return False
+    refresh_event_bookings(event_slug)
+    return True
 
 
 def delete_segment(event_slug, position):
     """Deletes a segment and its associated summary file and match data for an event."""
+    with file_lock(_get_segments_file_path(event_slug)): # One segment edit at a time per event
+        return _delete_segment(event_slug, position)
+
+
+def _delete_segment(event_slug, position):
+    """Does the work of delete_segment(); the caller holds the event's segments lock."""
     segments = load_segments(event_slug)
     segment_to_delete = next((s for s in segments if s.get('position') == int(position)), None)
 
@@ -733,7 +746,7 @@ def delete_segment(event_slug, position):
         segments = [s for s in segments if s.get('position') != int(position)]
         save_segments(event_slug, segments)
         delete_summary_file(segment_to_delete.get('summary_file', ''))
-        
+    
         if segment_to_delete.get('match_id'):
             _delete_match(event_slug, segment_to_delete['match_id'])
         return True
@@ -742,12 +755,13 @@ def delete_segment(event_slug, position):
 
 def _delete_match(event_slug, match_id):
     """Internal function to delete a match from an event's matches file."""
-    matches = load_matches(event_slug)
-    matches_after_delete = [m for m in matches if m.get('match_id') != match_id]
-    if len(matches_after_delete) < len(matches):
-        save_matches(event_slug, matches_after_delete)
-        return True
-    return False
+    with edit_json(_get_matches_file_path(event_slug)) as matches:
+        matches_after_delete = [m for m in matches if m.get('match_id') != match_id]
+        if len(matches_after_delete) == len(matches):
+            return False
+        matches[:] = matches_after_delete
+    refresh_event_bookings(event_slug)
+    return True
 
 
 def delete_all_segments_for_event(event_name):
@@ -768,5 +782,6 @@ def delete_all_segments_for_event(event_name):
 
     if os.path.exists(matches_file_path):
         os.remove(matches_file_path)
+    refresh_event_bookings(sluggified_event_name)
         
     return True
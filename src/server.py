@@ -0,0 +1,110 @@
+import argparse
+import importlib.util
+import os
+from src.app import create_app
+from src.league import get_league_snapshot, preload_league_snapshot, install_reload_signal
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 5000
+DEFAULT_WORKERS = 1
+DEFAULT_THREADS = 8
+SERVERS = ('auto', 'waitress', 'gunicorn', 'werkzeug')
+
+def _is_installed(module_name):
+    """Returns True if an optional server package can be imported."""
+    return importlib.util.find_spec(module_name) is not None
+
+def choose_server(server='auto', workers=DEFAULT_WORKERS):
+    """
+    Picks the production server to use. 'auto' prefers gunicorn for several worker processes
+    (POSIX only), then waitress, and falls back to Werkzeug's threaded server, which is always
+    available. Raises ValueError if a named server is not installed.
+    """
+    if server == 'auto':
+        if workers > 1 and os.name == 'posix' and _is_installed('gunicorn'):
+            return 'gunicorn'
+        if workers <= 1 and _is_installed('waitress'):
+            return 'waitress'
+        return 'werkzeug'
+    if server not in SERVERS:
+        raise ValueError(f"Unknown server '{server}'. Choose one of: {', '.join(SERVERS)}.")
+    if server != 'werkzeug' and not _is_installed(server):
+        raise ValueError(f"The '{server}' server is not installed. Install it with: pip install {server}")
+    return server
+
+def _serve_gunicorn(host, port, workers, threads, fan_only):
+    """Serves the app from gunicorn worker processes, each building its own app."""
+    from gunicorn.app.base import BaseApplication
+
+    class SlamSimApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f"{host}:{port}")
+            self.cfg.set('workers', workers)
+            self.cfg.set('threads', threads)
+            self.cfg.set('worker_class', 'gthread')
+
+        def load(self):
+            return create_app(fan_only=fan_only)
+
+    SlamSimApplication().run()
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, server='auto', workers=DEFAULT_WORKERS, threads=DEFAULT_THREADS, fan_only=False):
+    """
+    Serves the app from a production WSGI server with `workers` processes of `threads` threads.
+    Background jobs, AI streams and the in-memory caches live in one process, so booker mode
+    should run a single worker; several workers are meant for fan-only traffic.
+    """
+    workers = max(int(workers), 1)
+    threads = max(int(threads), 1)
+    requested_server = server
+    server = choose_server(server, workers)
+    if workers > 1 and not fan_only:
+        print("Warning: background jobs and AI streams are not shared between worker processes. Use --fan-only with several workers.")
+    print(f"Serving SlamSim! on http://{host}:{port}/ with {server} ({workers} worker(s), {threads} thread(s))")
+
+    if fan_only:
+        # Preload the read-only league before forking so workers share it copy-on-write.
+        # Gunicorn handles SIGHUP itself by restarting its workers, which preload again.
+        preload_league_snapshot(include_event_cards=True)
+        if server != 'gunicorn' and install_reload_signal():
+            print(f"Send SIGHUP to process {os.getpid()} to reload the league data.")
+    elif workers > 1:
+        # Build the league snapshot before forking so workers share it copy-on-write,
+        # and keep it fresh here for servers that fork a child per request
+        get_league_snapshot()
+
+    if server == 'gunicorn':
+        _serve_gunicorn(host, port, workers, threads, fan_only)
+    elif server == 'waitress':
+        if workers > 1:
+            print("Warning: waitress runs a single process; --workers is ignored.")
+        from waitress import serve as waitress_serve
+        waitress_serve(create_app(fan_only=fan_only), host=host, port=port, threads=threads)
+    else:
+        if requested_server == 'auto':
+            print("Note: waitress or gunicorn are not installed, so Werkzeug's threaded server is used. Install one of them for a hardened production server.")
+        from werkzeug.serving import run_simple
+        # Werkzeug can fork worker processes or run threads, not both
+        if workers > 1:
+            run_simple(host, port, create_app(fan_only=fan_only), processes=workers, threaded=False)
+        else:
+            run_simple(host, port, create_app(fan_only=fan_only), threaded=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the SlamSim! web application.")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--production', action='store_true', help="Serve from a multi-threaded WSGI server instead of the debug server")
+    parser.add_argument('--server', choices=SERVERS, default='auto', help="Production server to use")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="Worker processes (production only)")
+    parser.add_argument('--threads', type=int, default=DEFAULT_THREADS, help="Threads per worker (production only)")
+    parser.add_argument('--fan-only', action='store_true', help="Serve only the fan pages")
+    args = parser.parse_args(argv)
+
+    if args.production:
+        serve(args.host, args.port, args.server, args.workers, args.threads, args.fan_only)
+    else:
+        create_app(fan_only=args.fan_only).run(host=args.host, port=args.port, debug=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,328 @@
+import math
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+from src.events import load_events
+from src.wrestlers import load_wrestlers
+from src.tagteams import load_tagteams
+from src.belts import load_belts
+from src.divisions import load_divisions
+from src.segments import _slugify, _classify_match, _get_all_tag_teams_involved
+from src.standings import load_standings, _get_card_matches, MIN_MATCHES_FOR_PERCENTAGE
+from src.ratings import load_ratings, get_rating, K_FACTORS, RATING_SCALE
+
+DEFAULT_SIMULATIONS = 10000
+MAX_SIMULATIONS = 200000
+SIMULATIONS_PER_WORKER = 25000 # Smaller runs stay in this process; a worker pool only pays off for big ones
+BACKGROUND_SIMULATIONS = 25000 # Bigger runs are started as a background job rather than inside a page request
+CELLS_PER_CHUNK = 4000000 # Seasons times tracked entities simulated at once; keeps each chunk's arrays to tens of MB
+RECORD_WEIGHT = 100.0 # Rating points a perfect record adds on top of the power rating
+RECORD_PRIOR = 10 # Pseudo-matches that damp the record adjustment for short records
+TOP_RESULTS = 5 # Contenders listed per title and division
+
+def _member_strength(name, ratings, wrestlers_by_name):
+    """Returns a wrestler's strength: their power rating nudged by their overall win/loss record."""
+    wrestler = wrestlers_by_name.get(name, {})
+    wins = wrestler.get('Singles_Wins', 0) + wrestler.get('Tag_Wins', 0)
+    losses = wrestler.get('Singles_Losses', 0) + wrestler.get('Tag_Losses', 0)
+    return get_rating(ratings, name) + RECORD_WEIGHT * (wins - losses) / (wins + losses + RECORD_PRIOR)
+
+def _side_ratings(mean_strengths, side_sizes):
+    """
+    Turns each side's average member strength into a side rating with a handicap bonus, so a
+    side twice the size of another is twice as strong. Works on one match or a row per simulation.
+    """
+    return mean_strengths + RATING_SCALE * np.log10(side_sizes)
+
+def _probabilities_from_ratings(side_ratings):
+    """Turns side ratings into win probabilities over all sides (multi-way Elo / Bradley-Terry)."""
+    scaled = side_ratings / RATING_SCALE * math.log(10)
+    scaled = scaled - scaled.max(axis=-1, keepdims=True)
+    weights = np.exp(scaled)
+    return weights / weights.sum(axis=-1, keepdims=True)
+
+def win_probabilities(sides, ratings=None, wrestlers=None):
+    """
+    Estimates each side's chance of winning a match from power ratings, records and side sizes.
+    Works for every match class: singles, tag, multi-side and battle royals. Returns one float per side.
+    """
+    ratings = load_ratings() if ratings is None else ratings
+    wrestlers_by_name = {w.get('Name'): w for w in (load_wrestlers() if wrestlers is None else wrestlers)}
+    live = [i for i, side in enumerate(sides) if side]
+    if len(live) < 2:
+        return [1.0 if i in live else 0.0 for i in range(len(sides))]
+    means = np.array([np.mean([_member_strength(name, ratings, wrestlers_by_name) for name in sides[i]]) for i in live])
+    sizes = np.array([len(sides[i]) for i in live], dtype=float)
+    probabilities = _probabilities_from_ratings(_side_ratings(means, sizes))
+    result = [0.0] * len(sides)
+    for i, p in zip(live, probabilities):
+        result[i] = float(p)
+    return result
+
+def _pick_division_members(members, names, wins, losses, on_card):
+    """
+    Keeps the division members a simulation can tell apart: everyone on the simulated cards, plus
+    the off-card members who could lead the table or make its top list. Everyone else's record
+    cannot change, so they are never ahead of those kept and need no column of their own.
+    """
+    def score(i): # As in _simulate_chunk: win percentage, then wins
+        decided = wins.get(i, 0) + losses.get(i, 0)
+        return (wins.get(i, 0) / max(decided, 1) if decided >= MIN_MATCHES_FOR_PERCENTAGE else -1.0) * 1e6 + wins.get(i, 0)
+    members = sorted(members, key=lambda i: names[i]) # Ties on the simulated table fall to name order, as in the standings
+    off_card = [i for i in members if i not in on_card]
+    kept = set(members) - set(off_card)
+    if off_card:
+        kept.add(max(off_card, key=score)) # max() keeps the first of equal scores, as argmax does
+        kept.update(sorted(off_card, key=lambda i: -wins.get(i, 0))[:TOP_RESULTS])
+    return [i for i in members if i in kept]
+
+def _build_model(events):
+    """
+    Compiles the booked matches of the given events into plain arrays and lists that can be
+    pickled to worker processes. Only the wrestlers and tag teams on the cards, holding a title
+    or needed for a division table are numbered, so the arrays don't grow with the roster:
+    they share one entity numbering, in roster order.
+    """
+    wrestlers, tagteams = load_wrestlers(), load_tagteams()
+    ratings, ledger = load_ratings(), load_standings()
+    wrestlers_by_name = {w.get('Name'): w for w in wrestlers}
+    all_names = [w.get('Name') for w in wrestlers] + [t.get('Name') for t in tagteams]
+    wrestler_ids = {w.get('Name'): i for i, w in enumerate(wrestlers)}
+    team_ids = {t.get('Name'): len(wrestlers) + i for i, t in enumerate(tagteams)}
+    belts_by_name = {b.get('Name', '').strip().lower(): b for b in load_belts()}
+
+    # Current standings, so simulated results are added to real ones
+    base_wins, base_losses = {}, {}
+    for section, ids in (('Wrestlers', wrestler_ids), ('Tag_Teams', team_ids)):
+        for name, entry in ledger.get(section, {}).items():
+            if name in ids:
+                base_wins[ids[name]] = entry.get('Wins', 0)
+                base_losses[ids[name]] = entry.get('Losses', 0)
+
+    belts, belt_index, matches = [], {}, []
+    for event in events:
+        for position, match in _get_card_matches(_slugify(event.get('Event_Name', ''))):
+            sides = [[name for name in side if name in wrestler_ids] for side in match.get('sides', [])]
+            sides = [side for side in sides if side]
+            if len(sides) < 2:
+                continue
+            match_class = match.get('match_class') or _classify_match(sides)
+            side_teams = []
+            for side in sides:
+                teams = _get_all_tag_teams_involved([side], tagteams)
+                side_teams.append(team_ids[sorted(teams)[0]] if teams else -1)
+            belt_slot = -1
+            belt = belts_by_name.get((match.get('match_championship') or '').strip().lower())
+            if belt and belt.get('Status') == 'Active':
+                if belt['Name'] not in belt_index:
+                    holder = belt.get('Current_Holder', '')
+                    holder_id = team_ids.get(holder, -1) if belt.get('Holder_Type') == 'Tag-Team' else wrestler_ids.get(holder, -1)
+                    belt_index[belt['Name']] = len(belts)
+                    belts.append({'name': belt['Name'], 'holder_type': belt.get('Holder_Type'), 'holder': holder_id})
+                belt_slot = belt_index[belt['Name']]
+            matches.append({
+                'event': event.get('Event_Name'), 'position': position,
+                'sides': [[wrestler_ids[name] for name in side] for side in sides],
+                'side_names': [' & '.join(side) for side in sides],
+                'side_teams': side_teams, 'singles': match_class == 'singles',
+                'k': K_FACTORS.get(_classify_match(sides), K_FACTORS['other']) / (len(sides) - 1),
+                'belt': belt_slot,
+            })
+
+    on_card = {i for match in matches for side in match['sides'] for i in side}
+    on_card.update(i for match in matches for i in match['side_teams'] if i != -1)
+    used = on_card | {belt['holder'] for belt in belts if belt['holder'] != -1}
+    divisions = []
+    for division in sorted(load_divisions(), key=lambda d: d.get('Display_Position', 0)):
+        if division.get('Status') != 'Active':
+            continue
+        if division.get('Holder_Type') == 'Tag-Team':
+            members = [team_ids[t['Name']] for t in tagteams if t.get('Division') == division.get('ID') and t.get('Status') == 'Active']
+        else:
+            members = [wrestler_ids[w['Name']] for w in wrestlers if w.get('Division') == division.get('ID') and w.get('Status') == 'Active']
+        members = _pick_division_members(members, all_names, base_wins, base_losses, on_card) if members else []
+        used.update(members)
+        if members:
+            divisions.append({'name': division.get('Name'), 'members': members})
+
+    # Renumber the entities in use from 0
+    entity_ids = sorted(used)
+    remap = {old: new for new, old in enumerate(entity_ids)}
+    for match in matches:
+        match['sides'] = [[remap[i] for i in side] for side in match['sides']]
+        match['side_teams'] = [remap.get(i, -1) for i in match['side_teams']]
+    for belt in belts:
+        belt['holder'] = remap.get(belt['holder'], -1)
+    for division in divisions:
+        division['members'] = [remap[i] for i in division['members']]
+
+    names = [all_names[i] for i in entity_ids]
+    strengths = np.array([_member_strength(all_names[i], ratings, wrestlers_by_name) if i < len(wrestlers) else 0.0
+                          for i in entity_ids], dtype=np.float32) # Tag teams only keep a record
+    return {'names': names, 'strengths': strengths,
+            'base_wins': np.array([base_wins.get(i, 0) for i in entity_ids], dtype=np.int32),
+            'base_losses': np.array([base_losses.get(i, 0) for i in entity_ids], dtype=np.int32),
+            'matches': matches, 'belts': belts, 'divisions': divisions}
+
+def _simulate_chunk(model, simulations, seed):
+    """
+    Runs `simulations` seasons at once: every array has one row per simulated season, so each
+    match is a handful of NumPy operations. Ratings move with Elo after every simulated match.
+    Returns summed counts that can be added to those of other chunks.
+    """
+    rng = np.random.default_rng(seed)
+    rows = np.arange(simulations)
+    strengths = np.tile(model['strengths'], (simulations, 1))
+    wins = np.tile(model['base_wins'], (simulations, 1))
+    losses = np.tile(model['base_losses'], (simulations, 1))
+    holders = np.tile(np.array([b['holder'] for b in model['belts']], dtype=np.int64), (simulations, 1))
+    title_changes = np.zeros(len(model['belts']), dtype=np.int64)
+    match_wins, match_title_changes = [], []
+
+    for match in model['matches']:
+        sides = match['sides']
+        sizes = np.array([len(side) for side in sides], dtype=np.float32)
+        side_ratings = _side_ratings(np.stack([strengths[:, side].mean(axis=1) for side in sides], axis=1), sizes)
+        probabilities = _probabilities_from_ratings(side_ratings)
+        winner = (rng.random(simulations)[:, None] > np.cumsum(probabilities, axis=1)).sum(axis=1)
+        winner = np.minimum(winner, len(sides) - 1) # Guards against rounding in the last cumulative sum
+        match_wins.append(np.bincount(winner, minlength=len(sides)))
+
+        # Elo: the winner is compared with every other side, as in src.ratings
+        winner_ratings = side_ratings[rows, winner]
+        expected = 1.0 / (1.0 + 10.0 ** ((side_ratings - winner_ratings[:, None]) / RATING_SCALE))
+        changes = match['k'] * (1.0 - expected)
+        changes[rows, winner] = 0.0
+        side_changes = -changes
+        side_changes[rows, winner] = changes.sum(axis=1)
+        for s, side in enumerate(sides):
+            strengths[:, side] += side_changes[:, s:s + 1]
+            won = winner == s
+            if match['singles']:
+                wins[:, side[0]] += won
+                losses[:, side[0]] += ~won
+            if match['side_teams'][s] != -1:
+                wins[:, match['side_teams'][s]] += won
+                losses[:, match['side_teams'][s]] += ~won
+
+        changed = 0
+        if match['belt'] != -1:
+            b = match['belt']
+            if model['belts'][b]['holder_type'] == 'Tag-Team':
+                winner_entity = np.array(match['side_teams'])[winner]
+            else:
+                winner_entity = np.array([side[0] if len(side) == 1 else -1 for side in sides])[winner]
+            change = (winner_entity != -1) & (winner_entity != holders[:, b])
+            holders[change, b] = winner_entity[change]
+            changed = int(change.sum())
+            title_changes[b] += changed
+        match_title_changes.append(changed)
+
+    entity_count = len(model['names'])
+    holder_counts = [np.bincount(holders[:, b] + 1, minlength=entity_count + 1) for b in range(len(model['belts']))]
+    leader_counts, win_totals = [], []
+    for division in model['divisions']:
+        members = np.array(division['members'])
+        member_wins, member_losses = wins[:, members], losses[:, members]
+        decided = member_wins + member_losses
+        percentage = np.where(decided >= MIN_MATCHES_FOR_PERCENTAGE, member_wins / np.maximum(decided, 1), -1.0)
+        # Same order as the standings table: win percentage, then wins (head-to-head is not simulated)
+        leader = np.argmax(percentage * 1e6 + member_wins, axis=1)
+        leader_counts.append(np.bincount(leader, minlength=len(members)))
+        win_totals.append(member_wins.sum(axis=0))
+    return {'match_wins': match_wins, 'match_title_changes': match_title_changes, 'title_changes': title_changes,
+            'holder_counts': holder_counts, 'leader_counts': leader_counts, 'win_totals': win_totals}
+
+def _merge_counts(totals, counts):
+    """Adds one chunk's counts to the running totals."""
+    if totals is None:
+        return counts
+    for key, value in counts.items():
+        if isinstance(value, list):
+            totals[key] = [a + b for a, b in zip(totals[key], value)]
+        else:
+            totals[key] = totals[key] + value
+    return totals
+
+def _simulate_in_chunks(model, simulations, seed, progress=None):
+    """Runs `simulations` seasons in chunks small enough to bound memory, whatever the roster size."""
+    chunk_size = max(1, CELLS_PER_CHUNK // max(len(model['names']), 1))
+    chunk_sizes = [chunk_size] * (simulations // chunk_size) + ([simulations % chunk_size] if simulations % chunk_size else [])
+    seeds = seed.spawn(len(chunk_sizes)) if len(chunk_sizes) > 1 else [seed]
+    totals, done = None, 0
+    for size, chunk_seed in zip(chunk_sizes, seeds):
+        totals = _merge_counts(totals, _simulate_chunk(model, size, chunk_seed))
+        done += size
+        if progress: progress(done, simulations, f"Simulated {done:,} of {simulations:,} seasons")
+    return totals
+
+def _run_simulations(model, simulations, progress=None):
+    """Runs the simulations in this process, or spread over a process pool when there are many."""
+    workers = min(os.cpu_count() or 1, math.ceil(simulations / SIMULATIONS_PER_WORKER))
+    seeds = np.random.SeedSequence().spawn(max(workers, 1))
+    if workers <= 1:
+        return _simulate_in_chunks(model, simulations, seeds[0], progress)
+    chunk_sizes = [simulations // workers + (1 if i < simulations % workers else 0) for i in range(workers)]
+    totals, done = None, 0
+    try:
+        # Spawned workers start clean instead of inheriting this process's threads and file locks
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            for size, counts in zip(chunk_sizes, pool.map(_simulate_in_chunks, [model] * workers, chunk_sizes, seeds)):
+                totals = _merge_counts(totals, counts)
+                done += size
+                if progress: progress(done, simulations, f"Simulated {done:,} of {simulations:,} seasons")
+    except (BrokenProcessPool, OSError) as e:
+        print(f"Error running simulations in worker processes, running them here instead: {e}")
+        totals = _simulate_in_chunks(model, simulations, seeds[0], progress)
+    return totals
+
+def simulate_events(events, simulations=DEFAULT_SIMULATIONS, progress=None):
+    """
+    Simulates the booked matches of the given events, in order, `simulations` times. Returns the
+    win chances of every match, the chance of each title changing hands, who is likely to hold
+    each title afterwards, and who is likely to lead each division.
+    """
+    simulations = max(1, min(int(simulations), MAX_SIMULATIONS))
+    model = _build_model(events)
+    if not model['matches']:
+        return {'simulations': simulations, 'events': [e.get('Event_Name') for e in events], 'matches': [], 'titles': [], 'divisions': []}
+    totals = _run_simulations(model, simulations, progress)
+    names = model['names']
+    ratings, wrestlers = load_ratings(), load_wrestlers()
+
+    matches = []
+    for match, wins_by_side, changes in zip(model['matches'], totals['match_wins'], totals['match_title_changes']):
+        side_names = [[names[i] for i in side] for side in match['sides']]
+        matches.append({
+            'event': match['event'], 'position': match['position'], 'sides': match['side_names'],
+            'probabilities': win_probabilities(side_names, ratings, wrestlers), # Before anything on the card happens
+            'simulated': [float(w) / simulations for w in wins_by_side],
+            'belt': model['belts'][match['belt']]['name'] if match['belt'] != -1 else None,
+            'title_change': changes / simulations,
+        })
+
+    titles = []
+    for belt, holder_counts, changes in zip(model['belts'], totals['holder_counts'], totals['title_changes']):
+        order = np.argsort(holder_counts)[::-1][:TOP_RESULTS]
+        titles.append({
+            'belt': belt['name'], 'current': names[belt['holder']] if belt['holder'] != -1 else 'Vacant',
+            'expected_changes': float(changes) / simulations,
+            'holders': [(names[i - 1] if i else 'Vacant', float(holder_counts[i]) / simulations) for i in order if holder_counts[i]],
+        })
+
+    divisions = []
+    for division, leader_counts, win_totals in zip(model['divisions'], totals['leader_counts'], totals['win_totals']):
+        order = sorted(range(len(leader_counts)), key=lambda i: (-leader_counts[i], -win_totals[i]))[:TOP_RESULTS]
+        divisions.append({
+            'division': division['name'],
+            'leaders': [(names[division['members'][i]], float(leader_counts[i]) / simulations,
+                         float(win_totals[i]) / simulations) for i in order],
+        })
+    return {'simulations': simulations, 'events': [e.get('Event_Name') for e in events],
+            'matches': matches, 'titles': titles, 'divisions': divisions}
+
+def get_upcoming_events():
+    """Returns the events not finalized yet, in date order: the rest of the season."""
+    return sorted((e for e in load_events() if not e.get('Finalized')), key=lambda e: e.get('Date', ''))
@@ -0,0 +1,165 @@
+import bisect
+import os
+from src.storage import read_json, write_json, edit_json
+from src.events import load_events
+from src.segments import load_segments, load_matches, _slugify, _get_all_tag_teams_involved
+from src.tagteams import load_tagteams
+
+STANDINGS_FILE_RELATIVE_TO_ROOT = 'data/standings.json'
+FORM_LENGTH = 5 # Results shown in the "last N" form column
+MIN_MATCHES_FOR_PERCENTAGE = 5 # Same threshold as the fan roster's Win Percentage order
+RESULT_FIELDS = {'Win': 'Wins', 'Loss': 'Losses', 'Draw': 'Draws'} # No Contests do not count
+HEAD_TO_HEAD_SLOTS = {'Win': 0, 'Loss': 1, 'Draw': 2} # Head-to-head records are [wins, losses, draws]
+FORM_LETTERS = {'Win': 'W', 'Loss': 'L', 'Draw': 'D'}
+
+def _get_standings_file_path():
+    """Constructs the absolute path to the standings ledger file."""
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    return os.path.join(project_root, STANDINGS_FILE_RELATIVE_TO_ROOT)
+
+def _new_ledger():
+    """Returns an empty standings ledger."""
+    return {'Applied_Events': [], 'Wrestlers': {}, 'Tag_Teams': {}}
+
+def load_standings():
+    """
+    Loads the standings ledger: every participant's finalized singles (wrestlers) or team (tag
+    teams) results, oldest first, with W/L/D totals and head-to-head records against opponents.
+    """
+    ledger = read_json(_get_standings_file_path(), default=_new_ledger)
+    for key, value in _new_ledger().items():
+        ledger.setdefault(key, value)
+    return ledger
+
+def _get_card_matches(event_slug):
+    """Returns the matches on an event's card in card order, the same ones finalizing applies."""
+    matches_by_id = {match.get('match_id'): match for match in load_matches(event_slug)}
+    segments = sorted(load_segments(event_slug), key=lambda s: s.get('position', 0))
+    return [(segment.get('position', 0), matches_by_id[segment['match_id']]) for segment in segments
+            if segment.get('type') == 'Match' and segment.get('match_id') in matches_by_id]
+
+def _match_outcomes(match, all_tagteams):
+    """Yields (ledger section, name, result, opponents) for everyone a match counts for in the standings."""
+    sides = match.get('sides', [])
+    if match.get('match_class') == 'singles':
+        for side_idx, side in enumerate(sides):
+            opponents = [name for i, other in enumerate(sides) if i != side_idx for name in other]
+            for wrestler_name in side:
+                yield 'Wrestlers', wrestler_name, match.get('individual_results', {}).get(wrestler_name), opponents
+    side_teams = [_get_all_tag_teams_involved([side], all_tagteams) for side in sides]
+    for side_idx, teams in enumerate(side_teams):
+        opponents = [name for i, other in enumerate(side_teams) if i != side_idx for name in other]
+        for team_name in teams:
+            yield 'Tag_Teams', team_name, match.get('team_results', {}).get(team_name), opponents
+
+def _apply_event(ledger, event, card_matches, all_tagteams):
+    """Adds one finalized event's results to the ledger."""
+    event_date = event.get('Date', '')
+    for position, match in card_matches:
+        for section, name, result, opponents in _match_outcomes(match, all_tagteams):
+            if result not in RESULT_FIELDS:
+                continue
+            entry = ledger[section].setdefault(name, {'Wins': 0, 'Losses': 0, 'Draws': 0, 'Results': [], 'Head_To_Head': {}})
+            entry[RESULT_FIELDS[result]] += 1
+            # Results stay in date order even if an older event is finalized late
+            bisect.insort(entry['Results'], [event_date, position, result])
+            for opponent in opponents:
+                record = entry['Head_To_Head'].setdefault(opponent, [0, 0, 0])
+                record[HEAD_TO_HEAD_SLOTS[result]] += 1
+    ledger['Applied_Events'].append(event.get('Event_Name'))
+
+def record_event_standings(event):
+    """
+    Adds a just-finalized event to the standings ledger. Only this event's matches are read;
+    an event already in the ledger is skipped, so calling it twice is harmless.
+    """
+    event_slug = _slugify(event.get('Event_Name', ''))
+    card_matches = _get_card_matches(event_slug)
+    all_tagteams = load_tagteams()
+    with edit_json(_get_standings_file_path(), default=_new_ledger) as ledger:
+        for key, value in _new_ledger().items():
+            ledger.setdefault(key, value)
+        if event.get('Event_Name') not in ledger['Applied_Events']:
+            _apply_event(ledger, event, card_matches, all_tagteams)
+
+def rebuild_standings(progress=None):
+    """Rebuilds the standings ledger from every finalized event. Used once when standings are introduced."""
+    ledger = _new_ledger()
+    all_tagteams = load_tagteams()
+    finalized_events = [e for e in load_events() if e.get('Finalized')]
+    for i, event in enumerate(finalized_events):
+        if progress: progress(i, len(finalized_events), f"Adding {event.get('Event_Name', '')} to the standings")
+        _apply_event(ledger, event, _get_card_matches(_slugify(event.get('Event_Name', ''))), all_tagteams)
+    write_json(_get_standings_file_path(), ledger)
+
+def reset_standings():
+    """Empties the standings while keeping the finalized events marked as counted, so they are not added again."""
+    with edit_json(_get_standings_file_path(), default=_new_ledger) as ledger:
+        applied_events = [e.get('Event_Name') for e in load_events() if e.get('Finalized')]
+        ledger.clear()
+        ledger.update(_new_ledger(), Applied_Events=applied_events)
+
+def _get_streak(results):
+    """Describes the run of identical results leading up to the latest one, e.g. 'W3'."""
+    if not results:
+        return ''
+    latest = results[-1][2]
+    count = 0
+    for result in reversed(results):
+        if result[2] != latest:
+            break
+        count += 1
+    return f"{FORM_LETTERS[latest]}{count}"
+
+def _head_to_head_score(name, rivals, ledger_section):
+    """Returns wins minus losses of one participant against a group of rivals."""
+    head_to_head = ledger_section.get(name, {}).get('Head_To_Head', {})
+    records = [head_to_head.get(rival, [0, 0, 0]) for rival in rivals]
+    return sum(record[0] - record[1] for record in records)
+
+def build_division_standings(division, wrestlers, tagteams, ledger):
+    """
+    Ranks a division's active wrestlers or tag teams. Order: win percentage (participants under
+    the match threshold last), then head-to-head results among those still tied, then wins, then name.
+    Returns a list of rows for the standings table.
+    """
+    if division.get('Holder_Type') == 'Tag-Team':
+        members, section = tagteams, ledger.get('Tag_Teams', {})
+    else:
+        members, section = wrestlers, ledger.get('Wrestlers', {})
+
+    rows = []
+    for member in members:
+        if member.get('Division') != division.get('ID') or member.get('Status') != 'Active':
+            continue
+        name = member.get('Name', '')
+        entry = section.get(name, {})
+        wins, losses, draws = entry.get('Wins', 0), entry.get('Losses', 0), entry.get('Draws', 0)
+        results = entry.get('Results', [])
+        qualified = wins + losses >= MIN_MATCHES_FOR_PERCENTAGE
+        rows.append({
+            'Name': name, 'Wins': wins, 'Losses': losses, 'Draws': draws,
+            'Win_Percentage': wins / (wins + losses) if qualified else None,
+            'Streak': _get_streak(results),
+            'Form': [FORM_LETTERS[r[2]] for r in results[-FORM_LENGTH:]][::-1], # Newest first
+        })
+
+    def primary_key(row):
+        return row['Win_Percentage'] if row['Win_Percentage'] is not None else -1.0
+
+    rows.sort(key=lambda r: (-primary_key(r), -r['Wins'], r['Name']))
+    # Break ties on win percentage with the head-to-head record among the tied participants
+    ranked, start = [], 0
+    while start < len(rows):
+        end = start
+        while end < len(rows) and primary_key(rows[end]) == primary_key(rows[start]):
+            end += 1
+        group = rows[start:end]
+        if len(group) > 1:
+            names = [r['Name'] for r in group]
+            group.sort(key=lambda r: (-_head_to_head_score(r['Name'], names, section), -r['Wins'], r['Name']))
+        ranked.extend(group)
+        start = end
+    for rank, row in enumerate(ranked, 1):
+        row['Rank'] = rank
+    return ranked
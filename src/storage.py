@@ -0,0 +1,282 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from src.system import get_project_root, register_cache_invalidator, INCLUDES_DIR
+
+try:
+    import fcntl
+except ImportError: # Windows: locks only cover threads of this process
+    fcntl = None
+
+LOCKS_DIR = os.path.join(INCLUDES_DIR, 'locks')
+LOCK_TIMEOUT = 10 # Seconds a writer waits for a lock before giving up
+LOCK_RETRY_DELAY = 0.005 # First wait between lock attempts; doubled up to LOCK_RETRY_MAX_DELAY
+LOCK_RETRY_MAX_DELAY = 0.1
+
+class StorageError(Exception):
+    """Base class for data file errors a route can report to the user."""
+    pass
+
+class LockTimeoutError(StorageError):
+    """Raised when a data file stays locked by another writer for longer than LOCK_TIMEOUT."""
+    pass
+
+class ConflictError(StorageError):
+    """Raised when a data file changed since the version the caller read."""
+    def __init__(self, file_path, expected_version, current_version):
+        super().__init__(f"{os.path.basename(file_path)} was changed by someone else (version {current_version}, "
+                         f"expected {expected_version}). Reload and try again.")
+        self.file_path = file_path
+        self.expected_version = expected_version
+        self.current_version = current_version
+
+class StaleRecordError(StorageError):
+    """Raised when a record changed since the caller loaded it; carries the record as it is now."""
+    def __init__(self, current, etag):
+        super().__init__("This record was changed by someone else after you opened it. Review the differences and save again to keep your version.")
+        self.current = current
+        self.etag = etag
+
+_save_listeners = [] # Called with the file path after every save
+_open_lock_fds = set() # Every lock file descriptor open in this process
+_held = threading.local() # Locks held by the current thread: path -> (shared, fd)
+_thread_locks = {} # Fallback exclusive locks when fcntl is unavailable
+_thread_locks_guard = threading.Lock()
+
+def _held_locks():
+    """Returns the current thread's held-lock table."""
+    if not hasattr(_held, 'locks'):
+        _held.locks = {}
+    return _held.locks
+
+def _get_lock_path(file_path):
+    """
+    Returns the lock file for a data file. Lock files live outside the data directory, so
+    backups never include them, and hold the data file's version counter.
+    """
+    project_root = get_project_root()
+    rel_path = os.path.relpath(os.path.abspath(file_path), project_root)
+    if rel_path.startswith(os.pardir):
+        rel_path = hashlib.sha256(os.path.abspath(file_path).encode('utf-8')).hexdigest()
+    return os.path.join(project_root, LOCKS_DIR, f"{rel_path}.lock")
+
+def _acquire(fd, file_path, shared, timeout):
+    """Takes an flock on an open lock file, polling with backoff until `timeout` seconds pass."""
+    mode = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+    if shared:
+        fcntl.flock(fd, mode) # Readers only wait for a writer's brief critical section
+        return
+    deadline = time.monotonic() + timeout
+    delay = LOCK_RETRY_DELAY
+    while True:
+        try:
+            fcntl.flock(fd, mode | fcntl.LOCK_NB)
+            return
+        except BlockingIOError:
+            if time.monotonic() >= deadline:
+                raise LockTimeoutError(f"{os.path.basename(file_path)} is busy; another change is still being saved. Please try again.")
+            time.sleep(delay)
+            delay = min(delay * 2, LOCK_RETRY_MAX_DELAY)
+
+@contextmanager
+def file_lock(file_path, shared=False, timeout=LOCK_TIMEOUT):
+    """
+    Holds a reader (shared) or writer (exclusive) lock on a data file, across threads and
+    processes. Readers never block each other. A thread that already holds the file's
+    exclusive lock may take it again. Yields the open lock file descriptor.
+    """
+    key = os.path.abspath(file_path)
+    held = _held_locks()
+    if key in held:
+        held_shared, fd = held[key]
+        if held_shared and not shared:
+            raise RuntimeError(f"Cannot upgrade a read lock on {file_path} to a write lock.")
+        yield fd
+        return
+
+    lock_path = _get_lock_path(file_path)
+    os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+    _open_lock_fds.add(fd)
+    thread_lock = None
+    try:
+        if fcntl:
+            _acquire(fd, file_path, shared, timeout)
+        elif not shared:
+            with _thread_locks_guard:
+                thread_lock = _thread_locks.setdefault(key, threading.Lock())
+            if not thread_lock.acquire(timeout=timeout):
+                thread_lock = None
+                raise LockTimeoutError(f"{os.path.basename(file_path)} is busy; another change is still being saved. Please try again.")
+        held[key] = (shared, fd)
+        try:
+            yield fd
+        finally:
+            del held[key]
+    finally:
+        if thread_lock:
+            thread_lock.release()
+        _open_lock_fds.discard(fd)
+        os.close(fd) # Closing the descriptor releases the flock
+
+def register_save_listener(callback):
+    """Registers a function called as callback(file_path) after a data file is saved. It must be quick."""
+    if callback not in _save_listeners:
+        _save_listeners.append(callback)
+    return callback
+
+def _notify_saved(file_path):
+    """Tells every save listener that a data file has new contents."""
+    for callback in _save_listeners:
+        try:
+            callback(os.path.abspath(file_path))
+        except Exception as e:
+            print(f"Error notifying save listener {getattr(callback, '__name__', callback)}: {e}")
+
+def _close_inherited_locks():
+    """
+    Runs in a forked child. Descriptors copied from the parent share its flocks, and the
+    threads that would release them do not exist in the child, so close the copies.
+    """
+    for fd in list(_open_lock_fds):
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+    _open_lock_fds.clear()
+    _held.__dict__.clear()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_close_inherited_locks)
+
+def _read_version(fd):
+    """Reads the version counter stored in a lock file."""
+    os.lseek(fd, 0, os.SEEK_SET)
+    content = os.read(fd, 32).strip()
+    return int(content) if content.isdigit() else 0
+
+def _write_version(fd, version):
+    """Stores a new version counter in a lock file."""
+    os.lseek(fd, 0, os.SEEK_SET)
+    os.write(fd, str(version).encode('ascii'))
+    os.ftruncate(fd, len(str(version)))
+
+def get_file_version(file_path):
+    """Returns the version counter of a data file. It goes up by one on every save."""
+    with file_lock(file_path, shared=True) as fd:
+        return _read_version(fd)
+
+def _load_json_unlocked(file_path, default):
+    """Reads and parses a JSON file, returning a fresh copy of `default` if it is missing or empty."""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+    except FileNotFoundError:
+        return default()
+    return json.loads(content) if content.strip() else default()
+
+def _write_json_unlocked(file_path, data):
+    """Writes JSON to a temporary file and renames it over the original, so readers never see a partial file."""
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    temp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, file_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def read_json(file_path, default=list):
+    """Loads a JSON data file under a shared lock. `default` is called for a missing or empty file."""
+    with file_lock(file_path, shared=True):
+        return _load_json_unlocked(file_path, default)
+
+def read_json_versioned(file_path, default=list):
+    """Loads a JSON data file and returns (data, version), read consistently under one lock."""
+    with file_lock(file_path, shared=True) as fd:
+        return _load_json_unlocked(file_path, default), _read_version(fd)
+
+def write_json(file_path, data, expected_version=None):
+    """
+    Replaces a JSON data file atomically under the exclusive lock and returns its new version.
+    Raises ConflictError if `expected_version` is given and the file has moved on since.
+    """
+    with file_lock(file_path) as fd:
+        version = _read_version(fd)
+        if expected_version is not None and int(expected_version) != version:
+            raise ConflictError(file_path, expected_version, version)
+        _write_json_unlocked(file_path, data)
+        _write_version(fd, version + 1)
+    _notify_saved(file_path)
+    return version + 1
+
+@contextmanager
+def edit_json(file_path, default=list, expected_version=None):
+    """
+    Read-modify-write of a JSON data file as one step: holds the exclusive lock, yields the
+    parsed data for in-place changes and saves it on exit if it changed. Nothing is saved if
+    the block raises. Raises ConflictError if `expected_version` is stale.
+    """
+    with file_lock(file_path) as fd:
+        version = _read_version(fd)
+        if expected_version is not None and int(expected_version) != version:
+            raise ConflictError(file_path, expected_version, version)
+        data = _load_json_unlocked(file_path, default)
+        original = json.dumps(data, sort_keys=True)
+        yield data
+        changed = json.dumps(data, sort_keys=True) != original
+        if changed:
+            _write_json_unlocked(file_path, data)
+            _write_version(fd, version + 1)
+    if changed:
+        _notify_saved(file_path)
+
+def record_etag(record, *extra, fields=None):
+    """
+    Returns a short fingerprint of one record, plus any `extra` values stored beside it. It
+    changes whenever a field changes, so forms and API clients can send it back as a version.
+    With `fields`, only those fields count, e.g. the ones an edit form can change.
+    """
+    if fields is not None:
+        record = {key: record.get(key) for key in fields}
+    payload = json.dumps([record, *extra], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+def check_record_etag(record, expected_etag, *extra, fields=None):
+    """
+    Raises StaleRecordError if `expected_etag` is given and no longer matches the record. Call it
+    inside edit_json, so the check and the save see the same data; only that file is locked.
+    """
+    if expected_etag:
+        etag = record_etag(record, *extra, fields=fields)
+        if etag != expected_etag:
+            raise StaleRecordError(record, etag)
+
+def diff_records(submitted, current):
+    """Lists (field, submitted value, saved value) for each submitted field that differs from the saved record."""
+    return [(key, submitted[key], current.get(key, ''))
+            for key in sorted(submitted)
+            if submitted[key] != current.get(key, '')]
+
+def _bump_all_versions():
+    """Moves every known data file to a new version, e.g. after a restore replaced the files directly."""
+    locks_root = os.path.join(get_project_root(), LOCKS_DIR)
+    for dir_path, _, file_names in os.walk(locks_root):
+        for file_name in file_names:
+            if not file_name.endswith('.lock'):
+                continue
+            lock_path = os.path.join(dir_path, file_name)
+            data_path = os.path.join(get_project_root(), os.path.relpath(lock_path, locks_root)[:-len('.lock')])
+            try:
+                with file_lock(data_path) as fd:
+                    _write_version(fd, _read_version(fd) + 1)
+            except (OSError, StorageError) as e:
+                print(f"Error updating version for {data_path}: {e}")
+
+register_cache_invalidator(_bump_all_versions)
@@ -10,9 +10,44 @@ LEAGUE_LOGO_FILENAME = 'league_logo.png' # New constant for logo filename
 # List of all primary data files to be deleted. prefs.json is excluded.
 DATA_FILES = [
     'belts.json', 'belt_history.json', 'divisions.json', 
-    'events.json', 'news.json', 'tagteams.json', 'wrestlers.json'
+    'events.json', 'news.json', 'tagteams.json', 'wrestlers.json', 'standings.json', 'ratings.json',
+    'bookings.json'
 ]
 
+# Callbacks that drop in-memory copies of league data, e.g. after a restore
+_cache_invalidators = []
+
+def register_cache_invalidator(callback):
+    """Registers a no-argument function that clears an in-memory cache of league data."""
+    if callback not in _cache_invalidators:
+        _cache_invalidators.append(callback)
+    return callback
+
+def invalidate_caches():
+    """Clears every registered in-memory cache. Call after data files are replaced wholesale."""
+    for callback in _cache_invalidators:
+        try:
+            callback()
+        except Exception as e:
+            print(f"Error invalidating cache {getattr(callback, '__name__', callback)}: {e}")
+
+# Callbacks told about single-record edits, e.g. so a per-name cache can drop just that entry
+_record_listeners = []
+
+def register_record_listener(callback):
+    """Registers a function called as callback(collection, names) after records in a collection are saved."""
+    if callback not in _record_listeners:
+        _record_listeners.append(callback)
+    return callback
+
+def notify_record_changed(collection, *names):
+    """Tells every registered listener that the named records in a collection were added, edited or deleted."""
+    for callback in _record_listeners:
+        try:
+            callback(collection, [name for name in names if name])
+        except Exception as e:
+            print(f"Error notifying record listener {getattr(callback, '__name__', callback)}: {e}")
+
 def get_project_root():
     """Helper function to get the project's root directory."""
     return os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
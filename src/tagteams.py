@@ -1,8 +1,12 @@
-import json
 import os
+from src.storage import read_json, write_json, edit_json, check_record_etag
 from src.wrestlers import get_wrestler_by_name
+from src.system import notify_record_changed
 
 TAGTEAMS_FILE_RELATIVE_TO_ROOT = 'data/tagteams.json'
+# Fields the edit form changes. Records and Belt only change through matches and titles.
+TAGTEAM_EDITABLE_FIELDS = ('Name', 'Status', 'Division', 'Location', 'Weight', 'Alignment', 'Music', 'Members', 'Faction',
+                           'Manager', 'Moves', 'Awards', 'Hide_From_Fan_Roster')
 
 def _get_tagteams_file_path():
     """Constructs the absolute path to the tagteams data file."""
@@ -11,17 +15,11 @@ def _get_tagteams_file_path():
 
 def load_tagteams():
     """Loads tag-team data from the JSON file."""
-    filepath = _get_tagteams_file_path()
-    if not os.path.exists(filepath) or os.path.getsize(filepath) == 0:
-        return []
-    with open(filepath, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    return read_json(_get_tagteams_file_path())
 
 def save_tagteams(tagteams_list):
     """Saves tag-team data to the JSON file."""
-    filepath = _get_tagteams_file_path()
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(tagteams_list, f, indent=4)
+    write_json(_get_tagteams_file_path(), tagteams_list)
 
 def get_tagteam_by_name(name):
     """Retrieves a single tag-team by its name."""
@@ -29,23 +27,33 @@ def get_tagteam_by_name(name):
 
 def add_tagteam(tagteam_data):
     """Adds a new tag-team to the list."""
-    tagteams = load_tagteams()
-    tagteams.append(tagteam_data)
-    save_tagteams(tagteams)
-
-def update_tagteam(original_name, updated_data):
-    """Updates an existing tag-team's data."""
-    tagteams = load_tagteams()
-    for i, tt in enumerate(tagteams):
-        if tt['Name'] == original_name:
-            tagteams[i] = updated_data
-            break
-    save_tagteams(tagteams)
+    with edit_json(_get_tagteams_file_path()) as tagteams:
+        tagteams.append(tagteam_data)
+    notify_record_changed('tagteams', tagteam_data.get('Name'))
+
+def update_tagteam(original_name, changes, expected_etag=None, etag_fields=None):
+    """
+    Applies `changes` to a tag-team as saved now, under the file lock; fields not given keep their
+    saved values. Returns False if it is not found or the new name is taken. Raises
+    StaleRecordError if `expected_etag`, taken over `etag_fields` if given, is out of date.
+    """
+    new_name = changes.get('Name', original_name)
+    with edit_json(_get_tagteams_file_path()) as tagteams:
+        index_to_update = next((i for i, tt in enumerate(tagteams) if tt.get('Name') == original_name), -1)
+        if index_to_update == -1:
+            return False
+        check_record_etag(tagteams[index_to_update], expected_etag, fields=etag_fields)
+        if original_name != new_name and any(tt.get('Name') == new_name for tt in tagteams):
+            return False
+        tagteams[index_to_update] = dict(tagteams[index_to_update], **changes)
+    notify_record_changed('tagteams', original_name, new_name)
+    return True
 
 def delete_tagteam(name):
     """Deletes a tag-team by its name."""
-    tagteams = [tt for tt in load_tagteams() if tt['Name'] != name]
-    save_tagteams(tagteams)
+    with edit_json(_get_tagteams_file_path()) as tagteams:
+        tagteams[:] = [tt for tt in tagteams if tt['Name'] != name]
+    notify_record_changed('tagteams', name)
 
 def get_wrestler_names():
     """Returns a list of all wrestler names."""
@@ -71,29 +79,27 @@ def _calculate_tagteam_weight(member_names):
                         pass
     return str(total_weight) if total_weight > 0 else ''
 
-def recalculate_all_tagteam_weights():
+def recalculate_all_tagteam_weights(progress=None):
     """
     Recalculates the weight for all tag teams based on their current members
     and updates the tagteam data.
     """
-    all_tagteams = load_tagteams()
     updated_count = 0
-    for team in all_tagteams:
-        member_names = team.get('Members', '').split('|')
-        # Filter out empty strings from member_names list
-        valid_member_names = [name for name in member_names if name]
-        
-        if valid_member_names:
-            new_weight = _calculate_tagteam_weight(valid_member_names)
-            if team.get('Weight') != new_weight:
-                team['Weight'] = new_weight
+    with edit_json(_get_tagteams_file_path()) as all_tagteams: # Only saved if a weight changed
+        for i, team in enumerate(all_tagteams):
+            if progress: progress(i, len(all_tagteams), f"Recalculating tag team weights ({i}/{len(all_tagteams)})")
+            member_names = team.get('Members', '').split('|')
+            # Filter out empty strings from member_names list
+            valid_member_names = [name for name in member_names if name]
+
+            if valid_member_names:
+                new_weight = _calculate_tagteam_weight(valid_member_names)
+                if team.get('Weight') != new_weight:
+                    team['Weight'] = new_weight
+                    updated_count += 1
+            elif team.get('Weight') != '': # If no members, weight should be empty
+                team['Weight'] = ''
                 updated_count += 1
-        elif team.get('Weight') != '': # If no members, weight should be empty
-            team['Weight'] = ''
-            updated_count += 1
-            
-    if updated_count > 0:
-        save_tagteams(all_tagteams)
     return updated_count
 
 def get_active_members_status(member_names):
@@ -105,30 +111,13 @@ def get_active_members_status(member_names):
                 return False
     return True
 
-def update_tagteam_record(team_name, result):
-    """Updates a tag team's win/loss/draw record."""
-    all_tagteams = load_tagteams()
-    team_found = False
-    for team in all_tagteams:
-        if team['Name'] == team_name:
-            team_found = True
-            if result == 'Win':
-                team['Wins'] = str(int(team.get('Wins', 0)) + 1)
-            elif result == 'Loss':
-                team['Losses'] = str(int(team.get('Losses', 0)) + 1)
-            elif result == 'Draw':
-                team['Draws'] = str(int(team.get('Draws', 0)) + 1)
-            break
-    if team_found:
-        save_tagteams(all_tagteams)
-    return team_found
-
-def reset_all_tagteam_records():
+def reset_all_tagteam_records(progress=None):
     """Sets all win/loss/draw records for every tag team to 0."""
-    all_tagteams = load_tagteams()
-    for team in all_tagteams:
-        team['Wins'] = '0'
-        team['Losses'] = '0'
-        team['Draws'] = '0'
-    save_tagteams(all_tagteams)
+    with edit_json(_get_tagteams_file_path()) as all_tagteams:
+        for i, team in enumerate(all_tagteams):
+            if progress: progress(i, len(all_tagteams), f"Resetting tag team records ({i}/{len(all_tagteams)})")
+            team['Wins'] = 0
+            team['Losses'] = 0
+            team['Draws'] = 0
+
 